@@ -0,0 +1,168 @@
+"""Canonical wallet addresses and a compact in-memory index keyed by them."""
+import array
+import bisect
+import math
+import os
+import struct
+from typing import Optional
+
+# Target false-positive rate of the bloom filter in front of every address index
+ADDRESS_BLOOM_ERROR_RATE = float(os.getenv('ADDRESS_BLOOM_ERROR_RATE', '0.001'))
+# New entries kept in the small overflow dict before it is merged into the sorted arrays
+ADDRESS_INDEX_MERGE_MIN = 65536
+# Sorted entries per block; one key per block is kept as a separate object for bisecting
+ADDRESS_INDEX_BLOCK = 64
+
+ADDRESS_SIZE = 20
+# Bit positions per bloom key; fewer probes than the size-optimal count, paid for with more bits
+BLOOM_HASHES = 3
+
+
+def canonical_address(address: str) -> bytes:
+    """Returns the 20 raw bytes of a hex address, whatever its case. Raises ValueError if it is not one."""
+    text = address.strip()
+    if text[:2] in ('0x', '0X'):
+        text = text[2:]
+    raw = bytes.fromhex(text) if len(text) == 2 * ADDRESS_SIZE else b''
+    if len(raw) != ADDRESS_SIZE:
+        raise ValueError(f"Not a {ADDRESS_SIZE}-byte hex address: {address!r}")
+    return raw
+
+
+def address_key(address: str) -> str:
+    """Returns the canonical text form (lowercase, 0x-prefixed) used in storage and Redis."""
+    return '0x' + canonical_address(address).hex()
+
+
+class BloomFilter:
+    """Bit-array bloom filter; `might_contain` is never wrong when it answers False.
+
+    Uses BLOOM_HASHES probes and sizes the array for `error_rate` at
+    `capacity` keys (about 3.6 bytes per key at 0.1%). Addresses are
+    already hash output, so the probe positions are read straight from the
+    key's last bytes (past any vanity prefix); a crafted address can at
+    worst cause a false positive, which only costs the exact lookup.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = ADDRESS_BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-BLOOM_HASHES * capacity / math.log(1 - error_rate ** (1 / BLOOM_HASHES))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self._unpack = struct.Struct(f'<{BLOOM_HASHES}I').unpack_from
+        self._offset = ADDRESS_SIZE - 4 * BLOOM_HASHES
+
+    def _positions(self, key: bytes) -> list:
+        size = self.size
+        return [h % size for h in self._unpack(key, self._offset)]
+
+    def add(self, key: bytes) -> None:
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, key: bytes) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class AddressIndex:
+    """Maps canonical 20-byte addresses to a positive integer (a user id or a timestamp).
+
+    Most entries live in one sorted bytes buffer (20 bytes each) with their
+    values in a parallel int64 array, about 28 bytes per address instead of
+    the ~150 a dict of strings costs. A lookup bisects the first key of each
+    ADDRESS_INDEX_BLOCK-entry block and then scans that block with
+    bytes.find, both in C. Recent inserts go to a small dict that
+    is merged in once it grows past ADDRESS_INDEX_MERGE_MIN or an eighth of
+    the sorted part, so merges stay rare. A bloom filter answers most misses
+    without touching either. Removed entries in the sorted part are zeroed
+    and dropped at the next merge.
+    """
+
+    def __init__(self, entries=(), error_rate: float = ADDRESS_BLOOM_ERROR_RATE):
+        self.error_rate = error_rate
+        self._keys = b''
+        self._values = array.array('q')
+        self._recent = {}
+        self._live = 0
+        self._rebuild(sorted(dict(entries).items()))
+
+    def __len__(self) -> int:
+        return self._live + len(self._recent)
+
+    def _rebuild(self, pairs: list) -> None:
+        """Replaces the sorted part with `pairs` (sorted, without duplicates or removed entries)."""
+        self._keys = b''.join(key for key, _ in pairs)
+        self._values = array.array('q', (value for _, value in pairs))
+        self._fences = [pairs[i][0] for i in range(0, len(pairs), ADDRESS_INDEX_BLOCK)]
+        self._live = len(pairs)
+        self._recent = {}
+        self._bloom = BloomFilter(max(ADDRESS_INDEX_MERGE_MIN, 2 * len(pairs)), self.error_rate)
+        for key, _ in pairs:
+            self._bloom.add(key)
+
+    def _merge(self) -> None:
+        pairs = [(self._keys[i * ADDRESS_SIZE:(i + 1) * ADDRESS_SIZE], value)
+                 for i, value in enumerate(self._values) if value]
+        pairs.extend(self._recent.items())
+        pairs.sort()
+        self._rebuild(pairs)
+
+    def _find(self, key: bytes) -> int:
+        """Returns the position of `key` in the sorted part, or -1."""
+        block = bisect.bisect_right(self._fences, key) - 1
+        if block < 0:
+            return -1
+        start = block * ADDRESS_INDEX_BLOCK * ADDRESS_SIZE
+        end = start + ADDRESS_INDEX_BLOCK * ADDRESS_SIZE
+        offset = self._keys.find(key, start, end)
+        # A match straddling two entries is not a match
+        while offset >= 0 and (offset - start) % ADDRESS_SIZE:
+            offset = self._keys.find(key, offset + 1, end)
+        return offset // ADDRESS_SIZE if offset >= 0 else -1
+
+    def get(self, key: bytes) -> Optional[int]:
+        if not self._bloom.might_contain(key):
+            return None
+        value = self._recent.get(key)
+        if value is not None:
+            return value
+        position = self._find(key)
+        if position >= 0 and self._values[position]:
+            return self._values[position]
+        return None
+
+    def set(self, key: bytes, value: int) -> None:
+        position = self._find(key) if self._bloom.might_contain(key) else -1
+        if position >= 0:
+            if not self._values[position]:
+                self._live += 1
+            self._values[position] = value
+            return
+        self._recent[key] = value
+        self._bloom.add(key)
+        if len(self._recent) > max(ADDRESS_INDEX_MERGE_MIN, self._live // 8):
+            self._merge()
+
+    def setdefault(self, key: bytes, value: int) -> int:
+        """Stores `value` unless `key` is present. Returns the stored value."""
+        existing = self.get(key)
+        if existing is not None:
+            return existing
+        self.set(key, value)
+        return value
+
+    def pop(self, key: bytes) -> Optional[int]:
+        value = self._recent.pop(key, None)
+        if value is not None:
+            return value
+        position = self._find(key) if self._bloom.might_contain(key) else -1
+        if position >= 0 and self._values[position]:
+            value = self._values[position]
+            self._values[position] = 0
+            self._live -= 1
+            return value
+        return None
@@ -0,0 +1,126 @@
+"""Background-refreshed cache of the sender wallets' balances on every network."""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How often all balances are refreshed (seconds)
+BALANCE_REFRESH_INTERVAL = float(os.getenv('BALANCE_REFRESH_INTERVAL', '30'))
+# Balances older than this are shown as stale (seconds)
+BALANCE_TTL = float(os.getenv('BALANCE_TTL', '120'))
+# Max time a single network's balance fetch may take (seconds)
+BALANCE_FETCH_TIMEOUT = float(os.getenv('BALANCE_FETCH_TIMEOUT', '5'))
+
+
+@dataclass
+class BalanceEntry:
+    """Last successfully fetched balance of one network, plus the last error if any.
+
+    `fetched_at` is when the read was started, so the balance reflects
+    every transaction broadcast before it.
+    """
+    balance_wei: Optional[int] = None
+    fetched_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def is_stale(self, ttl: float = BALANCE_TTL) -> bool:
+        return self.fetched_at is None or self.age() > ttl
+
+
+def format_age(seconds: float) -> str:
+    """Formats an age in seconds as a short human string, e.g. '45s', '3m', '2h'."""
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m"
+    return f"{int(seconds // 3600)}h"
+
+
+class BalanceCache:
+    """Keeps the balance of every sender wallet on every network fresh in the background.
+
+    `addresses` maps each network to its wallet addresses and may change
+    between refreshes. All wallets are fetched concurrently, each bounded
+    by its own timeout, so one dead RPC only marks its own entries as stale.
+    """
+
+    def __init__(self, rpc_clients: dict, addresses: dict, refresh_interval: float = BALANCE_REFRESH_INTERVAL,
+                 fetch_timeout: float = BALANCE_FETCH_TIMEOUT):
+        self.rpc_clients = rpc_clients
+        self.addresses = addresses
+        self.refresh_interval = refresh_interval
+        self.fetch_timeout = fetch_timeout
+        # BalanceEntry per (net_name, address)
+        self.entries = {}
+        self._task = None
+
+    def get_wallet(self, net_name: str, address: str) -> Optional[BalanceEntry]:
+        return self.entries.get((net_name, address))
+
+    def get(self, net_name: str) -> Optional[BalanceEntry]:
+        """Returns the network's total over all its wallets, as old as its oldest wallet balance.
+
+        The total is only given once every wallet has been fetched; until
+        then the entry carries the error of a wallet that failed, if any.
+        """
+        entries = [self.entries.get((net_name, address)) for address in self.addresses.get(net_name, ())]
+        if not entries or None in entries:
+            return None
+        error = next((entry.error for entry in entries if entry.error), None)
+        if any(entry.fetched_at is None for entry in entries):
+            return BalanceEntry(error=error)
+        return BalanceEntry(
+            balance_wei=sum(entry.balance_wei for entry in entries),
+            fetched_at=min(entry.fetched_at for entry in entries), error=error
+        )
+
+    def forget(self, net_name: str) -> None:
+        for key in [key for key in self.entries if key[0] == net_name]:
+            del self.entries[key]
+
+    async def _refresh_wallet(self, net_name: str, address: str, rpc_client) -> None:
+        entry = self.entries.setdefault((net_name, address), BalanceEntry())
+        if rpc_client is None:
+            entry.error = "No RPC client"
+            return
+        started = time.time()
+        try:
+            # The pending balance already reflects broadcast transfers, so WalletPool can stop reserving them
+            entry.balance_wei = await asyncio.wait_for(rpc_client.get_balance(address, 'pending'), self.fetch_timeout)
+            entry.fetched_at = started
+            entry.error = None
+        except Exception as e:
+            entry.error = str(e) or type(e).__name__
+            logger.warning(f"Balance refresh for {address} on {net_name} failed: {entry.error}")
+
+    async def refresh(self, net_name: str) -> None:
+        """Fetches the balance of each of a network's wallets; on failure the previous value is kept."""
+        rpc_client = self.rpc_clients.get(net_name)
+        await asyncio.gather(*(self._refresh_wallet(net_name, address, rpc_client)
+                               for address in self.addresses.get(net_name, ())))
+
+    async def refresh_all(self) -> None:
+        await asyncio.gather(*(self.refresh(net_name) for net_name in list(self.rpc_clients)))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._refresh_loop(), name='balance-cache-refresh')
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh_all()
+            except Exception as e:
+                logger.error(f"Balance refresh loop failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,377 @@
+"""End-to-end load test for the bot.
+
+Builds the real Application (every ConversationHandler from main.py) and
+points it at a fake Bot API server and a fake JSON-RPC node, both served
+locally. Simulated users are driven through /start, the faucet claim, the
+purchase flow and the Get More Tokens flow. The script reports throughput
+and p50/p99 latency per step and for the payouts sent.
+
+    python bench/loadtest.py --users 2000 --concurrency 200
+    python bench/loadtest.py --users 500 --rpc-latency 0.2 --rpc-failure-rate 0.05 --json results.json
+
+The fakes run in the same event loop as the bot, so absolute numbers
+include their (small) cost; compare runs made on the same machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+from aiohttp import web
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_TOKEN = '123456:load-test'
+BOT_ID = 123456
+OWNER_ID = 1
+CHANNEL_ID = -1001000000001
+CHAIN_ID = 1337
+NET_NAME = 'benchnet'
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class FakeBotAPI:
+    """Answers the Bot API methods the bot uses, after an optional delay."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = {}
+        self._runner = None
+        self.port = None
+        self._message_id = 0
+
+    def _message(self, chat_id, text='') -> dict:
+        self._message_id += 1
+        return {
+            'message_id': self._message_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench'},
+        }
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == 'getMe':
+            result = {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method == 'getChatMember':
+            user_id = int(params.get('user_id', 0))
+            status = 'administrator' if user_id == BOT_ID else 'member'
+            result = {'status': status, 'user': {'id': user_id, 'is_bot': user_id == BOT_ID, 'first_name': 'U'}}
+            if status == 'administrator':
+                result.update({key: True for key in (
+                    'can_be_edited', 'can_manage_chat', 'can_delete_messages', 'can_manage_video_chats',
+                    'can_restrict_members', 'can_promote_members', 'can_change_info', 'can_invite_users',
+                    'is_anonymous', 'can_post_stories', 'can_edit_stories', 'can_delete_stories')})
+        elif method == 'getChat':
+            result = {'id': CHANNEL_ID, 'type': 'channel', 'title': 'Bench Channel', 'invite_link': 'https://t.me/+bench',
+                      'accent_color_id': 0, 'max_reaction_count': 11}
+        elif method in ('sendMessage', 'sendPhoto', 'sendDocument'):
+            result = self._message(params.get('chat_id', 0), params.get('text', ''))
+        elif method in ('editMessageText', 'editMessageCaption', 'editMessageReplyMarkup'):
+            result = self._message(params.get('chat_id', 0) or 0, params.get('text', ''))
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+class FakeRPC:
+    """Minimal EVM JSON-RPC node with configurable latency and transport failures."""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = {}
+        self.sent = 0
+        # Sent transactions are mined at once, in the current block
+        self.receipts = {}
+        self._runner = None
+        self.port = None
+
+    def _answer(self, method: str, params: list):
+        if method == 'eth_chainId':
+            return hex(CHAIN_ID)
+        if method == 'eth_blockNumber':
+            return '0x100'
+        if method == 'eth_gasPrice':
+            return hex(10 ** 9)
+        if method == 'eth_getTransactionCount':
+            return hex(self.sent)
+        if method == 'eth_getBalance':
+            return hex(10 ** 24)
+        if method == 'eth_sendRawTransaction':
+            from eth_utils import keccak
+            self.sent += 1
+            tx_hash = '0x' + keccak(hexstr=params[0]).hex()
+            self.receipts[tx_hash] = {'transactionHash': tx_hash, 'blockNumber': '0x100', 'status': '0x1'}
+            return tx_hash
+        if method == 'eth_getTransactionReceipt':
+            return self.receipts.get(params[0])
+        raise KeyError(method)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if self.failure_rate and random.random() < self.failure_rate:
+            return web.Response(status=502, text='bad gateway')
+        batch = payload if isinstance(payload, list) else [payload]
+        responses = []
+        for call in batch:
+            self.calls[call['method']] = self.calls.get(call['method'], 0) + 1
+            try:
+                responses.append({'jsonrpc': '2.0', 'id': call['id'], 'result': self._answer(call['method'], call.get('params', []))})
+            except KeyError:
+                responses.append({'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32601, 'message': 'Method not found'}})
+        return web.json_response(responses if isinstance(payload, list) else responses[0])
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post('/', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+def install_config(rpc_port: int, wallets: int = 1) -> None:
+    """Provides the `config` module main.py imports, with throwaway sender wallets."""
+    from eth_account import Account
+    account = Account.create()
+    config = types.ModuleType('config')
+    config.TELEGRAM_BOT_TOKEN = BOT_TOKEN
+    config.OWNER_TELEGRAM_ID = OWNER_ID
+    config.ADMIN_NOTIF_ID = OWNER_ID
+    config.OWNER_TELEGRAM_USERNAME = 'bench_owner'
+    config.SENDER_ADDRESS = account.address
+    config.SENDER_PRIVATE_KEY = account.key.hex()
+    config.CHANNEL_ID = CHANNEL_ID
+    config.LABUBU_AI_BOT_ID = 0
+    config.network_configs = {
+        NET_NAME: {
+            'rpc_url': f'http://127.0.0.1:{rpc_port}/', 'chain_id': CHAIN_ID, 'display_name': 'Bench Net',
+            'currency_symbol': 'BENCH', 'explorer_url': 'https://explorer.invalid', 'faucet_enabled': True,
+            'faucet_amount': 0.001, 'task_reward_amount': 0.002, 'purchase_enabled': True,
+            'sender_wallets': [account.key.hex()] + [Account.create().key.hex() for _ in range(wallets - 1)],
+        },
+    }
+    sys.modules['config'] = config
+
+
+class Driver:
+    """Feeds synthetic updates straight into Application.process_update and times them."""
+
+    def __init__(self, application):
+        self.application = application
+        self.update_id = 0
+        self.latencies = {}
+        self.errors = 0
+
+    def _user(self, user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+    async def _process(self, step: str, data: dict) -> None:
+        from telegram import Update
+        self.update_id += 1
+        data['update_id'] = self.update_id
+        update = Update.de_json(data, self.application.bot)
+        started = time.perf_counter()
+        await self.application.process_update(update)
+        self.latencies.setdefault(step, []).append(time.perf_counter() - started)
+
+    async def message(self, step: str, user_id: int, text: str) -> None:
+        message = {
+            'message_id': self.update_id + 1, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'}, 'from': self._user(user_id),
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        await self._process(step, {'message': message})
+
+    async def callback(self, step: str, user_id: int, data: str) -> None:
+        await self._process(step, {'callback_query': {
+            'id': str(self.update_id + 1), 'from': self._user(user_id), 'chat_instance': str(user_id), 'data': data,
+            'message': {'message_id': 1, 'date': int(time.time()), 'text': 'menu',
+                        'chat': {'id': user_id, 'type': 'private'}, 'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Bench'}},
+        }})
+
+    async def run_user(self, user_id: int) -> None:
+        from web3 import Web3
+        address = Web3.to_checksum_address(f'0x{user_id:040x}')
+        await self.message('start', user_id, '/start')
+
+        await self.message('faucet_menu', user_id, 'Faucet 🤖')
+        await self.callback('claim_select', user_id, f'claim_token_{NET_NAME}')
+        await self.message('claim_address', user_id, address)
+
+        await self.message('purchase_menu', user_id, 'Purchase Token 💳')
+        await self.callback('purchase_select', user_id, f'buy_token_{NET_NAME}')
+        await self.message('purchase_amount', user_id, '0.5')
+
+        await self.message('tasks_menu', user_id, 'Get More Tokens ☕')
+        await self.callback('tasks_token', user_id, f'select_reward_token_{NET_NAME}')
+        await self.message('tasks_address', user_id, address)
+        await self.callback('tasks_twitter', user_id, 'select_twitter_tasks')
+        await self.callback('tasks_follow_1', user_id, 'followed_petrukstar_check')
+        await self.message('tasks_username', user_id, f'@user{user_id}')
+        await self.callback('tasks_follow_2', user_id, 'followed_ikysyptraa_check')
+        await self.message('tasks_post_link', user_id, f'https://x.com/user{user_id}/status/{user_id}')
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix='faucet-loadtest-')
+    os.environ.update({
+        'DATABASE_FILE': os.path.join(workdir, 'bench.db'), 'LEDGER_DIR': os.path.join(workdir, 'ledger'),
+        'STATE_BACKEND': 'memory', 'METRICS_PORT': '0', 'PAYOUT_RATE_PER_SECOND': str(args.payout_rate),
+        'RECEIPT_POLL_INTERVAL': '0.5',
+        # The driver feeds updates concurrently, like BOT_CONCURRENT_UPDATES would
+        'FLOOD_MAX_CONCURRENT': str(args.flood_max_concurrent or args.concurrency),
+    })
+    sys.path.insert(0, REPO_ROOT)
+
+    telegram_api = FakeBotAPI(args.tg_latency)
+    rpc = FakeRPC(args.rpc_latency, args.rpc_failure_rate)
+    await telegram_api.start()
+    await rpc.start()
+    install_config(rpc.port, args.wallets)
+
+    import logging
+    import main
+    logging.getLogger().setLevel(args.log_level)
+
+    main.init_db()
+    application = main.build_application(base_url=f'http://127.0.0.1:{telegram_api.port}/bot')
+    driver = Driver(application)
+
+    async def count_error(update, context):
+        driver.errors += 1
+    application.add_error_handler(count_error)
+
+    await application.initialize()
+    await main.post_init_callback(application)
+    # Networks connect in the background; the run measures the warmed-up bot
+    await main.warm_up_task
+
+    payout_latencies = []
+    original_process_payouts = main.payout_dispatcher.send_func
+
+    async def timed_process_payouts(payouts):
+        results = await original_process_payouts(payouts)
+        payout_latencies.extend(time.time() - payout.enqueued_at for payout in payouts)
+        return results
+    main.payout_dispatcher.send_func = timed_process_payouts
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(user_id):
+        async with semaphore:
+            await driver.run_user(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(10_000 + i) for i in range(args.users)))
+    handlers_done = time.perf_counter() - started
+
+    drain_deadline = time.monotonic() + args.drain_timeout
+    while len(payout_latencies) < args.users and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.1)
+    payouts_done = time.perf_counter() - started
+    while main.receipt_tracker.in_flight() and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.1)
+
+    await main.post_shutdown_callback(application)
+    await application.shutdown()
+    await telegram_api.stop()
+    await rpc.stop()
+
+    total_updates = sum(len(values) for values in driver.latencies.values())
+    steps = {}
+    for step, values in driver.latencies.items():
+        values.sort()
+        steps[step] = {'count': len(values), 'p50_ms': percentile(values, 0.5) * 1000,
+                       'p99_ms': percentile(values, 0.99) * 1000, 'max_ms': values[-1] * 1000}
+    payout_latencies.sort()
+    return {
+        'users': args.users, 'concurrency': args.concurrency, 'wallets': args.wallets,
+        'rpc_latency_s': args.rpc_latency, 'rpc_failure_rate': args.rpc_failure_rate, 'tg_latency_s': args.tg_latency,
+        'updates': total_updates, 'handler_errors': driver.errors,
+        'elapsed_s': handlers_done, 'updates_per_s': total_updates / handlers_done, 'users_per_s': args.users / handlers_done,
+        'steps': steps,
+        'payouts': {
+            'sent': rpc.sent, 'completed': len(payout_latencies), 'elapsed_s': payouts_done,
+            'per_s': len(payout_latencies) / payouts_done if payouts_done else 0.0,
+            'p50_ms': percentile(payout_latencies, 0.5) * 1000, 'p99_ms': percentile(payout_latencies, 0.99) * 1000,
+        },
+        'receipts': dict(main.receipt_tracker.counters, in_flight=main.receipt_tracker.in_flight()),
+        'flood_control': {f'{action}_{outcome}': count for (action, outcome), count in main.flood_control.counters.items()},
+        'telegram_calls': telegram_api.calls, 'rpc_calls': rpc.calls,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{result['users']} users, concurrency {result['concurrency']}: {result['updates']} updates in "
+          f"{result['elapsed_s']:.2f}s = {result['updates_per_s']:.0f} updates/s, {result['users_per_s']:.1f} users/s, "
+          f"{result['handler_errors']} handler errors")
+    print(f"{'step':<18}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, stats in result['steps'].items():
+        print(f"{step:<18}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    rejected = {key: count for key, count in result['flood_control'].items() if not key.endswith('_admitted')}
+    if rejected:
+        print(f"flood control rejections: {rejected}")
+    payouts = result['payouts']
+    print(f"payouts: {payouts['completed']} completed ({payouts['sent']} txs sent) in {payouts['elapsed_s']:.2f}s = "
+          f"{payouts['per_s']:.1f}/s, queue-to-sent p50 {payouts['p50_ms']:.0f} ms, p99 {payouts['p99_ms']:.0f} ms")
+    print(f"receipts: {result['receipts']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=1000, help='simulated users, each running every flow once')
+    parser.add_argument('--concurrency', type=int, default=100, help='users active at the same time')
+    parser.add_argument('--rpc-latency', type=float, default=0.02, help='mean JSON-RPC response delay (seconds)')
+    parser.add_argument('--rpc-failure-rate', type=float, default=0.0, help='fraction of RPC requests answered with HTTP 502')
+    parser.add_argument('--tg-latency', type=float, default=0.0, help='Bot API response delay (seconds)')
+    parser.add_argument('--payout-rate', type=float, default=0, help='PAYOUT_RATE_PER_SECOND for the run (0 = unlimited)')
+    parser.add_argument('--flood-max-concurrent', type=int, default=0, help='FLOOD_MAX_CONCURRENT for the run (default: --concurrency)')
+    parser.add_argument('--wallets', type=int, default=1, help='sender wallets on the bench network')
+    parser.add_argument('--drain-timeout', type=float, default=60, help='how long to wait for queued payouts (seconds)')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
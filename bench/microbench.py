@@ -0,0 +1,224 @@
+"""Microbenchmarks for the code paths whose cost grows with the number of users.
+
+For each dataset size a fresh process generates synthetic users and
+redeemed addresses in a temporary database, then measures:
+
+  * load      - state backend start (every user and address read into memory)
+  * save      - per-record write-through (new user, completed task)
+  * cooldown  - the reserve_cooldown check done by handle_claim_address
+  * redeemed  - the address_owner check done by handle_reward_address (hits and misses)
+  * stat      - a full stat_command call
+
+Each measurement reports wall time or per-call latency percentiles plus the
+process RSS, and the combined results are written as JSON so runs can be
+compared across releases.
+
+    python bench/microbench.py --sizes 10000,100000,1000000 --json bench-results.json
+
+The state backend follows STATE_BACKEND / STATE_REDIS_URL, as in the bot.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = '10000,100000,1000000'
+# Share of users that have redeemed an address through Get More Tokens
+REDEEMED_RATIO = 0.5
+NETWORKS = ('benchnet', 'sepolia', 'monad')
+TASK_NAME = 'get_more_tokens_main_task'
+FIRST_USER_ID = 10_000_000
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def latency_stats(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))] * 1e6
+    return {'count': len(samples), 'p50_us': pick(0.5), 'p99_us': pick(0.99), 'max_us': samples[-1] * 1e6,
+            'mean_us': sum(samples) / len(samples) * 1e6}
+
+
+def address_for(index: int) -> str:
+    """A deterministic, realistic (hash-derived, checksummed) address for `index`."""
+    from eth_utils import keccak, to_checksum_address
+    return to_checksum_address(keccak(index.to_bytes(8, 'big'))[12:])
+
+
+def user_record(user_id: int, now: float, rng: random.Random) -> dict:
+    return {
+        'username': f'user{user_id}',
+        'full_name': f'User {user_id}',
+        'first_interaction': now - rng.uniform(0, 90 * 86400),
+        'last_claim_times': {net: now - rng.uniform(0, 3 * 86400) for net in NETWORKS if rng.random() < 0.6},
+        'completed_tasks': {TASK_NAME: True} if rng.random() < REDEEMED_RATIO else {},
+    }
+
+
+def generate_dataset(storage, size: int, seed: int) -> float:
+    """Bulk-inserts `size` users and their redeemed addresses; returns the elapsed seconds."""
+    rng = random.Random(seed)
+    now = time.time()
+    started = time.perf_counter()
+    storage.conn.execute("BEGIN")
+    batch_users, batch_addresses = [], []
+    for index in range(size):
+        user_id = FIRST_USER_ID + index
+        batch_users.append((str(user_id), json.dumps(user_record(user_id, now, rng))))
+        if index % 2 == 0:
+            batch_addresses.append((address_for(index), str(user_id)))
+        if len(batch_users) >= 10_000:
+            storage.conn.executemany("INSERT INTO users (user_id, data) VALUES (?, ?)", batch_users)
+            storage.conn.executemany("INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?)", batch_addresses)
+            batch_users, batch_addresses = [], []
+    storage.conn.executemany("INSERT INTO users (user_id, data) VALUES (?, ?)", batch_users)
+    storage.conn.executemany("INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?)", batch_addresses)
+    storage.conn.execute("COMMIT")
+    return time.perf_counter() - started
+
+
+async def timed_calls(samples: int, make_call) -> list:
+    latencies = []
+    for i in range(samples):
+        call = make_call(i)
+        started = time.perf_counter()
+        await call
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+class _Message:
+    async def reply_text(self, text, **kwargs):
+        return None
+
+
+async def run_size(size: int, samples: int, seed: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix='faucet-microbench-')
+    os.environ.update({
+        'DATABASE_FILE': os.path.join(workdir, 'bench.db'), 'LEDGER_DIR': os.path.join(workdir, 'ledger'), 'METRICS_PORT': '0',
+    })
+    sys.path.insert(0, REPO_ROOT)
+    from loadtest import install_config, OWNER_ID
+    install_config(rpc_port=9)
+    import main
+    from balances import BalanceCache
+    from health import HealthMonitor
+    from receipts import ReceiptTracker
+
+    result = {'users': size, 'rss_baseline_mb': rss_mb()}
+    main.init_db()
+    result['generate_s'] = generate_dataset(main.storage, size, seed)
+    result['db_size_mb'] = sum(
+        os.path.getsize(path) for path in (main.DATABASE_FILE, main.DATABASE_FILE + '-wal') if os.path.exists(path)) / 1e6
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await main.state.start()
+    result['load'] = {'seconds': time.perf_counter() - started, 'rss_mb': rss_mb(), 'rss_delta_mb': rss_mb() - rss_before}
+
+    rng = random.Random(seed + 1)
+    now = time.time()
+    state = main.state
+    random_user = lambda: str(FIRST_USER_ID + rng.randrange(size))
+
+    result['save'] = {
+        'add_user': latency_stats(await timed_calls(samples, lambda i: state.add_user(
+            str(FIRST_USER_ID + size + i), user_record(FIRST_USER_ID + size + i, now, rng)))),
+        'complete_task': latency_stats(await timed_calls(samples, lambda i: state.complete_task(random_user(), f'bench_task_{i}'))),
+    }
+    result['cooldown'] = latency_stats(await timed_calls(samples, lambda i: state.reserve_cooldown(
+        random_user(), rng.choice(NETWORKS), now, main.CLAIM_COOLDOWN_SECONDS)))
+    result['redeemed'] = {
+        'hit': latency_stats(await timed_calls(samples, lambda i: state.address_owner(address_for(2 * rng.randrange(size // 2))))),
+        'miss': latency_stats(await timed_calls(samples, lambda i: state.address_owner(address_for(size + 1 + 2 * i)))),
+    }
+
+    # /stat reads the background services, which are not started here
+    main.health_monitor = HealthMonitor({})
+    main.receipt_tracker = ReceiptTracker({}, None, None)
+    main.balance_cache = BalanceCache({}, {})
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=OWNER_ID), message=_Message())
+    result['stat'] = latency_stats(await timed_calls(max(1, samples // 100), lambda i: main.stat_command(update, None)))
+
+    result['rss_final_mb'] = rss_mb()
+    await state.stop()
+    main.storage.close()
+    return result
+
+
+def run_worker(args) -> None:
+    result = asyncio.run(run_size(args.worker, args.samples, args.seed))
+    json.dump(result, sys.stdout)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def print_report(results: list) -> None:
+    print(f"\n{'users':>9} {'load s':>8} {'load MB':>8} {'add us':>8} {'task us':>8} {'cool us':>8} "
+          f"{'hit us':>8} {'miss us':>8} {'stat us':>9} {'RSS MB':>8}   (p50 / max RSS)")
+    for r in results:
+        print(f"{r['users']:>9} {r['load']['seconds']:>8.2f} {r['load']['rss_delta_mb']:>8.1f} "
+              f"{r['save']['add_user']['p50_us']:>8.1f} {r['save']['complete_task']['p50_us']:>8.1f} "
+              f"{r['cooldown']['p50_us']:>8.1f} {r['redeemed']['hit']['p50_us']:>8.1f} {r['redeemed']['miss']['p50_us']:>8.1f} "
+              f"{r['stat']['p50_us']:>9.1f} {r['rss_final_mb']:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated user counts')
+    parser.add_argument('--samples', type=int, default=10_000, help='calls timed per latency measurement')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args)
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f"Benchmarking {size} users...", file=sys.stderr)
+        # One process per size so RSS figures are not polluted by the previous dataset
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', str(size), '--samples', str(args.samples), '--seed', str(args.seed)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(out))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'revision': git_revision(), 'timestamp': time.time(), 'python': platform.python_version(),
+                'platform': platform.platform(), 'state_backend': os.getenv('STATE_BACKEND', 'memory'), 'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
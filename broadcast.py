@@ -0,0 +1,183 @@
+"""Background, resumable broadcasting to every known user."""
+import asyncio
+import datetime
+import logging
+import os
+import time
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from metrics import TELEGRAM_RETRIES
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Messages per second across the whole job; Telegram allows about 30/s per bot
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '25'))
+# Max send_message calls in flight at once
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '10'))
+# Users fetched and checkpointed per step
+BROADCAST_BATCH_SIZE = int(os.getenv('BROADCAST_BATCH_SIZE', '200'))
+# How often the progress message in the owner chat is updated (seconds)
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv('BROADCAST_PROGRESS_INTERVAL', '30'))
+# Attempts per user before the send counts as failed
+BROADCAST_MAX_ATTEMPTS = 3
+
+SENT, FAILED, PRUNED = 'sent', 'failed', 'pruned'
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, datetime.timedelta) else float(retry_after)
+
+
+class BroadcastEngine:
+    """Runs one broadcast job at a time as a background task.
+
+    Users are paged from the shared state backend, one batch at a time, so
+    users first seen by another bot instance are reached too. The job's
+    cursor and counters are checkpointed in storage after every batch, so
+    a job that was running when the bot stopped is resumed where it left
+    off (at most one batch is sent twice). Sending goes through a token bucket,
+    and a RetryAfter from Telegram pauses every sender of the job. Users
+    who blocked the bot are passed to the `on_user_blocked` coroutine for
+    pruning.
+    """
+
+    def __init__(self, bot, storage, state, on_user_blocked):
+        self.bot = bot
+        self.storage = storage
+        self.state = state
+        self.on_user_blocked = on_user_blocked
+        self.limiter = TokenBucket(BROADCAST_RATE)
+        self.job = None
+        self._task = None
+        self._cancelled = False
+        self._paused_until = 0.0
+        self._progress_message = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start_job(self, text: str, owner_chat_id: int) -> dict:
+        """Creates and starts a new job. Raises RuntimeError if one is already running."""
+        total = await self.state.count_users()
+        if self.is_running():
+            raise RuntimeError(f"Broadcast #{self.job['job_id']} is still running.")
+        now = time.time()
+        job_id = await self.storage.create_broadcast_job(text, owner_chat_id, total, now)
+        job = {'job_id': job_id, 'text': text, 'owner_chat_id': owner_chat_id, 'status': 'running', 'cursor': '',
+               'total': total, 'sent': 0, 'failed': 0, 'pruned': 0, 'created_at': now, 'updated_at': now}
+        self._launch(job)
+        return job
+
+    def resume(self) -> None:
+        """Resumes the oldest job that was still running when the bot stopped."""
+        jobs = self.storage.load_broadcast_jobs('running')
+        if jobs and not self.is_running():
+            logger.info(f"Resuming broadcast #{jobs[0]['job_id']} from cursor {jobs[0]['cursor'] or '(start)'}.")
+            self._launch(jobs[0])
+
+    def cancel(self) -> bool:
+        """Asks the running job to stop after its current batch."""
+        if not self.is_running():
+            return False
+        self._cancelled = True
+        return True
+
+    def progress_text(self) -> str:
+        job = self.job
+        done = job['sent'] + job['failed'] + job['pruned']
+        return (
+            f"📣 Broadcast #{job['job_id']} ({job['status']}): {done}/{job['total']} processed\n"
+            f"Sent: {job['sent']} | Failed: {job['failed']} | Pruned (blocked): {job['pruned']}"
+        )
+
+    async def stop(self) -> None:
+        """Stops the running job without marking it finished, so it resumes on next start."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def _launch(self, job: dict) -> None:
+        self.job = job
+        self._cancelled = False
+        self._progress_message = None
+        self._task = asyncio.create_task(self._run(), name=f"broadcast-{job['job_id']}")
+
+    async def _report(self, final: bool = False) -> None:
+        try:
+            if self._progress_message is None or final:
+                self._progress_message = await self.bot.send_message(chat_id=self.job['owner_chat_id'], text=self.progress_text())
+            else:
+                await self._progress_message.edit_text(self.progress_text())
+        except Exception as e:
+            logger.warning(f"Failed to report broadcast progress: {e}")
+
+    async def _run(self) -> None:
+        job = self.job
+        await self._report()
+        last_report = time.monotonic()
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        try:
+            while not self._cancelled:
+                user_ids, next_cursor = await self.state.user_ids_page(job['cursor'], BROADCAST_BATCH_SIZE)
+                results = await asyncio.gather(*(self._send_one(semaphore, user_id, job['text']) for user_id in user_ids))
+                for result in results:
+                    job[result] += 1
+                job['cursor'] = next_cursor or job['cursor']
+                job['updated_at'] = time.time()
+                self.storage.update_broadcast_job(
+                    job['job_id'], cursor=job['cursor'], sent=job['sent'], failed=job['failed'],
+                    pruned=job['pruned'], updated_at=job['updated_at']
+                )
+                if next_cursor is None:
+                    break
+                if time.monotonic() - last_report >= BROADCAST_PROGRESS_INTERVAL:
+                    await self._report()
+                    last_report = time.monotonic()
+            job['status'] = 'cancelled' if self._cancelled else 'done'
+            self.storage.update_broadcast_job(job['job_id'], status=job['status'], updated_at=time.time())
+            logger.info(f"Broadcast #{job['job_id']} {job['status']}. Sent: {job['sent']}, Failed: {job['failed']}, Pruned: {job['pruned']}")
+            await self._report(final=True)
+        except asyncio.CancelledError:
+            logger.info(f"Broadcast #{job['job_id']} interrupted; it will resume on next start.")
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast #{job['job_id']} crashed: {e}")
+            job['status'] = 'failed'
+            self.storage.update_broadcast_job(job['job_id'], status='failed', updated_at=time.time())
+            await self._report(final=True)
+
+    async def _send_one(self, semaphore: asyncio.Semaphore, user_id_str: str, text: str) -> str:
+        async with semaphore:
+            for attempt in range(BROADCAST_MAX_ATTEMPTS):
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                await self.limiter.acquire()
+                try:
+                    await self.bot.send_message(chat_id=int(user_id_str), text=text)
+                    return SENT
+                except RetryAfter as e:
+                    delay = _retry_after_seconds(e)
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    TELEGRAM_RETRIES.inc(reason='flood_control')
+                    logger.warning(f"Broadcast hit Telegram flood control; pausing for {delay}s.")
+                except Forbidden:
+                    await self.on_user_blocked(user_id_str)
+                    return PRUNED
+                except BadRequest as e:
+                    if 'chat not found' in str(e).lower():
+                        await self.on_user_blocked(user_id_str)
+                        return PRUNED
+                    logger.warning(f"Failed to send broadcast to user {user_id_str}: {e}")
+                    return FAILED
+                except NetworkError as e:
+                    logger.warning(f"Network error sending broadcast to user {user_id_str} (attempt {attempt + 1}): {e}")
+                    TELEGRAM_RETRIES.inc(reason='network_error')
+                    await asyncio.sleep(2 ** attempt)
+                except Exception as e:
+                    logger.warning(f"Failed to send broadcast to user {user_id_str}: {e}")
+                    return FAILED
+            return FAILED
@@ -0,0 +1,125 @@
+"""Cached per-network fee estimates with EIP-1559 support."""
+import asyncio
+import logging
+import os
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How often fee estimates are refreshed in the background (seconds)
+FEE_REFRESH_INTERVAL = float(os.getenv('FEE_REFRESH_INTERVAL', '15'))
+# Estimates older than this are refreshed inline before use (seconds)
+FEE_MAX_AGE = float(os.getenv('FEE_MAX_AGE', '120'))
+# Number of recent blocks sampled through eth_feeHistory
+FEE_HISTORY_BLOCKS = int(os.getenv('FEE_HISTORY_BLOCKS', '10'))
+# Percentile of recent priority fees paid that we aim to match
+FEE_PRIORITY_PERCENTILE = float(os.getenv('FEE_PRIORITY_PERCENTILE', '50'))
+# Floor for the priority fee, so empty blocks do not yield a zero tip (wei)
+FEE_MIN_PRIORITY_WEI = int(os.getenv('FEE_MIN_PRIORITY_WEI', '1000000'))
+# maxFeePerGas = base fee * this + priority fee; 2 survives six consecutive full blocks
+FEE_BASE_FEE_MULTIPLIER = float(os.getenv('FEE_BASE_FEE_MULTIPLIER', '2'))
+
+
+@dataclass
+class FeeEstimate:
+    """Fee parameters for one network, either EIP-1559 or legacy."""
+    eip1559: bool
+    base_fee: Optional[int] = None
+    priority_fee: Optional[int] = None
+    max_fee: Optional[int] = None
+    gas_price: Optional[int] = None
+    fetched_at: float = 0.0
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def tx_fields(self) -> dict:
+        """Returns the fee fields to merge into a transaction dict."""
+        if self.eip1559:
+            return {'type': 2, 'maxFeePerGas': self.max_fee, 'maxPriorityFeePerGas': self.priority_fee}
+        return {'gasPrice': self.gas_price}
+
+
+class FeeOracle:
+    """Keeps a fee estimate per network fresh in the background.
+
+    EIP-1559 networks are detected from the base fee reported by
+    eth_feeHistory; the tip is the FEE_PRIORITY_PERCENTILE of recent
+    rewards. Networks without a base fee, or with `eip1559: False` in their
+    config, fall back to a legacy eth_gasPrice estimate.
+    """
+
+    def __init__(self, rpc_clients: dict, network_configs: dict, refresh_interval: float = FEE_REFRESH_INTERVAL):
+        self.rpc_clients = rpc_clients
+        self.network_configs = network_configs
+        self.refresh_interval = refresh_interval
+        self.estimates = {}
+        self._task = None
+
+    async def _estimate_eip1559(self, rpc_client) -> Optional[FeeEstimate]:
+        history = await rpc_client.fee_history(FEE_HISTORY_BLOCKS, 'latest', [FEE_PRIORITY_PERCENTILE])
+        base_fees = history.get('baseFeePerGas') or []
+        # The last entry is the base fee of the next (pending) block
+        if not base_fees or not base_fees[-1]:
+            return None
+        base_fee = base_fees[-1]
+        rewards = [block_rewards[0] for block_rewards in history.get('reward') or [] if block_rewards]
+        priority_fee = max(int(statistics.median(rewards)) if rewards else 0, FEE_MIN_PRIORITY_WEI)
+        return FeeEstimate(
+            eip1559=True, base_fee=base_fee, priority_fee=priority_fee,
+            max_fee=int(base_fee * FEE_BASE_FEE_MULTIPLIER) + priority_fee, fetched_at=time.time()
+        )
+
+    async def refresh(self, net_name: str) -> FeeEstimate:
+        """Fetches a new estimate for one network and caches it."""
+        rpc_client = self.rpc_clients[net_name]
+        estimate = None
+        if self.network_configs.get(net_name, {}).get('eip1559', True):
+            try:
+                estimate = await self._estimate_eip1559(rpc_client)
+            except Exception as e:
+                logger.debug(f"eth_feeHistory unavailable on {net_name}, using legacy gas price: {e}")
+        if estimate is None:
+            estimate = FeeEstimate(eip1559=False, gas_price=await rpc_client.gas_price(), fetched_at=time.time())
+        self.estimates[net_name] = estimate
+        return estimate
+
+    def forget(self, net_name: str) -> None:
+        self.estimates.pop(net_name, None)
+
+    async def get(self, net_name: str) -> FeeEstimate:
+        """Returns the cached estimate, refreshing inline only if it is missing or too old."""
+        estimate = self.estimates.get(net_name)
+        if estimate is not None and estimate.age() < FEE_MAX_AGE:
+            return estimate
+        try:
+            return await self.refresh(net_name)
+        except Exception as e:
+            if estimate is None:
+                raise
+            logger.warning(f"Fee refresh for {net_name} failed ({e}); using estimate from {estimate.age():.0f}s ago.")
+            return estimate
+
+    async def refresh_all(self) -> None:
+        async def refresh_quietly(net_name):
+            try:
+                await self.refresh(net_name)
+            except Exception as e:
+                logger.warning(f"Fee refresh for {net_name} failed: {e}")
+        await asyncio.gather(*(refresh_quietly(net_name) for net_name in list(self.rpc_clients)))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._refresh_loop(), name='fee-oracle-refresh')
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(self.refresh_interval)
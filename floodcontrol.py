@@ -0,0 +1,140 @@
+"""Per-user flood control and a global cap on expensive actions, applied before any handler runs."""
+import functools
+import logging
+import os
+import time
+
+from metrics import FLOOD_REJECTED
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Per-user token buckets by action class: (refill rate per second, burst)
+FLOOD_LIMITS = {
+    # /start and other commands, main menu buttons
+    'command': (float(os.getenv('FLOOD_COMMAND_RATE', '0.5')), float(os.getenv('FLOOD_COMMAND_BURST', '5'))),
+    # Inline keyboard presses
+    'button': (float(os.getenv('FLOOD_BUTTON_RATE', '1')), float(os.getenv('FLOOD_BUTTON_BURST', '8'))),
+    # Free text (addresses, amounts, usernames, links) and photos
+    'message': (float(os.getenv('FLOOD_MESSAGE_RATE', '0.5')), float(os.getenv('FLOOD_MESSAGE_BURST', '5'))),
+    # Balance queries, claims and other requests that cost RPC or payout work
+    'expensive': (float(os.getenv('FLOOD_EXPENSIVE_RATE', '0.1')), float(os.getenv('FLOOD_EXPENSIVE_BURST', '3'))),
+}
+# Expensive handlers allowed to run at the same time across all users; only reachable when updates are
+# processed concurrently, i.e. with BOT_CONCURRENT_UPDATES above this value
+FLOOD_MAX_CONCURRENT = int(os.getenv('FLOOD_MAX_CONCURRENT', '16'))
+# A throttled user is told at most once per this many seconds; further excess is dropped silently
+FLOOD_NOTICE_INTERVAL = float(os.getenv('FLOOD_NOTICE_INTERVAL', '30'))
+# Buckets untouched for this long are full again and are forgotten (seconds)
+FLOOD_IDLE_TTL = 600
+
+THROTTLED_TEXT = "⏳ You're sending requests too quickly. Please wait a moment and try again."
+BUSY_TEXT = "⏳ The bot is busy right now. Please try again in a few seconds."
+
+
+class FloodControl:
+    """Token buckets per (user, action class) plus a concurrency cap for expensive handlers.
+
+    `allow()` is called for every update by a handler in the first group;
+    `guard()` wraps the callbacks of expensive handlers. Excess updates are
+    dropped, with one notice per FLOOD_NOTICE_INTERVAL so the notices
+    themselves cannot be used to flood Telegram.
+    """
+
+    def __init__(self, limits: dict = FLOOD_LIMITS, max_concurrent: int = FLOOD_MAX_CONCURRENT,
+                 notice_interval: float = FLOOD_NOTICE_INTERVAL, idle_ttl: float = FLOOD_IDLE_TTL):
+        self.limits = limits
+        self.max_concurrent = max_concurrent
+        self.notice_interval = notice_interval
+        self.idle_ttl = idle_ttl
+        self.buckets = {}
+        self.last_notice = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.counters = {}
+        self._last_sweep = time.monotonic()
+
+    def _count(self, action: str, outcome: str) -> None:
+        self.counters[(action, outcome)] = self.counters.get((action, outcome), 0) + 1
+
+    def _sweep(self, now: float) -> None:
+        """Forgets idle buckets and notice timestamps so memory tracks active users only."""
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket.updated < self.idle_ttl}
+        self.last_notice = {user_id: at for user_id, at in self.last_notice.items() if now - at < self.notice_interval}
+        self._last_sweep = now
+
+    def allow(self, user_id: int, action: str) -> bool:
+        """Takes a token from the user's bucket for `action`. Returns False if the update should be dropped."""
+        now = time.monotonic()
+        if now - self._last_sweep > self.idle_ttl:
+            self._sweep(now)
+        bucket = self.buckets.get((user_id, action))
+        if bucket is None:
+            rate, burst = self.limits[action]
+            bucket = self.buckets[(user_id, action)] = TokenBucket(rate, burst)
+        if bucket.try_acquire():
+            self._count(action, 'admitted')
+            return True
+        self._count(action, 'throttled')
+        FLOOD_REJECTED.inc(action=action, reason='throttled')
+        return False
+
+    async def notify(self, update, text: str = THROTTLED_TEXT) -> None:
+        """Tells the user they were throttled, unless they were told recently."""
+        user_id = update.effective_user.id
+        now = time.monotonic()
+        if now - self.last_notice.get(user_id, float('-inf')) < self.notice_interval:
+            if update.callback_query:
+                # Still stops the button's loading spinner, without a visible message
+                await update.callback_query.answer()
+            return
+        self.last_notice[user_id] = now
+        try:
+            if update.callback_query:
+                await update.callback_query.answer(text)
+            elif update.effective_message:
+                await update.effective_message.reply_text(text)
+        except Exception as e:
+            logger.warning(f"Could not send throttle notice to {user_id}: {e}")
+
+    def guard(self, callback):
+        """Wraps an expensive handler so at most `max_concurrent` of them run at once.
+
+        Handlers only overlap when the application processes updates
+        concurrently; see check_concurrency(). A rejected call returns None, which leaves a conversation in its
+        current state so the user can simply retry.
+        """
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            if self.in_flight >= self.max_concurrent:
+                self._count('expensive', 'busy')
+                FLOOD_REJECTED.inc(action='expensive', reason='busy')
+                await self.notify(update, BUSY_TEXT)
+                return None
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                return await callback(update, context)
+            finally:
+                self.in_flight -= 1
+        return wrapper
+
+    def check_concurrency(self, concurrent_updates: int) -> None:
+        """Logs whether the expensive-handler cap can ever trigger with `concurrent_updates` at a time."""
+        if concurrent_updates <= 1:
+            logger.info(f"Updates are handled one at a time; the cap of {self.max_concurrent} concurrent expensive handlers is inactive.")
+        elif concurrent_updates <= self.max_concurrent:
+            logger.warning(f"FLOOD_MAX_CONCURRENT ({self.max_concurrent}) is not below BOT_CONCURRENT_UPDATES ({concurrent_updates}), "
+                           f"so the concurrency cap never triggers; lower it to reserve room for cheap updates.")
+
+    def report(self) -> str:
+        lines = [
+            f"Tracked buckets: {len(self.buckets)}",
+            f"Expensive handlers running: {self.in_flight}/{self.max_concurrent} (peak {self.peak_in_flight})",
+        ]
+        for action, (rate, burst) in self.limits.items():
+            admitted = self.counters.get((action, 'admitted'), 0)
+            throttled = self.counters.get((action, 'throttled'), 0)
+            lines.append(f"{action} ({rate:g}/s, burst {burst:g}): {admitted} admitted, {throttled} throttled")
+        lines.append(f"Rejected as busy: {self.counters.get(('expensive', 'busy'), 0)}")
+        return '\n'.join(lines)
@@ -0,0 +1,150 @@
+"""Background RPC health monitoring with a circuit breaker per network."""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from rpc import is_rpc_error
+
+logger = logging.getLogger(__name__)
+
+# How often every network is probed (seconds)
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '15'))
+# Max time a probe may take before it counts as a failure (seconds)
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '5'))
+# Consecutive failures that open a network's circuit breaker
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+# How long an open breaker waits before a probe may close it again (seconds)
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))
+
+# Smoothing factors for the latency and error rate moving averages
+LATENCY_ALPHA = 0.2
+ERROR_RATE_ALPHA = 0.1
+
+BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+@dataclass
+class NetworkHealth:
+    """Observed health of one network's RPC."""
+    breaker: str = BREAKER_CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    last_error: Optional[str] = None
+    last_checked: Optional[float] = None
+
+    @property
+    def status(self) -> str:
+        if self.last_checked is None:
+            return 'unknown'
+        if self.breaker == BREAKER_OPEN:
+            return 'down'
+        if self.breaker == BREAKER_HALF_OPEN or self.error_rate >= 0.25:
+            return 'degraded'
+        return 'up'
+
+
+class HealthMonitor:
+    """Tracks RPC status per network from background probes and from live traffic.
+
+    Handlers call `is_available()`, which is a dict lookup, instead of making
+    an `is_connected()` round trip. A network's breaker opens after
+    BREAKER_FAILURE_THRESHOLD consecutive transport failures and is only
+    closed again by a successful probe once BREAKER_RESET_TIMEOUT has passed.
+    JSON-RPC errors (e.g. a rejected transaction) mean the node answered, so
+    they do not count as failures.
+    """
+
+    def __init__(self, rpc_clients: dict, probe_interval: float = HEALTH_PROBE_INTERVAL,
+                 probe_timeout: float = HEALTH_PROBE_TIMEOUT):
+        self.rpc_clients = rpc_clients
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.networks = {}
+        self._task = None
+
+    def get(self, net_name: str) -> NetworkHealth:
+        return self.networks.setdefault(net_name, NetworkHealth())
+
+    def is_available(self, net_name: str) -> bool:
+        """Returns False only while the network's breaker is open."""
+        health = self.networks.get(net_name)
+        return health is None or health.breaker != BREAKER_OPEN
+
+    def forget(self, net_name: str) -> None:
+        """Drops a network's stats, e.g. after its endpoints were replaced by a config reload."""
+        self.networks.pop(net_name, None)
+
+    def watch(self, rpc_client) -> None:
+        """Feeds every call made through `rpc_client` into the health stats."""
+        if self.observe not in rpc_client.listeners:
+            rpc_client.listeners.append(self.observe)
+
+    def observe(self, rpc_client, method: str, latency: float, error: Optional[Exception]) -> None:
+        if error is None or is_rpc_error(error):
+            self.record_success(rpc_client.net_name, latency)
+        else:
+            self.record_failure(rpc_client.net_name, error)
+
+    def record_success(self, net_name: str, latency: float) -> None:
+        health = self.get(net_name)
+        health.last_checked = time.time()
+        health.latency = latency if health.latency is None else LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * health.latency
+        health.error_rate *= (1 - ERROR_RATE_ALPHA)
+        health.consecutive_failures = 0
+        if health.breaker == BREAKER_HALF_OPEN:
+            health.breaker = BREAKER_CLOSED
+            logger.info(f"Circuit breaker for {net_name} closed; RPC is back up.")
+
+    def record_failure(self, net_name: str, error: Exception) -> None:
+        health = self.get(net_name)
+        health.last_checked = time.time()
+        health.last_error = str(error) or type(error).__name__
+        health.error_rate = ERROR_RATE_ALPHA + (1 - ERROR_RATE_ALPHA) * health.error_rate
+        health.consecutive_failures += 1
+        if health.breaker == BREAKER_HALF_OPEN or (
+                health.breaker == BREAKER_CLOSED and health.consecutive_failures >= BREAKER_FAILURE_THRESHOLD):
+            health.breaker = BREAKER_OPEN
+            health.opened_at = time.monotonic()
+            logger.warning(f"Circuit breaker for {net_name} opened after {health.consecutive_failures} failures: {health.last_error}")
+
+    async def probe(self, net_name: str) -> None:
+        """Checks one network with a cheap eth_blockNumber call to each of its endpoints."""
+        rpc_client = self.rpc_clients.get(net_name)
+        if rpc_client is None:
+            return
+        health = self.get(net_name)
+        if health.breaker == BREAKER_OPEN:
+            if time.monotonic() - health.opened_at < BREAKER_RESET_TIMEOUT:
+                return
+            health.breaker = BREAKER_HALF_OPEN
+        try:
+            # Measures every endpoint of the network; the outcome is recorded through observe()
+            await rpc_client.probe_endpoints(timeout=self.probe_timeout)
+        except Exception:
+            pass
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(net_name) for net_name in list(self.rpc_clients)))
+
+    def start(self) -> None:
+        for rpc_client in self.rpc_clients.values():
+            self.watch(rpc_client)
+        self._task = asyncio.create_task(self._probe_loop(), name='rpc-health-monitor')
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _probe_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"RPC health probe loop failed: {e}")
+            await asyncio.sleep(self.probe_interval)
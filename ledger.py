@@ -0,0 +1,109 @@
+"""Append-only ledger of every payout the bot sends."""
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the ledger segment files
+LEDGER_DIR = os.getenv('LEDGER_DIR', 'claim_ledger')
+# A new segment is started once the current one reaches this size (bytes)
+LEDGER_SEGMENT_MAX_BYTES = int(os.getenv('LEDGER_SEGMENT_MAX_BYTES', str(64 * 1024 * 1024)))
+# How often buffered records are written out (seconds)
+LEDGER_FLUSH_INTERVAL = float(os.getenv('LEDGER_FLUSH_INTERVAL', '1'))
+
+SEGMENT_PATTERN = 'claims-*.jsonl'
+
+
+def segment_paths(directory: str = LEDGER_DIR) -> list:
+    """Returns the ledger's segment files, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def iter_records(directory: str = LEDGER_DIR):
+    """Yields every ledger record, oldest first, without loading whole segments into memory."""
+    for path in segment_paths(directory):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ClaimLedger:
+    """Buffered writer for the payout ledger.
+
+    `record()` only appends to an in-memory buffer, so it is safe to call
+    from handlers. A background task writes the buffer to the current
+    segment file off the event loop and rotates segments by size.
+    """
+
+    def __init__(self, directory: str = LEDGER_DIR, segment_max_bytes: int = LEDGER_SEGMENT_MAX_BYTES,
+                 flush_interval: float = LEDGER_FLUSH_INTERVAL):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        os.makedirs(directory, exist_ok=True)
+        existing = segment_paths(directory)
+        self._segment_index = int(os.path.basename(existing[-1])[len('claims-'):-len('.jsonl')]) if existing else 1
+
+    def _segment_path(self) -> str:
+        return os.path.join(self.directory, f"claims-{self._segment_index:06d}.jsonl")
+
+    def record(self, **fields) -> None:
+        """Buffers one ledger record. `recorded_at` is added automatically."""
+        fields.setdefault('recorded_at', time.time())
+        self._buffer.append(json.dumps(fields, default=str))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._flush_loop(), name='claim-ledger-flush')
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush claim ledger: {e}")
+
+    async def flush(self) -> None:
+        """Writes buffered records to disk."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            try:
+                await asyncio.to_thread(self._write, lines)
+            except Exception:
+                # Keep the records for the next attempt rather than dropping them
+                self._buffer[:0] = lines
+                raise
+
+    def _write(self, lines: list) -> None:
+        path = self._segment_path()
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+            self._segment_index += 1
+            path = self._segment_path()
+            logger.info(f"Claim ledger rotated to {path}")
+        with open(path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+if __name__ == '__main__':
+    # Streams the ledger as JSON lines, e.g. `python ledger.py | jq 'select(.status == "failed")'`
+    for ledger_record in iter_records(sys.argv[1] if len(sys.argv) > 1 else LEDGER_DIR):
+        print(json.dumps(ledger_record))
@@ -1,13 +1,39 @@
+import asyncio
+import importlib
 import logging
-import asyncio 
-import json
 import os
+import sys
+import time
+
+# Taken before the third-party imports below, so the startup timing report covers them
+STARTUP_STARTED = time.monotonic()
+
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ConversationHandler, ContextTypes
-from web3 import Web3
+from telegram.ext import Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters, ConversationHandler, ContextTypes
+from eth_utils import from_wei, is_address, to_checksum_address, to_wei
 from telegram.helpers import escape_markdown
 
+from rpc import RpcClient, endpoints_from_config
+from nonces import is_nonce_error
+from payouts import PayoutDispatcher, PayoutRequest
+from storage import Storage
+from ledger import ClaimLedger
+from balances import BalanceCache, format_age
+from health import HealthMonitor
+from fees import FeeOracle
+from receipts import ReceiptTracker, STATUS_CONFIRMED, STATUS_FAILED
+from signing import TransactionSigner
+from wallets import WalletPool, wallets_from_config, short_address
+from broadcast import BroadcastEngine
+from membership import MembershipCache
+from webhook import run_webhook
+from state import create_state_backend
+import metrics
+from profiling import StackSampler, MemoryProfiler, dump_task_stacks, PROFILE_MAX_SECONDS
+from floodcontrol import FloodControl
+from menus import NetworkMenus
+
 load_dotenv()
 
 from config import (
@@ -30,95 +56,306 @@ AWAITING_TWITTER_POST_LINK, \
 AWAITING_LABUBU_SCREENSHOT = range(5, 13)
 AWAITING_CHANNEL_JOIN = 13
 
-# Dictionary to hold web3 instances
-w3_instances = {}
-
-# Name of the JSON file for user data
+# How updates are received: 'polling' (default) or 'webhook' (see webhook.py for its settings)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+# Only the update types our handlers consume are requested from Telegram
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+# Updates processed at the same time; 1 (PTB's default) handles them strictly one after another
+BOT_CONCURRENT_UPDATES = int(os.getenv('BOT_CONCURRENT_UPDATES', '1'))
+
+# Prerendered network menus, rebuilt whenever network_configs is reloaded
+network_menus = NetworkMenus(network_configs)
+# Serializes /reload_networks runs
+network_reload_lock = asyncio.Lock()
+# Seconds replaced RPC clients stay open after a reload, so calls already using them can finish
+NETWORK_RELOAD_CLOSE_DELAY = 30
+# How long startup waits for a network's RPC and nonces before moving on (seconds); a network that
+# misses it stays configured, the health monitor keeps probing it and its nonces are read on first use
+STARTUP_PROBE_DEADLINE = float(os.getenv('STARTUP_PROBE_DEADLINE', '5'))
+# Modules only needed once networks connect; warm-up imports them in a thread instead of delaying startup
+DEFERRED_IMPORTS = ('web3', 'eth_account')
+# Seconds after STARTUP_STARTED at which each startup phase finished, in order
+startup_phases = {}
+# Dictionary to hold async RPC clients, keyed by network name
+rpc_clients = {}
+# Sender wallets of each network, each with its own nonce allocator, keyed by network name
+wallet_pools = {}
+# Sender wallet addresses per network, read by the balance cache
+sender_addresses = {}
+# Per-network payout queues, created in post_init once the event loop is running
+payout_dispatcher = None
+# Append-only record of every payout, opened in post_init
+claim_ledger = None
+# Sender wallet balances per network, refreshed in the background
+balance_cache = None
+# RPC status and circuit breaker per network, kept current in the background
+health_monitor = None
+# Cached gas/EIP-1559 fee estimates per network
+fee_oracle = None
+# Receipt polling and stuck-transaction replacement for every sent transaction
+receipt_tracker = None
+# Thread or process pool that signs transactions off the event loop
+transaction_signer = None
+# Background broadcast jobs, resumed on restart
+broadcast_engine = None
+# Background network warm-up started by post_init
+warm_up_task = None
+# Prometheus-style metrics endpoint, only started when METRICS_PORT is set
+metrics_server = None
+
+# SQLite database holding user records and redeemed addresses
+DATABASE_FILE = os.getenv('DATABASE_FILE', 'faucet_bot.db')
+# Storage backend, opened by init_db()
+storage = None
+
+# Legacy JSON files, migrated into DATABASE_FILE on first start
 USER_DATA_FILE = 'user_data.json'
-# Global dictionary to hold user data loaded from JSON
-user_data_cache = {}
-
-# NEW: Name of the JSON file for redeemed addresses
 REDEEMED_ADDRESSES_FILE = 'redeemed_addresses.json'
-# NEW: Global dictionary to hold redeemed addresses mapped to user IDs
-redeemed_addresses_cache = {}
 
+# Users, claim cooldowns, redeemed addresses, pending task verifications and the
+# maintenance flag; shared between bot instances when STATE_BACKEND=redis (see state.py)
+state = None
 
-# Global dictionary to hold pending task verifications for admin approval
-pending_task_verifications = {}
+# Cached channel membership answers and channel title/invite link
+membership_cache = MembershipCache(CHANNEL_ID)
+
+# On-demand profilers behind the owner's /profile and /memsnap commands
+stack_sampler = StackSampler()
+memory_profiler = MemoryProfiler()
+# Per-user token buckets and the cap on concurrently running expensive handlers
+flood_control = FloodControl()
 
 # Constants for the Get More Tokens task
 TWITTER_PROFILES_TO_FOLLOW_1 = "@Petruk_Star_"
 TWITTER_PROFILES_TO_FOLLOW_2 = "@IkySyptraa"
+# completed_tasks entry marking that a user has been rewarded for the Get More Tokens task
+REWARD_TASK_NAME = 'get_more_tokens_main_task'
+# Submissions shown per /review page
+REVIEW_PAGE_SIZE = 10
+# How long a user must wait between faucet claims of the same token (seconds)
+CLAIM_COOLDOWN_SECONDS = 86400
 PROMOTION_HASHTAGS = "#faucet #ethsepolia #pharos #ethholesky #ethbase #monad #xrplevm #lineasepolia #arbitrumsepolia #megaethtestnet"
 
 
-def init_web3_instances():
-    """Initializes Web3 instances for each network."""
-    for net_name, config in network_configs.items():
-        try:
-            w3_instances[net_name] = Web3(Web3.HTTPProvider(config['rpc_url']))
-            if not w3_instances[net_name].is_connected():
-                logger.warning(f"Failed to connect to {net_name} at {config['rpc_url']}")
+def sender_keys(configs: dict) -> dict:
+    """Returns the private keys of every network's sender wallets, by address."""
+    return {address: private_key for config in configs.values()
+            for address, private_key in wallets_from_config(config, SENDER_ADDRESS, SENDER_PRIVATE_KEY)}
+
+def nonce_counters(config: dict):
+    """Returns the WalletPool factory for a network's nonce counters, shared with other instances in Redis mode."""
+    return lambda address: state.nonce_counter(config['chain_id'], address)
+
+async def start_rpc_client(net_name: str, config: dict, deadline: float = None) -> tuple:
+    """Creates and connects one network's RPC client and sender wallets. Returns (client, wallet_pool).
+
+    With a `deadline`, the connection check and nonce sync are abandoned
+    after that many seconds. A failed check is logged and the client is
+    returned either way.
+    """
+    client = RpcClient(net_name, endpoints_from_config(config))
+    await client.start()
+    try:
+        wallet_pool = WalletPool(net_name, client, wallets_from_config(config, SENDER_ADDRESS, SENDER_PRIVATE_KEY),
+                                 nonce_counter=nonce_counters(config))
+    except Exception:
+        await client.close()
+        raise
+    try:
+        async with asyncio.timeout(deadline):
+            if not await client.is_connected():
+                logger.warning(f"Failed to connect to {net_name} at {', '.join(client.rpc_urls)}")
             else:
-                logger.info(f"Connected to {net_name} RPC.")
-        except Exception as e:
-            logger.error(f"Error initializing Web3 for {net_name}: {e}")
+                logger.info(f"Connected to {net_name} RPC ({len(client.endpoints)} endpoints, {len(wallet_pool.wallets)} sender wallets).")
+                await wallet_pool.sync()
+    except TimeoutError:
+        logger.warning(f"{net_name} RPC did not answer within {deadline}s; its nonces will be read on first use.")
+    except Exception as e:
+        logger.warning(f"Could not check {net_name} RPC: {e}; its nonces will be read on first use.")
+    return client, wallet_pool
 
-def load_user_data():
-    """Loads user data from the JSON file."""
-    global user_data_cache
-    if os.path.exists(USER_DATA_FILE):
-        with open(USER_DATA_FILE, 'r') as f:
-            try:
-                user_data_cache = json.load(f)
-                logger.info(f"Loaded {len(user_data_cache)} user records from {USER_DATA_FILE}")
-            except json.JSONDecodeError:
-                logger.warning(f"Error decoding JSON from {USER_DATA_FILE}. Starting with empty data.")
-                user_data_cache = {}
-    else:
-        logger.info(f"No {USER_DATA_FILE} found. Starting with empty user data.")
-        user_data_cache = {}
-
-def save_user_data():
-    """Saves user data to the JSON file."""
-    with open(USER_DATA_FILE, 'w') as f:
-        json.dump(user_data_cache, f, indent=4)
-
-# NEW: Functions for redeemed addresses persistence
-def load_redeemed_addresses():
-    """Loads redeemed addresses from the JSON file."""
-    global redeemed_addresses_cache
-    if os.path.exists(REDEEMED_ADDRESSES_FILE):
-        with open(REDEEMED_ADDRESSES_FILE, 'r') as f:
-            try:
-                redeemed_addresses_cache = json.load(f)
-                logger.info(f"Loaded {len(redeemed_addresses_cache)} redeemed address records from {REDEEMED_ADDRESSES_FILE}")
-            except json.JSONDecodeError:
-                logger.warning(f"Error decoding JSON from {REDEEMED_ADDRESSES_FILE}. Starting with empty redeemed addresses data.")
-                redeemed_addresses_cache = {}
-    else:
-        logger.info(f"No {REDEEMED_ADDRESSES_FILE} found. Starting with empty redeemed addresses data.")
-        redeemed_addresses_cache = {}
+async def init_rpc_clients() -> int:
+    """Connects every network's RPC client at once, each bounded by STARTUP_PROBE_DEADLINE.
 
-def save_redeemed_addresses():
-    """Saves redeemed addresses to the JSON file."""
-    with open(REDEEMED_ADDRESSES_FILE, 'w') as f:
-        json.dump(redeemed_addresses_cache, f, indent=4)
+    Runs inside the bot's event loop. Returns the number of networks started.
+    """
+    net_names = list(network_configs)
+    results = await asyncio.gather(
+        *(start_rpc_client(net_name, network_configs[net_name], STARTUP_PROBE_DEADLINE) for net_name in net_names),
+        return_exceptions=True
+    )
+    for net_name, result in zip(net_names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error initializing RPC client for {net_name}: {result}")
+            continue
+        client, wallet_pool = result
+        rpc_clients[net_name] = client
+        wallet_pools[net_name] = wallet_pool
+        sender_addresses[net_name] = wallet_pool.addresses
+        health_monitor.watch(client)
+        if metrics.METRICS_PORT:
+            client.listeners.append(metrics.observe_rpc)
+    return sum(not isinstance(result, Exception) for result in results)
+
+async def close_rpc_clients():
+    """Closes the pooled HTTP sessions of all RPC clients."""
+    for client in rpc_clients.values():
+        await client.close()
+
+def load_network_configs() -> dict:
+    """Re-reads network_configs from config.py."""
+    return importlib.reload(sys.modules['config']).network_configs
+
+async def close_retired_rpc_clients(clients: list) -> None:
+    """Closes replaced RPC clients once requests already using them have had time to finish."""
+    try:
+        await asyncio.sleep(NETWORK_RELOAD_CLOSE_DELAY)
+    finally:
+        for client in clients:
+            await client.close()
+
+async def reload_network_configs(new_configs: dict, application: Application) -> dict:
+    """Swaps in a new network_configs, reconnecting only networks whose RPC endpoints changed.
+
+    Replacement clients are connected before anything is swapped, and the
+    swap itself never awaits, so handlers see either the old or the new
+    configuration, never a mix. If a client cannot be started nothing is
+    changed. Returns the added, removed, changed and reconnected networks.
+    """
+    global network_menus
+    async with network_reload_lock:
+        for net_name, config in new_configs.items():
+            endpoints_from_config(config)
+            if 'chain_id' not in config:
+                raise ValueError(f"Network '{net_name}' has no chain_id.")
+        new_keys = sender_keys(new_configs)
+        added = [net_name for net_name in new_configs if net_name not in network_configs]
+        removed = [net_name for net_name in network_configs if net_name not in new_configs]
+        changed = [net_name for net_name in new_configs
+                   if net_name in network_configs and new_configs[net_name] != network_configs[net_name]]
+        reconnect = added + [
+            net_name for net_name in changed
+            if net_name not in rpc_clients or endpoints_from_config(new_configs[net_name]) != endpoints_from_config(network_configs[net_name])
+        ]
+
+        results = await asyncio.gather(*(start_rpc_client(net_name, new_configs[net_name]) for net_name in reconnect), return_exceptions=True)
+        failed = [(net_name, result) for net_name, result in zip(reconnect, results) if isinstance(result, Exception)]
+        if failed:
+            for result in results:
+                if not isinstance(result, Exception):
+                    await result[0].close()
+            raise RuntimeError(', '.join(f"{net_name}: {error}" for net_name, error in failed))
+        started = dict(zip(reconnect, results))
+
+        # Networks keeping their client but not their wallets get a new pool; kept wallets keep their nonces
+        rewalleted = {}
+        for net_name in changed:
+            wallets = wallets_from_config(new_configs[net_name], SENDER_ADDRESS, SENDER_PRIVATE_KEY)
+            if net_name in started or [address for address, _ in wallets] == wallet_pools[net_name].addresses:
+                continue
+            previous = wallet_pools[net_name]
+            rewalleted[net_name] = WalletPool(net_name, previous.rpc_client, wallets, previous, nonce_counters(new_configs[net_name]))
+            await rewalleted[net_name].sync([address for address, _ in wallets if address not in previous.addresses])
+
+        # Everything below up to the payout removal runs without yielding to the event loop
+        retired = [rpc_clients.pop(net_name) for net_name in (*removed, *started) if net_name in rpc_clients]
+        for net_name in removed:
+            wallet_pools.pop(net_name, None)
+            sender_addresses.pop(net_name, None)
+        for net_name, wallet_pool in rewalleted.items():
+            wallet_pools[net_name] = wallet_pool
+            sender_addresses[net_name] = wallet_pool.addresses
+        transaction_signer.set_keys(new_keys)
+        for net_name, (client, wallet_pool) in started.items():
+            rpc_clients[net_name] = client
+            wallet_pools[net_name] = wallet_pool
+            sender_addresses[net_name] = wallet_pool.addresses
+            health_monitor.watch(client)
+            if metrics.METRICS_PORT:
+                client.listeners.append(metrics.observe_rpc)
+        network_configs.clear()
+        network_configs.update(new_configs)
+        network_menus = NetworkMenus(network_configs)
+        for net_name in (*removed, *changed):
+            fee_oracle.forget(net_name)
+        for net_name in removed:
+            receipt_tracker.forget(net_name)
+        for net_name in (*removed, *started):
+            health_monitor.forget(net_name)
+            balance_cache.forget(net_name)
+        payout_dispatcher.start(network_configs)
+
+        for net_name in removed:
+            await payout_dispatcher.remove(net_name)
+        for net_name in (*started, *rewalleted):
+            application.create_task(balance_cache.refresh(net_name))
+        if retired:
+            application.create_task(close_retired_rpc_clients(retired))
+        logger.info(f"Network config reloaded: added {added}, removed {removed}, changed {changed}, "
+                    f"reconnected {list(started)}, new wallets {list(rewalleted)}.")
+        return {'added': added, 'removed': removed, 'changed': changed, 'reconnected': list(started), 'rewalleted': list(rewalleted)}
+
+async def prune_user(user_id_str: str):
+    """Removes a user who blocked the bot from the shared state and the database."""
+    await state.delete_user(user_id_str)
+    logger.info(f"Pruned user {user_id_str} (blocked the bot or deleted their account).")
+
+def mark_startup_phase(phase: str) -> None:
+    startup_phases[phase] = time.monotonic() - STARTUP_STARTED
+
+def startup_report() -> str:
+    """Returns how long each startup phase so far took, e.g. "imports 0.71s, database 0.02s"."""
+    previous, parts = 0.0, []
+    for phase, finished_at in startup_phases.items():
+        parts.append(f"{phase} {finished_at - previous:.2f}s")
+        previous = finished_at
+    return ', '.join(parts)
 
 def init_db():
-    """Initializes database related data (loads from JSON files)."""
-    load_user_data()
-    load_redeemed_addresses() # NEW: Load redeemed addresses
-    logger.info("Database initialized (loaded from JSON).")
+    """Initializes the database, migrating legacy JSON files on first start, and selects the state backend."""
+    global storage, state
+    storage = Storage(DATABASE_FILE)
+    storage.migrate_from_json(USER_DATA_FILE, REDEEMED_ADDRESSES_FILE)
+    storage.normalize_redeemed_addresses()
+    storage.prune_address_claims(time.time() - CLAIM_COOLDOWN_SECONDS)
+    # The backend loads (or seeds) its state in post_init, once the event loop is running
+    state = create_state_backend(storage, CLAIM_COOLDOWN_SECONDS)
+    logger.info(f"Database initialized ({DATABASE_FILE}).")
 
 # --- BOT HANDLER FUNCTIONS ---
 # All handler functions are defined BEFORE main() to ensure proper scope
 # This section has been reordered to ensure all handlers are defined before main()
 
+# Reply keyboard texts of the main menu, and those whose handlers cost RPC or payout work
+MAIN_MENU_TEXTS = ("Faucet 🤖", "Balance 💰", "Purchase Token 💳", "Get More Tokens ☕")
+EXPENSIVE_MENU_TEXTS = ("Balance 💰",)
+
+def classify_update(update: Update) -> str:
+    """Returns the flood-control action class of an update."""
+    if update.callback_query:
+        return 'button'
+    message = update.effective_message
+    text = message.text if message else None
+    if text:
+        if text in EXPENSIVE_MENU_TEXTS or is_address(text.strip()):
+            # Addresses are only ever sent to start a claim or a reward
+            return 'expensive'
+        if text.startswith('/') or text in MAIN_MENU_TEXTS:
+            return 'command'
+    return 'message'
+
+async def flood_control_gate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Runs before every other handler and drops updates from users over their rate."""
+    user = update.effective_user
+    if user is None or is_owner(user.id):
+        return
+    if not flood_control.allow(user.id, classify_update(update)):
+        await flood_control.notify(update)
+        raise ApplicationHandlerStop
+
 async def check_maintenance_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Checks if the bot is in maintenance mode."""
-    if context.application.user_data.get('maintenance_mode', False):
+    if state.is_maintenance():
         user_id = update.effective_user.id
         if is_owner(user_id):
             return False
@@ -155,15 +392,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id_str = str(update.effective_user.id)
     
     # Record user regardless of channel join status for broadcast list
-    if user_id_str not in user_data_cache:
-        user_data_cache[user_id_str] = {
-            'username': update.effective_user.username,
-            'full_name': update.effective_user.full_name,
-            'first_interaction': update.message.date.timestamp(),
-            'last_claim_times': {}, 
-            'completed_tasks': {}    
-        }
-        save_user_data()
+    if await state.add_user(user_id_str, {
+        'username': update.effective_user.username,
+        'full_name': update.effective_user.full_name,
+        'first_interaction': update.message.date.timestamp(),
+        'last_claim_times': {},
+        'completed_tasks': {}
+    }):
         logger.info(f"New user recorded: {user_id_str} ({update.effective_user.full_name})")
 
     # --- Channel Verification Logic ---
@@ -174,16 +409,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return ConversationHandler.END
 
     try:
-        chat_member = await context.bot.get_chat_member(chat_id=CHANNEL_ID, user_id=update.effective_user.id)
-        if chat_member.status in ['member', 'creator', 'administrator']:
+        if await membership_cache.is_member(context.bot, update.effective_user.id):
             # User is a member, proceed to main menu
             await send_main_menu(update, context)
             return ConversationHandler.END
         else:
             # User is not a member, ask them to join
-            chat_info = await context.bot.get_chat(chat_id=CHANNEL_ID)
-            # Ensure invite_link is generated or default to public username link
-            invite_link = chat_info.invite_link if chat_info.invite_link else f"https://t.me/{chat_info.username}"
+            channel_title, invite_link = await membership_cache.get_channel_info(context.bot)
             
             keyboard = [
                 [InlineKeyboardButton("Join Channel Here 🚀", url=invite_link)],
@@ -192,7 +424,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             await update.message.reply_text(
-                f"👋 Welcome! Before you can use the bot, you must join our official channel: **{chat_info.title}**.\n\n"
+                f"👋 Welcome! Before you can use the bot, you must join our official channel: **{channel_title}**.\n\n"
                 "Please click the button below to join, then click 'I Have Joined ✅'.",
                 reply_markup=reply_markup,
                 parse_mode='Markdown',
@@ -217,15 +449,14 @@ async def check_channel_membership(update: Update, context: ContextTypes.DEFAULT
         return ConversationHandler.END
 
     try:
-        chat_member = await context.bot.get_chat_member(chat_id=CHANNEL_ID, user_id=user_id)
-        if chat_member.status in ['member', 'creator', 'administrator']:
+        # The user says they just joined, so a cached "not a member" answer is re-checked
+        if await membership_cache.is_member(context.bot, user_id, recheck_negative=True):
             await query.edit_message_text("✅ Membership verification successful!")
             await send_main_menu(update, context)
             return ConversationHandler.END
         else:
             # Still not a member, remind them
-            chat_info = await context.bot.get_chat(chat_id=CHANNEL_ID)
-            invite_link = chat_info.invite_link if chat_info.invite_link else f"https://t.me/{chat_info.username}"
+            channel_title, invite_link = await membership_cache.get_channel_info(context.bot)
             
             keyboard = [
                 [InlineKeyboardButton("Join Channel Here 🚀", url=invite_link)],
@@ -234,7 +465,7 @@ async def check_channel_membership(update: Update, context: ContextTypes.DEFAULT
             reply_markup = InlineKeyboardMarkup(keyboard)
 
             await query.edit_message_text(
-                f"You have not joined the channel **{chat_info.title}**. Please join first.\n\n"
+                f"You have not joined the channel **{channel_title}**. Please join first.\n\n"
                 "After joining, click 'I Have Joined ✅' again.",
                 reply_markup=reply_markup,
                 parse_mode='Markdown',
@@ -264,17 +495,8 @@ async def handle_faucet_button(update: Update, context: ContextTypes.DEFAULT_TYP
     if await check_maintenance_mode(update, context):
         return ConversationHandler.END
 
-    keyboard = []
-    for net_name, config in network_configs.items():
-        if config.get('faucet_enabled', False):
-            display_name = config.get('display_name', net_name.replace('_', ' ').title())
-            button_text = f"Claim {display_name}"
-            keyboard.append([InlineKeyboardButton(button_text, callback_data=f'claim_token_{net_name}')])
-    
-    keyboard.append([InlineKeyboardButton("How to use? 🆘", callback_data='how_to_use_faucet')])
-    keyboard.append([InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='back_to_start')])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+    reply_markup = network_menus.faucet_markup(health_monitor.is_available)
+
     if update.callback_query:
         await update.callback_query.edit_message_text(
             "Please select which testnet token you want to claim:",
@@ -318,6 +540,9 @@ async def handle_claim_button(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
 
     token_type_raw = query.data.replace('claim_token_', '')
+    if not health_monitor.is_available(token_type_raw):
+        await query.edit_message_text("Faucet for this token is currently unavailable. Please try again later.")
+        return ConversationHandler.END
     context.user_data['token_type_claim'] = token_type_raw
     
     config = network_configs.get(token_type_raw, {})
@@ -329,49 +554,187 @@ async def handle_claim_button(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     return AWAITING_CLAIM_ADDRESS
 
-async def send_native_token(w3_instance: Web3, recipient_address: str, amount_eth: float, chain_id: int, net_name: str, context: ContextTypes.DEFAULT_TYPE) -> str:
-    """Sends native token to the given address. (FULLY CORRECTED)"""
-    try:
-        if not w3_instance.is_connected():
-            return f"ERROR: Not connected to {net_name} network."
+async def send_from_wallet(rpc_client: RpcClient, wallet, transfers: list, chain_id: int, net_name: str, fee_estimate) -> list:
+    """Sends (recipient_address, amount_eth, on_final) transfers from one wallet as one run of nonces.
 
-        gas_price = w3_instance.eth.gas_price
-        gas_limit = 21000
-        amount_wei = w3_instance.to_wei(amount_eth, 'ether')
-        nonce = w3_instance.eth.get_transaction_count(SENDER_ADDRESS)
+    The run is signed in a single signing-pool call, then broadcast in
+    nonce order. Returns the tx hash of each transfer, or a string starting
+    with "ERROR:".
+    """
+    results = [None] * len(transfers)
+    gas_limit = 21000
+    nonce_manager = wallet.nonce_manager
+    try:
+        pending = list(range(len(transfers)))
+        # One retry of the unsent rest after resyncing the nonce in case another sender used the wallet
+        for attempt in range(2):
+            nonces = await nonce_manager.allocate_many(len(pending))
+            transactions = [{
+                'from': wallet.address, 'to': transfers[i][0], 'value': to_wei(transfers[i][1], 'ether'),
+                'gas': gas_limit, 'nonce': nonce, 'chainId': chain_id,
+                **fee_estimate.tx_fields()
+            } for i, nonce in zip(pending, nonces)]
+            try:
+                raw_transactions = await transaction_signer.sign_batch(transactions)
+            except Exception:
+                for nonce in reversed(nonces):
+                    await nonce_manager.release(nonce)
+                raise
+
+            retry = []
+            for position, (i, transaction, raw_transaction) in enumerate(zip(pending, transactions, raw_transactions)):
+                try:
+                    results[i] = await rpc_client.send_raw_transaction(raw_transaction)
+                except Exception as e:
+                    # Later nonces of the run would wait behind the gap, so they are given back and re-sent
+                    for nonce in reversed(nonces[position:]):
+                        await nonce_manager.release(nonce)
+                    if attempt == 0 and is_nonce_error(e):
+                        logger.warning(f"Nonce {transaction['nonce']} of {wallet.address} rejected on {net_name} ({e}). Resyncing and retrying.")
+                        await nonce_manager.sync()
+                        retry = pending[position:]
+                    else:
+                        logger.error(f"Error sending native token from {wallet.address} on {net_name}: {e}")
+                        results[i] = f"ERROR: {e}"
+                        retry = pending[position + 1:]
+                    break
+                nonce_manager.mark_sent(transaction['nonce'])
+                receipt_tracker.track(net_name, transaction, results[i], transfers[i][2])
+            pending = retry
+            if not pending:
+                break
+    except Exception as e:
+        logger.error(f"Error sending native token from {wallet.address} on {net_name}: {e}")
+        return [result if result is not None else f"ERROR: {e}" for result in results]
+    return [result if result is not None else "ERROR: Not sent because an earlier transaction in its batch failed."
+            for result in results]
+
+async def send_native_tokens(rpc_client: RpcClient, transfers: list, chain_id: int, net_name: str,
+                             context: ContextTypes.DEFAULT_TYPE) -> list:
+    """Sends a batch of (recipient_address, amount_eth, on_final) transfers and hands them to the receipt tracker.
+
+    Transfers are spread over the network's sender wallets by balance and
+    pending transactions; each wallet's share goes out as one nonce run, and
+    the wallets send in parallel. Returns the tx hash of each transfer, or
+    a string starting with "ERROR:". `on_final(tracked, status, receipt)`
+    is awaited once a transaction is confirmed, failed, dropped or given up on.
+    """
+    if not health_monitor.is_available(net_name):
+        return [f"ERROR: Not connected to {net_name} network."] * len(transfers)
+    try:
+        # Fees come from the background-refreshed oracle, so no gas price round trip is made here
+        fee_estimate = await fee_oracle.get(net_name)
+    except Exception as e:
+        logger.error(f"Error sending native token on {net_name}: {e}")
+        return [f"ERROR: {e}"] * len(transfers)
+
+    wallet_pool = wallet_pools[net_name]
+    amounts_wei = [to_wei(amount_eth, 'ether') for _, amount_eth, _ in transfers]
+    wallets = wallet_pool.assign(
+        amounts_wei,
+        balance_of=lambda address: balance_cache.get_wallet(net_name, address),
+        in_flight_of=lambda address: receipt_tracker.in_flight(net_name, address)
+    )
 
-        transaction = {
-            'from': SENDER_ADDRESS, 'to': recipient_address, 'value': amount_wei,
-            'gas': gas_limit, 'gasPrice': gas_price, 'nonce': nonce, 'chainId': chain_id
-        }
+    shares = {}
+    for i, wallet in enumerate(wallets):
+        shares.setdefault(wallet.address, (wallet, []))[1].append(i)
+    results = [None] * len(transfers)
 
-        signed_txn = w3_instance.eth.account.sign_transaction(transaction, private_key=SENDER_PRIVATE_KEY)
-        
-        tx_hash = w3_instance.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_hash_hex = w3_instance.to_hex(tx_hash)
+    async def send_share(wallet, indices):
+        share = [transfers[i] for i in indices]
+        for i, result in zip(indices, await send_from_wallet(rpc_client, wallet, share, chain_id, net_name, fee_estimate)):
+            results[i] = result
+            wallet_pool.release(wallet, amounts_wei[i], sent="ERROR:" not in result)
+    await asyncio.gather(*(send_share(wallet, indices) for wallet, indices in shares.values()))
 
-        config = network_configs.get(net_name, {})
-        display_name = config.get('display_name', net_name.replace('_', ' ').title())
-        currency_symbol = config.get('currency_symbol', 'TOKEN')
-        
+    config = network_configs.get(net_name, {})
+    display_name = config.get('display_name', net_name.replace('_', ' ').title())
+    currency_symbol = config.get('currency_symbol', 'TOKEN')
+    for (recipient_address, amount_eth, _), wallet, tx_hash_hex in zip(transfers, wallets, results):
+        if not ADMIN_NOTIF_ID or "ERROR:" in tx_hash_hex:
+            continue
         notification_message = (
             f"💸 **Outgoing Transaction Sent!**\n"
             f"Network: **{display_name}**\n"
             f"Amount: `{amount_eth:.4f} {currency_symbol}`\n"
+            + (f"From: `{wallet.address}`\n" if len(wallet_pool.wallets) > 1 else "") +
             f"To: `{recipient_address}`\n"
             f"Tx Hash: [`{tx_hash_hex}`]({config.get('explorer_url', '')}/tx/{tx_hash_hex})"
         )
-        if ADMIN_NOTIF_ID:
+        try:
             await context.bot.send_message(
                 chat_id=ADMIN_NOTIF_ID, text=notification_message,
                 parse_mode='Markdown', disable_web_page_preview=True
             )
             logger.info(f"Sent outgoing transaction notification to admin: {tx_hash_hex}")
+        except Exception as e:
+            logger.warning(f"Could not notify admin of {tx_hash_hex}: {e}")
+    return results
+
+async def notify_payout_final(payout: PayoutRequest, tracked, status: str, receipt) -> None:
+    """Records how a sent payout ended and tells the user (and the admin, unless it confirmed)."""
+    tx_hash = tracked.mined_hash or tracked.tx_hash
+    block = int(receipt['blockNumber'], 16) if receipt else None
+    claim_ledger.record(
+        user_id=payout.user_id, kind=payout.kind, network=payout.net_name,
+        address=payout.recipient_address, amount=payout.amount, tx_hash=tx_hash, status=status,
+        sender=tracked.transaction['from'], replaced=tracked.tx_hashes[:-1] or None, block=block, queued_at=payout.enqueued_at
+    )
+    config = network_configs.get(payout.net_name, {})
+    currency_symbol = config.get('currency_symbol', 'TOKEN')
+    tx_link = f"[`{tx_hash}`]({config.get('explorer_url', '')}/tx/{tx_hash})"
+    if status == STATUS_CONFIRMED:
+        user_text = f"✅ Your `{payout.amount}` {currency_symbol} transfer to `{payout.recipient_address}` is confirmed (block {block}).\n**Tx Hash**: {tx_link}"
+    elif status == STATUS_FAILED:
+        user_text = f"🚫 Your `{payout.amount}` {currency_symbol} transfer failed on chain.\n**Tx Hash**: {tx_link}\nPlease contact the bot admin: @{OWNER_TELEGRAM_USERNAME}"
+    else:
+        user_text = f"⚠️ Your `{payout.amount}` {currency_symbol} transfer could not be confirmed.\n**Tx Hash**: {tx_link}\nPlease contact the bot admin: @{OWNER_TELEGRAM_USERNAME}"
 
-        return tx_hash_hex
-    except Exception as e:
-        logger.error(f"Error sending native token on {net_name}: {e}")
-        return f"ERROR: {e}"
+    if status != STATUS_CONFIRMED and payout.on_not_confirmed:
+        try:
+            await payout.on_not_confirmed(payout, status)
+        except Exception as e:
+            logger.error(f"Payout rollback failed for {payout.recipient_address} on {payout.net_name}: {e}")
+
+    if payout.context is None:
+        return
+    bot = payout.context.bot
+    recipients = [payout.user_id] if payout.user_id else []
+    if status != STATUS_CONFIRMED and ADMIN_NOTIF_ID and ADMIN_NOTIF_ID not in recipients:
+        recipients.append(ADMIN_NOTIF_ID)
+    for chat_id in recipients:
+        try:
+            await bot.send_message(chat_id=chat_id, text=user_text, parse_mode='Markdown', disable_web_page_preview=True)
+        except Exception as e:
+            logger.warning(f"Could not send {status} notice for {tx_hash} to {chat_id}: {e}")
+
+async def process_payouts(payouts: list) -> list:
+    """Sends a batch of queued payouts of one network. Used as the payout dispatcher's send function."""
+    net_name = payouts[0].net_name
+    rpc_client = rpc_clients.get(net_name)
+    config = network_configs.get(net_name)
+    if not rpc_client or not config:
+        tx_hashes = [f"ERROR: Network '{net_name}' is not configured."] * len(payouts)
+    else:
+        def on_final_for(payout):
+            async def on_final(tracked, status, receipt):
+                await notify_payout_final(payout, tracked, status, receipt)
+            return on_final
+        transfers = [(payout.recipient_address, payout.amount, on_final_for(payout)) for payout in payouts]
+        # Admin notices need a bot; every payout in a batch carries the same one
+        tx_hashes = await send_native_tokens(rpc_client, transfers, config.get('chain_id'), net_name, payouts[0].context)
+
+    sent_at = time.time()
+    for payout, tx_hash in zip(payouts, tx_hashes):
+        failed = "ERROR:" in tx_hash
+        claim_ledger.record(
+            user_id=payout.user_id, kind=payout.kind, network=payout.net_name,
+            address=payout.recipient_address, amount=payout.amount,
+            tx_hash=None if failed else tx_hash, status='failed' if failed else 'sent',
+            error=tx_hash if failed else None, queued_at=payout.enqueued_at, sent_at=sent_at
+        )
+    return tx_hashes
 
 async def handle_claim_address(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handles the wallet address for claiming."""
@@ -386,32 +749,16 @@ async def handle_claim_address(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("Error: Token type not specified. Please start over.")
         return ConversationHandler.END
 
-    if not Web3.is_address(user_address):
+    if not is_address(user_address):
         await update.message.reply_text("That doesn't look like a valid wallet address. Please send a correct one.")
         return AWAITING_CLAIM_ADDRESS
+    # Lowercase addresses are rejected when signing; the checksummed form is also what users see echoed back
+    user_address = to_checksum_address(user_address)
 
-    current_time = update.message.date.timestamp()
-    user_data_cache.setdefault(user_id_str, {})
-    user_data_cache[user_id_str].setdefault('last_claim_times', {})
-
-    last_claim_time_for_token = user_data_cache[user_id_str]['last_claim_times'].get(token_type_claim, 0)
-    
-    if (current_time - last_claim_time_for_token) < 86400: # 24 hours
-        remaining_time = 86400 - (current_time - last_claim_time_for_token)
-        hours, remainder = divmod(remaining_time, 3600)
-        minutes, _ = divmod(remainder, 60)
-        # Fix: Explicitly set parse_mode=None for this plain text message
-        await update.message.reply_text(
-            f"You can only claim this token once every 24 hours. Please wait {int(hours)} hours and {int(minutes)} minutes.",
-            parse_mode=None
-        )
-        context.user_data.clear()
-        return ConversationHandler.END
-
-    w3_instance = w3_instances.get(token_type_claim)
+    rpc_client = rpc_clients.get(token_type_claim)
     config = network_configs.get(token_type_claim)
 
-    if not w3_instance or not config or not w3_instance.is_connected():
+    if not rpc_client or not config or not health_monitor.is_available(token_type_claim):
         await update.message.reply_text(f"Faucet for this token is currently unavailable.")
         context.user_data.clear()
         return ConversationHandler.END
@@ -427,32 +774,78 @@ async def handle_claim_address(update: Update, context: ContextTypes.DEFAULT_TYP
         context.user_data.clear()
         return ConversationHandler.END
 
+    # Check and start the cooldown in one atomic step so repeated submissions (even to
+    # different bot instances) cannot queue duplicate claims; released again on failure
+    current_time = update.message.date.timestamp()
+    reserved, last_claim_time_for_token = await state.reserve_cooldown(user_id_str, token_type_claim, current_time, CLAIM_COOLDOWN_SECONDS)
+
+    if not reserved:
+        remaining_time = CLAIM_COOLDOWN_SECONDS - (current_time - last_claim_time_for_token)
+        hours, remainder = divmod(remaining_time, 3600)
+        minutes, _ = divmod(remainder, 60)
+        # Fix: Explicitly set parse_mode=None for this plain text message
+        await update.message.reply_text(
+            f"You can only claim this token once every 24 hours. Please wait {int(hours)} hours and {int(minutes)} minutes.",
+            parse_mode=None
+        )
+        context.user_data.clear()
+        return ConversationHandler.END
+
+    # The same wallet cannot be topped up again through another Telegram account
+    address_reserved, last_address_claim = await state.reserve_address_claim(
+        token_type_claim, user_address, current_time, CLAIM_COOLDOWN_SECONDS
+    )
+    if not address_reserved:
+        await state.release_cooldown(user_id_str, token_type_claim, current_time, last_claim_time_for_token)
+        remaining_time = CLAIM_COOLDOWN_SECONDS - (current_time - last_address_claim)
+        hours, remainder = divmod(remaining_time, 3600)
+        minutes, _ = divmod(remainder, 60)
+        await update.message.reply_text(
+            f"This address has already received this token in the last 24 hours. "
+            f"Please wait {int(hours)} hours and {int(minutes)} minutes.",
+            parse_mode=None
+        )
+        context.user_data.clear()
+        return ConversationHandler.END
+
     context.user_data['claim_address'] = user_address
 
     # --- START OF MODIFICATION: REMOVING LABUBU BOT TASK VERIFICATION ---
     
-    display_name = config.get('display_name', token_type_claim.replace('_', ' ').title())
     currency_symbol = config.get('currency_symbol', 'TOKEN')
-    chain_id = config.get('chain_id')
+    chat_id = update.effective_chat.id
+
+    async def release_claim(payout: PayoutRequest, status: str = None) -> None:
+        # Nothing reached the user, so neither the account nor the address waits out the cooldown
+        await state.release_cooldown(user_id_str, token_type_claim, current_time, last_claim_time_for_token)
+        await state.release_address_claim(token_type_claim, user_address, current_time, last_address_claim)
 
-    await update.message.reply_text(f"Processing your request to send `{amount_to_send}` {currency_symbol} to `{user_address}`...")
+    async def on_claim_complete(payout: PayoutRequest, tx_hash: str) -> None:
+        if "ERROR:" in tx_hash:
+            await release_claim(payout)
+            await context.bot.send_message(chat_id=chat_id, text=f"Failed to send token. Reason: {tx_hash}")
+        else:
+            explorer_url = config.get('explorer_url')
+            full_tx_url = f"{explorer_url}/tx/{tx_hash}"
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=f"✅ Success! Token sent.\n**Tx Hash**: [`{tx_hash}`]({full_tx_url})",
+                parse_mode='Markdown', disable_web_page_preview=True
+            )
 
-    tx_hash = await send_native_token(w3_instance, user_address, amount_to_send, chain_id, token_type_claim, context)
+    queue_position = payout_dispatcher.submit(PayoutRequest(
+        net_name=token_type_claim, recipient_address=user_address, amount=amount_to_send,
+        kind='faucet', user_id=update.effective_user.id, context=context, on_complete=on_claim_complete,
+        on_not_confirmed=release_claim
+    ))
 
-    if "ERROR:" in tx_hash:
-        await update.message.reply_text(f"Failed to send token. Reason: {tx_hash}")
-    else:
-        explorer_url = config.get('explorer_url')
-        full_tx_url = f"{explorer_url}/tx/{tx_hash}"
-        await update.message.reply_text(
-            f"✅ Success! Token sent.\n**Tx Hash**: [`{tx_hash}`]({full_tx_url})",
-            parse_mode='Markdown', disable_web_page_preview=True
-        )
-        user_data_cache[user_id_str]['last_claim_times'][token_type_claim] = update.message.date.timestamp()
-        save_user_data()
+    await update.message.reply_text(
+        f"Your request to send `{amount_to_send}` {currency_symbol} to `{user_address}` has been queued "
+        f"(position {queue_position}). You will receive the Tx Hash as soon as it is sent."
+    )
 
     context.user_data.clear()
-    return ConversationHandler.END # End the conversation after sending token
+    return ConversationHandler.END # End the conversation after queueing the token send
     
     # --- END OF MODIFICATION ---
 
@@ -477,14 +870,7 @@ async def purchase_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     if query:
         await query.answer()
 
-    keyboard = []
-    for net_name, config in network_configs.items():
-        if config.get('purchase_enabled', False):
-            display_name = config.get('display_name', net_name.replace('_', ' ').title())
-            keyboard.append([InlineKeyboardButton(f"Buy {display_name}", callback_data=f'buy_token_{net_name}')])
-    
-    keyboard.append([InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='back_to_start')])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = network_menus.purchase_markup
     message_text = "Which token would you like to purchase?"
 
     if query:
@@ -531,15 +917,15 @@ async def handle_purchase_amount(update: Update, context: ContextTypes.DEFAULT_T
 
     token_type = context.user_data.get('token_type_purchase')
     config = network_configs.get(token_type, {})
-    w3 = w3_instances.get(token_type)
+    balance_entry = balance_cache.get(token_type)
     display_name = config.get('display_name', 'Token')
     symbol = config.get('balance_symbol', config.get('currency_symbol', 'TOKEN'))
 
-    if not w3 or not w3.is_connected():
+    # Uses the cached balance (even if stale) rather than a live RPC call; this is only a pre-check before the admin is contacted
+    if not balance_entry or balance_entry.balance_wei is None:
         await update.message.reply_text(f"🚫 Apologies! Connection to {display_name} network is unavailable.")
     else:
-        bot_balance_wei = w3.eth.get_balance(SENDER_ADDRESS)
-        bot_balance_eth = w3.from_wei(bot_balance_wei, 'ether')
+        bot_balance_eth = from_wei(balance_entry.balance_wei, 'ether')
 
         if bot_balance_eth < purchase_amount:
             await update.message.reply_text(f"🚫 Apologies! The bot does not have enough **{display_name}** to fulfill your request.", parse_mode='Markdown')
@@ -569,25 +955,12 @@ async def handle_get_more_tokens_button_entry(update: Update, context: ContextTy
     # NEW: Set a flag to indicate if user has completed the main task before.
     # This flag will be used later to inform them about reward eligibility,
     # but it will NOT prevent them from entering the flow.
-    context.user_data['get_more_tokens_reentry'] = user_data_cache.get(user_id_str, {}).get('completed_tasks', {}).get('get_more_tokens_main_task', False)
-
-    keyboard = []
-    for net_name, config in network_configs.items():
-        if config.get('faucet_enabled', False): # Only tokens that can be faucet-ed can be rewards
-            display_name = config.get('display_name', net_name.replace('_', ' ').title())
-            currency_symbol = config.get('currency_symbol', display_name.split(' ')[0].upper())
-            task_reward_amount = config.get('task_reward_amount', config.get('faucet_amount'))
-            if task_reward_amount is None:
-                task_reward_amount = 0
-
-            keyboard.append([InlineKeyboardButton(f"Get {display_name} ({task_reward_amount} {currency_symbol})", callback_data=f'select_reward_token_{net_name}')])
-    
-    keyboard.append([InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='back_to_start')])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    user_record = await state.get_user(user_id_str) or {}
+    context.user_data['get_more_tokens_reentry'] = user_record.get('completed_tasks', {}).get(REWARD_TASK_NAME, False)
 
     await update.message.reply_text(
         "Great! Which testnet token would you like to receive as a reward for completing tasks?",
-        reply_markup=reply_markup
+        reply_markup=network_menus.reward_markup
     )
     return SELECTING_REWARD_TOKEN
 
@@ -634,14 +1007,16 @@ async def handle_reward_address(update: Update, context: ContextTypes.DEFAULT_TY
     reward_config = network_configs.get(selected_token_raw)
     reward_currency_symbol = reward_config.get('currency_symbol', selected_token_raw.upper())
 
-    if not Web3.is_address(user_address):
+    if not is_address(user_address):
         await update.message.reply_text(f"That doesn't look like a valid {reward_currency_symbol} wallet address. Please send a correct one.")
         return AWAITING_REWARD_ADDRESS
+    user_address = to_checksum_address(user_address)
 
     # NEW CHECK: Prevent using an address already redeemed by another Telegram account
     # Also prevents current user from using an address they already successfully redeemed with
-    if user_address in redeemed_addresses_cache:
-        if redeemed_addresses_cache[user_address] != user_id_str:
+    address_owner = await state.address_owner(user_address)
+    if address_owner is not None:
+        if address_owner != user_id_str:
             await update.message.reply_text(
                 "🚫 This wallet address has already been used to claim rewards by another Telegram account. "
                 "Each address can only be used by one Telegram account for this campaign. Please use a different address."
@@ -774,6 +1149,13 @@ async def handle_twitter_follow_2_check(update: Update, context: ContextTypes.DE
     )
     return AWAITING_TWITTER_POST_LINK
 
+def review_card_keyboard(review_id: int) -> InlineKeyboardMarkup:
+    """Approve/reject buttons for an admin verification card."""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ Approve", callback_data=f'admin_approve_task_{review_id}'),
+        InlineKeyboardButton("❌ Reject", callback_data=f'admin_reject_task_{review_id}')
+    ]])
+
 async def handle_labubu_screenshot_submission(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handles the screenshot submission for LabubuAI task and notifies admin."""
     if await check_maintenance_mode(update, context):
@@ -818,14 +1200,6 @@ async def handle_labubu_screenshot_submission(update: Update, context: ContextTy
         f"Please review the screenshot and decide."
     )
 
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Approve", callback_data=f'admin_approve_task_{user_id}'),
-            InlineKeyboardButton("❌ Reject", callback_data=f'admin_reject_task_{user_id}')
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     if ADMIN_NOTIF_ID:
         try:
             # Send photo to admin
@@ -833,12 +1207,12 @@ async def handle_labubu_screenshot_submission(update: Update, context: ContextTy
                 chat_id=ADMIN_NOTIF_ID,
                 photo=screenshot_file_id,
                 caption=notification_message, # Use caption for text with photo
-                reply_markup=reply_markup,
                 parse_mode='Markdown',
                 disable_web_page_preview=True
             )
-            # Store data in pending_task_verifications for admin approval
-            pending_task_verifications[user_id] = {
+            # Queue the submission for review; the card's buttons carry its review id
+            review_id = await state.add_pending_verification({
+                'user_id': user_id,
                 'reward_amount': reward_amount,
                 'reward_token': selected_reward_token,
                 'reward_recipient_address': reward_recipient_address,
@@ -848,8 +1222,9 @@ async def handle_labubu_screenshot_submission(update: Update, context: ContextTy
                 'user_username': user_username,
                 'screenshot_file_id': screenshot_file_id, # Store file ID for potential re-display
                 'get_more_tokens_reentry': get_more_tokens_reentry # Pass reentry status to admin verification
-            }
-            logger.info(f"Sent LabubuAI screenshot task verification request for user {user_id} to admin.")
+            })
+            await admin_message.edit_reply_markup(reply_markup=review_card_keyboard(review_id))
+            logger.info(f"Sent LabubuAI screenshot task verification request #{review_id} for user {user_id} to admin.")
         except Exception as e:
             logger.error(f"Failed to send admin notification for LabubuAI screenshot for user {user_id}: {e}")
             await message.reply_text("Failed to send your screenshot for verification. Please try again later or contact support.")
@@ -909,24 +1284,16 @@ async def handle_twitter_post_link(update: Update, context: ContextTypes.DEFAULT
         f"Please review and decide."
     )
 
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Approve", callback_data=f'admin_approve_task_{user_id}'),
-            InlineKeyboardButton("❌ Reject", callback_data=f'admin_reject_task_{user_id}')
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     if ADMIN_NOTIF_ID:
         try:
             admin_message = await context.bot.send_message(
                 chat_id=ADMIN_NOTIF_ID,
                 text=notification_message,
-                reply_markup=reply_markup,
                 parse_mode='Markdown',
                 disable_web_page_preview=False # Set to False to preview the Twitter link
             )
-            pending_task_verifications[user_id] = {
+            review_id = await state.add_pending_verification({
+                'user_id': user_id,
                 'reward_amount': reward_amount,
                 'reward_token': selected_reward_token,
                 'reward_recipient_address': reward_recipient_address,
@@ -937,8 +1304,9 @@ async def handle_twitter_post_link(update: Update, context: ContextTypes.DEFAULT
                 'user_full_name': user_full_name,
                 'user_username': user_username,
                 'get_more_tokens_reentry': get_more_tokens_reentry # Pass reentry status to admin verification
-            }
-            logger.info(f"Sent Twitter task verification request for user {user_id} to admin.")
+            })
+            await admin_message.edit_reply_markup(reply_markup=review_card_keyboard(review_id))
+            logger.info(f"Sent Twitter task verification request #{review_id} for user {user_id} to admin.")
             await update.message.reply_text("Verification completed. Your task submission has been sent to the admin for review. You will be notified of the outcome shortly!")
         except Exception as e:
             logger.error(f"Failed to send admin notification for Twitter task for user {user_id}: {e}")
@@ -957,23 +1325,30 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Displays the bot's wallet balance with custom formatting."""
     message_text = "💰 Current Bot Balances 💰\n\n"
     for net_name, config in network_configs.items():
-        w3 = w3_instances.get(net_name)
-        if w3 and w3.is_connected():
-            try:
-                balance_wei = w3.eth.get_balance(SENDER_ADDRESS)
-                balance_eth = w3.from_wei(balance_wei, 'ether')
-                
-                label = config.get('balance_label', net_name.replace('_', ' ').title().replace(' Testnet', ''))
-                symbol = config.get('balance_symbol', config.get('currency_symbol', 'ERR'))
-                
-                message_text += f"{label}: {balance_eth:.4f} {symbol}\n"
-            except Exception as e:
-                label = config.get('balance_label', net_name.replace('_', ' ').title())
-                message_text += f"{label}: Error fetching balance\n"
-                logger.error(f"Error fetching balance for {net_name}: {e}")
-        else:
+        # Rendered from the background balance cache; no RPC calls happen here
+        balance_entry = balance_cache.get(net_name)
+        if balance_entry and balance_entry.balance_wei is not None:
+            balance_eth = from_wei(balance_entry.balance_wei, 'ether')
+
+            label = config.get('balance_label', net_name.replace('_', ' ').title().replace(' Testnet', ''))
+            symbol = config.get('balance_symbol', config.get('currency_symbol', 'ERR'))
+            age = format_age(balance_entry.age())
+
+            if balance_entry.is_stale():
+                message_text += f"{label}: {balance_eth:.4f} {symbol} (stale, {age} ago)\n"
+            else:
+                message_text += f"{label}: {balance_eth:.4f} {symbol} ({age} ago)\n"
+            addresses = sender_addresses.get(net_name, [])
+            if len(addresses) > 1:
+                for address in addresses:
+                    wallet_entry = balance_cache.get_wallet(net_name, address)
+                    message_text += f"  {short_address(address)}: {from_wei(wallet_entry.balance_wei, 'ether'):.4f} {symbol}\n"
+        elif balance_entry and balance_entry.error:
             label = config.get('balance_label', net_name.replace('_', ' ').title())
             message_text += f"{label}: Not connected to RPC\n"
+        else:
+            label = config.get('balance_label', net_name.replace('_', ' ').title())
+            message_text += f"{label}: Fetching balance...\n"
     
     if update.callback_query:
         await update.callback_query.message.reply_text(message_text)
@@ -1007,66 +1382,83 @@ async def send_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             token_type = key
             break
 
-    if not token_type or not Web3.is_address(recipient_address):
+    if not token_type or not is_address(recipient_address):
         await update.message.reply_text("Invalid arguments. Check token name and address.")
         return
+    recipient_address = to_checksum_address(recipient_address)
 
-    w3 = w3_instances.get(token_type)
+    rpc_client = rpc_clients.get(token_type)
     config = network_configs.get(token_type)
     
-    if not w3 or not config:
+    if not rpc_client or not config:
         await update.message.reply_text(f"Network configuration for '{token_name_raw}' not found.")
         return
         
-    chain_id = config.get("chain_id")
     symbol = config.get('balance_symbol', config.get('currency_symbol', 'TOKEN'))
+    chat_id = update.effective_chat.id
 
-    await update.message.reply_text(f"Sending `{amount}` {symbol} to `{recipient_address}`...")
-    tx_hash = await send_native_token(w3, recipient_address, amount, chain_id, token_type, context)
+    async def on_send_complete(payout: PayoutRequest, tx_hash: str) -> None:
+        if "ERROR:" in tx_hash:
+            await context.bot.send_message(chat_id=chat_id, text=f"Failed to send token. Reason: {tx_hash}")
+        else:
+            explorer_url = config.get('explorer_url')
+            full_tx_url = f"{explorer_url}/tx/{tx_hash}"
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=f"✅ Success! Token sent.\n**Tx Hash**: [`{tx_hash}`]({full_tx_url})",
+                parse_mode='Markdown', disable_web_page_preview=True
+            )
 
-    if "ERROR:" in tx_hash:
-        await update.message.reply_text(f"Failed to send token. Reason: {tx_hash}")
-    else:
-        explorer_url = config.get('explorer_url')
-        full_tx_url = f"{explorer_url}/tx/{tx_hash}"
-        await update.message.reply_text(
-            f"✅ Success! Token sent.\n**Tx Hash**: [`{tx_hash}`]({full_tx_url})",
-            parse_mode='Markdown', disable_web_page_preview=True
-        )
+    queue_position = payout_dispatcher.submit(PayoutRequest(
+        net_name=token_type, recipient_address=recipient_address, amount=amount,
+        kind='manual', user_id=update.effective_user.id, context=context, on_complete=on_send_complete
+    ))
+    await update.message.reply_text(f"Queued sending `{amount}` {symbol} to `{recipient_address}` (position {queue_position})...")
 
 async def broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Broadcasts a message to all known users (owner only)."""
+    """Starts a background broadcast to all known users (owner only)."""
     if not is_owner(update.effective_user.id):
         await update.message.reply_text("You are not authorized to use this command.")
         return
 
+    message_to_broadcast = " ".join(context.args)
+    if not message_to_broadcast:
+        await update.message.reply_text("Usage: `/broadcast <your_message>`", parse_mode='Markdown')
+        return
+
     try:
-        message_to_broadcast = " ".join(context.args)
-        if not message_to_broadcast:
-            await update.message.reply_text("Usage: `/broadcast <your_message>`", parse_mode='Markdown')
-            return
+        job = await broadcast_engine.start_job(message_to_broadcast, update.effective_chat.id)
+    except RuntimeError as e:
+        await update.message.reply_text(f"{e} Use /broadcast_status or /broadcast_cancel.")
+        return
 
-        sent_count = 0
-        failed_count = 0
+    await update.message.reply_text(
+        f"Broadcast #{job['job_id']} to {job['total']} users started in the background. "
+        f"Use /broadcast_status to follow it or /broadcast_cancel to stop it."
+    )
+    logger.info(f"Broadcast #{job['job_id']} started for {job['total']} users.")
 
-        for user_id_str in user_data_cache.keys():
-            try:
-                user_id = int(user_id_str)
-                await context.bot.send_message(chat_id=user_id, text=message_to_broadcast)
-                sent_count += 1
-                await asyncio.sleep(0.05)
-            except Exception as e:
-                logger.warning(f"Failed to send broadcast to user {user_id_str}: {e}")
-                failed_count += 1
+async def broadcast_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows the progress of the current or last broadcast (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
 
-        await update.message.reply_text(
-            f"Broadcast message sent to {sent_count} users. Failed to send to {failed_count} users."
-        )
-        logger.info(f"Broadcast completed. Sent: {sent_count}, Failed: {failed_count}")
+    if not broadcast_engine.job:
+        await update.message.reply_text("No broadcast has been run since the bot started.")
+        return
+    await update.message.reply_text(broadcast_engine.progress_text())
 
-    except Exception as e:
-        logger.error(f"Error in broadcast command: {e}")
-        await update.message.reply_text("An error occurred while broadcasting the message.")
+async def broadcast_cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancels the running broadcast after its current batch (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    if broadcast_engine.cancel():
+        await update.message.reply_text(f"Cancelling broadcast #{broadcast_engine.job['job_id']} after the current batch...")
+    else:
+        await update.message.reply_text("No broadcast is running.")
 
 async def stat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Displays bot statistics (owner only)."""
@@ -1074,14 +1466,32 @@ async def stat_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await update.message.reply_text("You are not authorized to use this command.")
         return
 
-    total_users = len(user_data_cache)
-    total_redeemed_addresses = len(redeemed_addresses_cache)
+    total_users = await state.count_users()
+    total_redeemed_addresses = await state.count_redeemed_addresses()
 
     message = (
         f"📊 **Bot Statistics**\n"
         f"Total Unique Users: {total_users}\n"
         f"Total Redeemed Addresses (Get More Tokens): {total_redeemed_addresses}\n"
+        f"\n**RPC Health**\n"
     )
+    for net_name, config in network_configs.items():
+        health = health_monitor.get(net_name)
+        label = config.get('balance_label', net_name.replace('_', ' ').title())
+        latency = f"{health.latency * 1000:.0f} ms" if health.latency is not None else "n/a"
+        message += f"{label}: {health.status} ({latency}, {health.error_rate:.0%} errors, {receipt_tracker.in_flight(net_name)} txs in flight)\n"
+
+    message += "\n**Sender Wallets**\n"
+    for net_name, wallet_pool in wallet_pools.items():
+        config = network_configs.get(net_name, {})
+        label = config.get('balance_label', net_name.replace('_', ' ').title())
+        symbol = config.get('balance_symbol', config.get('currency_symbol', 'TOKEN'))
+        for wallet in wallet_pool.wallets:
+            wallet_entry = balance_cache.get_wallet(net_name, wallet.address)
+            balance = (f"{from_wei(wallet_entry.balance_wei, 'ether'):.4f} {symbol}"
+                       if wallet_entry and wallet_entry.balance_wei is not None else "balance n/a")
+            message += (f"{label} `{short_address(wallet.address)}`: {balance}, {wallet.sent} sent, "
+                        f"{receipt_tracker.in_flight(net_name, wallet.address)} in flight\n")
     await update.message.reply_text(message, parse_mode='Markdown')
 
 async def maintenance_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1093,11 +1503,12 @@ async def maintenance_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     try:
         action = context.args[0].lower()
         if action == "on":
-            context.application.user_data['maintenance_mode'] = True
+            # Published to every bot instance sharing the state backend
+            await state.set_maintenance(True)
             await update.message.reply_text("Maintenance mode is now **ON**.", parse_mode='Markdown')
             logger.info("Maintenance mode turned ON.")
         elif action == "off":
-            context.application.user_data['maintenance_mode'] = False
+            await state.set_maintenance(False)
             await update.message.reply_text("Maintenance mode is now **OFF**.", parse_mode='Markdown')
             logger.info("Maintenance mode turned OFF.")
         else:
@@ -1105,6 +1516,99 @@ async def maintenance_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     except (IndexError, AttributeError):
         await update.message.reply_text("Usage: `/maintenance <on/off>`", parse_mode='Markdown')
 
+async def send_report(context: ContextTypes.DEFAULT_TYPE, chat_id: int, text: str, filename: str, caption: str) -> None:
+    """Sends a profiling report to the owner chat as a document."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    await context.bot.send_document(chat_id=chat_id, document=text.encode(), filename=f"{filename}-{stamp}.txt", caption=caption)
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Samples the bot's call stacks for a few seconds and sends a flamegraph-compatible file (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    try:
+        seconds = float(context.args[0]) if context.args else 10.0
+    except ValueError:
+        await update.message.reply_text("Usage: `/profile [seconds]`", parse_mode='Markdown')
+        return
+
+    seconds = max(1.0, min(seconds, PROFILE_MAX_SECONDS))
+    try:
+        sampling = stack_sampler.start(seconds)
+    except RuntimeError:
+        await update.message.reply_text("A profile is already running. Please wait for it to finish.")
+        return
+    chat_id = update.effective_chat.id
+    await update.message.reply_text(f"⏱ Sampling stacks for {seconds:.0f}s...")
+
+    async def run_profile():
+        folded, samples = await sampling
+        await send_report(
+            context, chat_id, folded, 'profile',
+            f"{samples} samples over {seconds:.0f}s in folded format; render with flamegraph.pl or speedscope."
+        )
+    # Runs in the background so updates keep being handled (and profiled) meanwhile
+    context.application.create_task(run_profile(), update=update)
+
+async def memsnap_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Takes a tracemalloc snapshot, diffs against the previous one, or stops tracing (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    action = context.args[0].lower() if context.args else 'snapshot'
+    if action == 'stop':
+        memory_profiler.stop()
+        await update.message.reply_text("tracemalloc stopped.")
+        return
+    if action not in ('snapshot', 'diff'):
+        await update.message.reply_text("Usage: `/memsnap [snapshot|diff|stop]`", parse_mode='Markdown')
+        return
+    if not memory_profiler.is_tracing():
+        memory_profiler.snapshot()
+        await update.message.reply_text(
+            "tracemalloc started (allocations run slower while it is on). "
+            "Send /memsnap again for a snapshot, /memsnap diff to compare, /memsnap stop when done."
+        )
+        return
+
+    report = await asyncio.to_thread(memory_profiler.diff if action == 'diff' else memory_profiler.snapshot)
+    await send_report(context, update.effective_chat.id, report, f"memory-{action}", f"tracemalloc {action}")
+
+async def flood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows flood-control counters (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    await update.message.reply_text(f"🚦 Flood control\n{flood_control.report()}")
+
+async def reload_networks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Reloads network_configs from config.py without a restart (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    try:
+        summary = await reload_network_configs(load_network_configs(), context.application)
+    except Exception as e:
+        logger.error(f"Network config reload failed: {e}")
+        await update.message.reply_text(f"❌ Reload failed; the running configuration is unchanged.\n{e}")
+        return
+
+    lines = [f"{label}: {', '.join(summary[key]) or 'none'}" for key, label in (
+        ('added', 'Added'), ('removed', 'Removed'), ('changed', 'Changed'), ('reconnected', 'Reconnected RPC'))]
+    await update.message.reply_text("✅ Network configuration reloaded.\n" + '\n'.join(lines))
+
+async def tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Dumps the stack of every asyncio task (owner only)."""
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    await send_report(context, update.effective_chat.id, dump_task_stacks(), 'tasks', "asyncio task stacks")
+
 async def handle_admin_verification(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles admin's approval or rejection of a task submission."""
     query = update.callback_query
@@ -1116,16 +1620,25 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
 
     parts = query.data.split('_')
     action = parts[1]
-    user_id_str = parts[3]
-
-    user_id = int(user_id_str)
+    review_id = int(parts[3])
 
-    task_data = pending_task_verifications.pop(user_id, None)
+    task_data = await state.pop_pending_verification(review_id)
     if not task_data:
-        await query.edit_message_text(f"Task request for user {user_id} not found or already processed.")
-        logger.warning(f"Admin tried to process non-existent task for user {user_id}. Callback: {query.data}")
+        await query.edit_message_text(f"Task review #{review_id} not found or already processed.")
+        logger.warning(f"Admin tried to process non-existent task review #{review_id}. Callback: {query.data}")
         return
 
+    await decide_task_review(context, review_id, task_data, action, query.from_user.username or 'Admin')
+
+async def decide_task_review(context: ContextTypes.DEFAULT_TYPE, review_id: int, task_data: dict, action: str, processed_by: str) -> str:
+    """Applies an admin decision to a submission already taken off the review queue.
+
+    Approved rewards are only queued on the payout dispatcher, so this returns
+    quickly; the user hears back once the payout has been sent. Returns a
+    short outcome for bulk summaries.
+    """
+    user_id = int(task_data['user_id'])
+    user_id_str = str(user_id)
     reward_amount = task_data['reward_amount']
     reward_token = task_data['reward_token']
     reward_recipient_address = task_data['reward_recipient_address']
@@ -1134,7 +1647,7 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
 
     # NEW: Prepare base status message for admin (either edit caption or text)
     base_status_message_admin = (
-        f"User: {escape_markdown(task_data.get('user_full_name', f'User {user_id}'), version=2)} (`{user_id}`) (@{escape_markdown(task_data.get('user_username', 'N/A'), version=2)})\n"
+        f"User: {escape_markdown(task_data.get('user_full_name', f'User {user_id}'), version=2)} (`{user_id}`) (@{escape_markdown(task_data.get('user_username') or 'N/A', version=2)})\n"
         f"Reward: {reward_amount} {reward_token.upper()}\n"
         f"Address: `{reward_recipient_address}`\n"
         f"Task Type: {task_type.replace('_', ' ').title()}\n"
@@ -1148,29 +1661,94 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
         base_status_message_admin += f"Screenshot ID: `{task_data.get('screenshot_file_id', 'N/A')}`\n"
 
 
-    admin_notification_message_id = task_data['admin_msg_id']
-    user_chat_id = user_id
-    
     reward_config = network_configs.get(reward_token)
     reward_display_name = reward_config.get('display_name', reward_token.replace('_', ' ').title()) if reward_config else reward_token
     reward_currency_symbol = reward_config.get('currency_symbol', 'TOKEN') if reward_config else 'TOKEN'
     
     status_message_admin = ""
     status_message_user = ""
+    outcome = 'rejected'
 
     if action == "approve":
-        if get_more_tokens_reentry: # If they've completed it before, no actual token send
+        # Marking the task completed up front means a second submission approved meanwhile is not paid again
+        if get_more_tokens_reentry or not await state.complete_task(user_id_str, REWARD_TASK_NAME): # If they've completed it before, no actual token send
             status_message_admin = f"✅ **Approved (No Token Sent - Re-entry)**\n{base_status_message_admin}"
             status_message_user = (
                 f"🎉 Congratulations! Your task submission for the Get More Tokens campaign has been **APPROVED**.\n\n"
                 f"However, as you have completed this campaign before, **no further rewards will be distributed**."
             )
             logger.info(f"Admin approved re-entry task for user {user_id}. No token sent.")
+            outcome = 'approved (no reward)'
         else: # First time completion, send token
-            w3_instance = w3_instances.get(reward_token)
+            rpc_client = rpc_clients.get(reward_token)
             chain_id = reward_config.get('chain_id') if reward_config else None
-            
-            if not w3_instance or not chain_id or not w3_instance.is_connected():
+            # Set when the reward cannot be queued because the network is not configured or its RPC is down
+            payout_error = None
+
+            if not rpc_client or not chain_id or not health_monitor.is_available(reward_token):
+                payout_error = "RPC issue"
+            elif await state.claim_address(reward_recipient_address, user_id_str) != user_id_str:
+                # Another account redeemed this address after the submission was made
+                status_message_admin = (
+                    f"❌ Approval failed (address already redeemed)!\n{base_status_message_admin}"
+                    "Reason: The address was redeemed by another Telegram account in the meantime.\n"
+                )
+                status_message_user = (
+                    "🚫 This wallet address has already been used to claim rewards by another Telegram account. "
+                    "Each address can only be used by one Telegram account for this campaign."
+                )
+                logger.warning(f"Refused reward for user {user_id}: {reward_recipient_address} was redeemed by another user.")
+                await state.reset_task(user_id_str, REWARD_TASK_NAME)
+                outcome = 'failed'
+            else:
+                # The address is claimed before queueing, so concurrent approvals cannot pay it twice
+                async def on_reward_complete(payout: PayoutRequest, tx_hash: str) -> None:
+                    if "ERROR:" in tx_hash:
+                        await state.release_address(reward_recipient_address, user_id_str)
+                        await state.reset_task(user_id_str, REWARD_TASK_NAME)
+                        status_message_admin = (
+                            f"❗ **Approved, but failed to send token!**\n{base_status_message_admin}"
+                            f"Reason: {tx_hash}"
+                        )
+                        status_message_user = (
+                            f"🚫 Unfortunately, your task submission was approved, but there was an issue sending your {reward_display_name} reward. "
+                            f"Reason: {tx_hash}. Please contact the bot admin: @{OWNER_TELEGRAM_USERNAME}"
+                        )
+                        logger.error(f"Failed to send reward to {reward_recipient_address} for user {user_id}: {tx_hash}")
+                    else:
+                        explorer_url = reward_config.get('explorer_url', '')
+                        full_tx_url = f"{explorer_url}/tx/{tx_hash}"
+                    
+                        status_message_admin = (
+                            f"✅ **Approved & Token Sent!**\n{base_status_message_admin}"
+                            f"Tx Hash: [`{tx_hash}`]({full_tx_url})"
+                        )
+                        status_message_user = (
+                            f"🎉 Congratulations! Your task submission for the Get More Tokens campaign has been **APPROVED** and your reward has been sent!\n\n"
+                            f"You received `{reward_amount} {reward_currency_symbol}` at `{reward_recipient_address}`.\n"
+                            f"**Tx Hash**: [`{tx_hash}`]({full_tx_url})"
+                        )
+                        logger.info(f"Admin approved and sent reward to user {user_id}. Tx: {tx_hash}")
+
+                    await finish_task_verification(context, task_data, user_id, status_message_admin, status_message_user, processed_by)
+
+                try:
+                    payout_dispatcher.submit(PayoutRequest(
+                        net_name=reward_token, recipient_address=reward_recipient_address, amount=reward_amount,
+                        kind='task_reward', user_id=user_id, context=context, on_complete=on_reward_complete
+                    ))
+                except KeyError as e:
+                    # The network's worker went away, e.g. a /reload_networks removed it since the check above
+                    await state.release_address(reward_recipient_address, user_id_str)
+                    payout_error = str(e)
+                else:
+                    # The user is only notified once the payout has actually been sent
+                    status_message_admin = f"⏳ **Approved, reward payout queued**\n{base_status_message_admin}"
+                    status_message_user = None
+                    logger.info(f"Admin approved task review #{review_id} for user {user_id}. Reward payout queued on {reward_token}.")
+                    outcome = 'approved'
+
+            if payout_error:
                 status_message_admin = (
                     f"❌ Approval failed (RPC/Config Error)!\n{base_status_message_admin}"
                     f"Reason: Reward token '{reward_token}' not configured or RPC not connected.\n"
@@ -1179,42 +1757,9 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
                     f"🚫 Unfortunately, your task submission was approved, but there was an issue sending your {reward_display_name} reward. "
                     f"Please contact the bot admin: @{OWNER_TELEGRAM_USERNAME}"
                 )
-                logger.error(f"Failed to send reward for user {user_id}: Token '{reward_token}' RPC issue.")
-            else:
-                tx_hash = await send_native_token(w3_instance, reward_recipient_address, reward_amount, chain_id, reward_token, context)
-
-                if "ERROR:" in tx_hash:
-                    status_message_admin = (
-                        f"❗ **Approved, but failed to send token!**\n{base_status_message_admin}"
-                        f"Reason: {tx_hash}"
-                    )
-                    status_message_user = (
-                        f"🚫 Unfortunately, your task submission was approved, but there was an issue sending your {reward_display_name} reward. "
-                        f"Reason: {tx_hash}. Please contact the bot admin: @{OWNER_TELEGRAM_USERNAME}"
-                    )
-                    logger.error(f"Failed to send reward to {reward_recipient_address} for user {user_id}: {tx_hash}")
-                else:
-                    explorer_url = reward_config.get('explorer_url', '')
-                    full_tx_url = f"{explorer_url}/tx/{tx_hash}"
-                    
-                    status_message_admin = (
-                        f"✅ **Approved & Token Sent!**\n{base_status_message_admin}"
-                        f"Tx Hash: [`{tx_hash}`]({full_tx_url})"
-                    )
-                    status_message_user = (
-                        f"🎉 Congratulations! Your task submission for the Get More Tokens campaign has been **APPROVED** and your reward has been sent!\n\n"
-                        f"You received `{reward_amount} {reward_currency_symbol}` at `{reward_recipient_address}`.\n"
-                        f"**Tx Hash**: [`{tx_hash}`]({full_tx_url})"
-                    )
-                    logger.info(f"Admin approved and sent reward to user {user_id}. Tx: {tx_hash}")
-
-                    user_data_cache.setdefault(str(user_id), {}).setdefault('completed_tasks', {})
-                    user_data_cache[str(user_id)]['completed_tasks']['get_more_tokens_main_task'] = True # Mark as completed
-                    save_user_data()
-
-                    # NEW: Add address to redeemed_addresses_cache on first successful completion
-                    redeemed_addresses_cache[reward_recipient_address] = user_id_str
-                    save_redeemed_addresses()
+                logger.error(f"Failed to send reward for user {user_id}: Token '{reward_token}' {payout_error}.")
+                await state.reset_task(user_id_str, REWARD_TASK_NAME)
+                outcome = 'failed'
 
     elif action == "reject":
         status_message_admin = (
@@ -1237,13 +1782,19 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
         else: # Fallback for unknown task type
             status_message_user = "🚫 Your task submission has been **REJECTED**. Please try again."
 
+    await finish_task_verification(context, task_data, user_id, status_message_admin, status_message_user, processed_by)
+    return outcome
+
+async def finish_task_verification(context: ContextTypes.DEFAULT_TYPE, task_data: dict, user_id: int, status_message_admin: str, status_message_user: str, processed_by: str) -> None:
+    """Updates the admin's verification card and tells the user the outcome (if a user message is given)."""
+    admin_notification_message_id = task_data['admin_msg_id']
     try:
         # If it's a screenshot, edit the photo caption; otherwise, edit text message
         if task_data.get('task_type') == 'labubu_screenshot':
             await context.bot.edit_message_caption(
                 chat_id=ADMIN_NOTIF_ID,
                 message_id=admin_notification_message_id,
-                caption=f"{status_message_admin}\n\nProcessed by @{query.from_user.username or 'Admin'}",
+                caption=f"{status_message_admin}\n\nProcessed by @{processed_by}",
                 reply_markup=None, # Remove buttons after processing
                 parse_mode='Markdown'
             )
@@ -1251,7 +1802,7 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
             await context.bot.edit_message_text(
                 chat_id=ADMIN_NOTIF_ID,
                 message_id=admin_notification_message_id,
-                text=f"{status_message_admin}\n\nProcessed by @{query.from_user.username or 'Admin'}",
+                text=f"{status_message_admin}\n\nProcessed by @{processed_by}",
                 reply_markup=None, # Remove buttons after processing
                 parse_mode='Markdown',
                 disable_web_page_preview=True
@@ -1259,9 +1810,12 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
     except Exception as e:
         logger.error(f"Failed to edit admin notification message {admin_notification_message_id}: {e}")
 
+    if not status_message_user:
+        return
+
     try:
         await context.bot.send_message(
-            chat_id=user_chat_id,
+            chat_id=user_id,
             text=status_message_user,
             parse_mode='Markdown',
             disable_web_page_preview=True
@@ -1269,9 +1823,187 @@ async def handle_admin_verification(update: Update, context: ContextTypes.DEFAUL
     except Exception as e:
         logger.error(f"Failed to send task verification result to user {user_id}: {e}")
 
-# NEW: post_init callback to check bot's admin status in channel
-async def post_init_callback(application: Application):
-    """Callback function to be run after the application is initialized."""
+def describe_review(review_id: int, task_data: dict) -> str:
+    """One plain-text entry of the /review list."""
+    task_type = task_data.get('task_type', 'unknown')
+    line = (
+        f"#{review_id} · {task_data.get('user_full_name', 'User')} ({task_data['user_id']}) · "
+        f"{task_type.replace('_', ' ').title()} · {task_data['reward_amount']} {task_data['reward_token'].upper()}"
+    )
+    if task_data.get('get_more_tokens_reentry'):
+        line += " · re-entry"
+    if task_type == 'twitter_tasks':
+        line += f"\n    {task_data.get('user_post_link', 'N/A')}"
+    return line
+
+async def render_review_page(after_id: int) -> tuple:
+    """Returns the text and keyboard of the review page listing submissions after `after_id`."""
+    items = await state.list_pending_verifications(after_id, REVIEW_PAGE_SIZE)
+    total = await state.count_pending_verifications()
+    if not items:
+        text = "✅ No submissions are waiting for review." if not total else f"No more submissions after #{after_id} ({total} pending)."
+        return text, InlineKeyboardMarkup([[InlineKeyboardButton("⏮ First page", callback_data='review_page_0')]])
+
+    first_id, last_id = items[0][0], items[-1][0]
+    text = f"📝 Pending submissions: {total} (showing #{first_id}-#{last_id})\n\n"
+    text += "\n".join(describe_review(review_id, task_data) for review_id, task_data in items)
+    keyboard = [
+        [
+            InlineKeyboardButton(f"✅ #{review_id}", callback_data=f'review_approve_{review_id}_{after_id}'),
+            InlineKeyboardButton(f"❌ #{review_id}", callback_data=f'review_reject_{review_id}_{after_id}')
+        ]
+        for review_id, _ in items
+    ]
+    keyboard.append([
+        InlineKeyboardButton("✅ Approve page", callback_data=f'review_bulkapprove_{first_id}_{last_id}'),
+        InlineKeyboardButton("❌ Reject page", callback_data=f'review_bulkreject_{first_id}_{last_id}')
+    ])
+    keyboard.append([
+        InlineKeyboardButton("⏮ First page", callback_data='review_page_0'),
+        InlineKeyboardButton("Next ▶", callback_data=f'review_page_{last_id}')
+    ])
+    return text, InlineKeyboardMarkup(keyboard)
+
+async def pending_review_ids(low: int, high: int) -> list:
+    """Returns the ids of pending submissions between `low` and `high` (inclusive)."""
+    review_ids = []
+    after_id = low - 1
+    while True:
+        items = await state.list_pending_verifications(after_id, 500)
+        review_ids.extend(review_id for review_id, _ in items if review_id <= high)
+        if not items or items[-1][0] >= high:
+            return review_ids
+        after_id = items[-1][0]
+
+async def process_reviews(context: ContextTypes.DEFAULT_TYPE, review_ids: list, action: str, processed_by: str, chat_id: int) -> None:
+    """Decides a batch of submissions one after another and reports a summary to `chat_id`."""
+    started = time.monotonic()
+    outcomes = {}
+    for review_id in review_ids:
+        task_data = await state.pop_pending_verification(review_id)
+        if not task_data:
+            outcome = 'already processed'
+        else:
+            try:
+                outcome = await decide_task_review(context, review_id, task_data, action, processed_by)
+            except Exception as e:
+                logger.error(f"Failed to {action} task review #{review_id}: {e}")
+                outcome = 'error'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    summary = ", ".join(f"{count} {outcome}" for outcome, count in outcomes.items())
+    logger.info(f"Bulk {action} of {len(review_ids)} task reviews by @{processed_by}: {summary}")
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=f"Bulk {action} finished in {time.monotonic() - started:.1f}s: {summary}."
+        + (" Reward payouts continue in the background." if action == 'approve' else "")
+    )
+
+async def review_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Pages through pending task submissions, or bulk-decides them (owner only).
+
+    /review                          show the first page
+    /review approve|reject <ids>     decide submissions by id, id range (10-40) or 'all'
+    """
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to use this command.")
+        return
+
+    if not context.args:
+        text, reply_markup = await render_review_page(0)
+        await update.message.reply_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
+        return
+
+    action = context.args[0].lower()
+    selectors = context.args[1:]
+    if action not in ('approve', 'reject') or not selectors:
+        await update.message.reply_text("Usage: `/review` or `/review <approve|reject> <id|from-to|all> ...`", parse_mode='Markdown')
+        return
+
+    review_ids = []
+    try:
+        for selector in selectors:
+            if selector.lower() == 'all':
+                review_ids += await pending_review_ids(0, float('inf'))
+            elif '-' in selector:
+                low, high = selector.split('-', 1)
+                review_ids += await pending_review_ids(int(low.lstrip('#')), int(high.lstrip('#')))
+            else:
+                review_ids.append(int(selector.lstrip('#')))
+    except ValueError:
+        await update.message.reply_text("Submission ids must be numbers, ranges like `10-40`, or `all`.", parse_mode='Markdown')
+        return
+
+    review_ids = list(dict.fromkeys(review_ids))
+    if not review_ids:
+        await update.message.reply_text("No pending submissions match.")
+        return
+
+    await update.message.reply_text(f"⏳ {'Approving' if action == 'approve' else 'Rejecting'} {len(review_ids)} submissions in the background...")
+    context.application.create_task(
+        process_reviews(context, review_ids, action, update.effective_user.username or 'Admin', update.effective_chat.id),
+        update=update
+    )
+
+async def handle_review_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles the buttons of the /review list."""
+    query = update.callback_query
+
+    if not is_owner(query.from_user.id):
+        await query.answer("You are not authorized to perform this action.", show_alert=True)
+        return
+
+    parts = query.data.split('_')
+    action = parts[1]
+    processed_by = query.from_user.username or 'Admin'
+
+    if action == 'page':
+        after_id = int(parts[2])
+    elif action in ('approve', 'reject'):
+        review_id, after_id = int(parts[2]), int(parts[3])
+        task_data = await state.pop_pending_verification(review_id)
+        if task_data:
+            outcome = await decide_task_review(context, review_id, task_data, action, processed_by)
+            await query.answer(f"#{review_id}: {outcome}")
+        else:
+            await query.answer(f"#{review_id} was already processed.")
+    else: # bulkapprove / bulkreject: every submission still pending on the page
+        review_ids = await pending_review_ids(int(parts[2]), int(parts[3]))
+        await query.answer(f"Processing {len(review_ids)} submissions...")
+
+        # Like /review, the payouts and notices go out in the background so other updates are not held up
+        async def process_and_refresh() -> None:
+            await process_reviews(context, review_ids, action.replace('bulk', ''), processed_by, query.message.chat_id)
+            await show_review_page(query, 0)
+        context.application.create_task(process_and_refresh(), update=update)
+        return
+
+    if action == 'page':
+        await query.answer()
+    await show_review_page(query, after_id)
+
+async def show_review_page(query, after_id: int) -> None:
+    """Redraws the /review list message at the page starting after `after_id`."""
+    text, reply_markup = await render_review_page(after_id)
+    try:
+        await query.edit_message_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
+    except Exception as e:
+        # Editing fails harmlessly when the page did not change
+        logger.debug(f"Review page not updated: {e}")
+
+async def collect_metrics() -> None:
+    """Refreshes the gauges right before each metrics scrape."""
+    metrics.USERS.set(await state.count_users())
+    metrics.PENDING_VERIFICATIONS.set(await state.count_pending_verifications())
+    for net_name in network_configs:
+        metrics.PAYOUT_QUEUE.set(payout_dispatcher.pending(net_name), network=net_name)
+        metrics.TX_IN_FLIGHT.set(receipt_tracker.in_flight(net_name), network=net_name)
+        balance_entry = balance_cache.get(net_name)
+        if balance_entry and balance_entry.balance_wei is not None:
+            metrics.SENDER_BALANCE.set(float(from_wei(balance_entry.balance_wei, 'ether')), network=net_name)
+
+async def check_channel_admin(application: Application) -> None:
+    """Warns if the bot is not an administrator of CHANNEL_ID and warms the channel info cache."""
     # CHANNEL_ID is loaded from config, which loads from .env
     # We explicitly convert CHANNEL_ID to string for consistent comparison with "-100"
     if CHANNEL_ID and str(CHANNEL_ID) != "-100":
@@ -1282,18 +2014,122 @@ async def post_init_callback(application: Application):
                 print(f"WARNING: Bot is NOT an administrator in the configured CHANNEL_ID ({CHANNEL_ID}). Mandatory channel verification might fail for users. Ensure bot is admin in the channel.")
             else:
                 logger.info(f"Bot is an administrator in CHANNEL_ID ({CHANNEL_ID}).")
+            # Warm the channel title/invite link cache so the first non-member /start costs no extra call
+            await membership_cache.refresh_channel_info(application.bot)
         except Exception as e:
             logger.error(f"Could not verify bot's admin status in CHANNEL_ID {CHANNEL_ID}: {e}. Ensure CHANNEL_ID is correct and bot has been added to the channel.")
             print(f"WARNING: Could not verify bot's admin status in CHANNEL_ID {CHANNEL_ID}. Ensure CHANNEL_ID is correct and bot has been added to the channel. Error: {e}")
 
+async def warm_up_networks() -> int:
+    """Loads web3, hands the signer its keys and connects every network. Returns the networks started."""
+    # Held throughout, so a /reload_networks sent during warm-up waits for the first set of clients
+    async with network_reload_lock:
+        # Imported in a worker thread so the event loop keeps answering updates meanwhile
+        for module in DEFERRED_IMPORTS:
+            await asyncio.to_thread(importlib.import_module, module)
+        mark_startup_phase('web3 import')
+        transaction_signer.set_keys(sender_keys(network_configs))
+        connected = await init_rpc_clients()
+        mark_startup_phase('networks')
+    return connected
+
+async def warm_up(application: Application) -> None:
+    """The part of startup that runs after the bot has started taking updates."""
+    connected, _ = await asyncio.gather(warm_up_networks(), check_channel_admin(application), return_exceptions=True)
+    if isinstance(connected, Exception):
+        logger.error(f"Network warm-up failed: {connected}")
+        return
+    logger.info(f"Warm-up done, {connected}/{len(network_configs)} networks started; startup timing: {startup_report()}.")
+    await balance_cache.refresh_all()
 
-def main() -> None: 
-    """Runs the bot."""
-    init_web3_instances()
-    init_db() 
+async def post_init_callback(application: Application):
+    """Starts the services handlers need, then leaves network warm-up to the background.
 
-    # Build the Application with post_init callback directly
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(post_init_callback).build() 
+    Only what the first update depends on (state, service objects) runs
+    here, because polling does not start until this returns. RPC clients,
+    nonce syncs and the channel admin check follow in the background.
+    """
+    await state.start()
+    mark_startup_phase('state')
+
+    global payout_dispatcher, claim_ledger, balance_cache, health_monitor, fee_oracle, receipt_tracker, transaction_signer, broadcast_engine, metrics_server, warm_up_task
+    health_monitor = HealthMonitor(rpc_clients)
+    health_monitor.start()
+    balance_cache = BalanceCache(rpc_clients, sender_addresses)
+    balance_cache.start()
+    fee_oracle = FeeOracle(rpc_clients, network_configs)
+    fee_oracle.start()
+    # Keys are derived with eth_account, which warm-up imports off the event loop
+    transaction_signer = TransactionSigner({})
+    transaction_signer.start()
+    receipt_tracker = ReceiptTracker(rpc_clients, fee_oracle, transaction_signer.sign)
+    receipt_tracker.start()
+    claim_ledger = ClaimLedger()
+    claim_ledger.start()
+    payout_dispatcher = PayoutDispatcher(process_payouts)
+    payout_dispatcher.start(network_configs)
+    broadcast_engine = BroadcastEngine(application.bot, storage, state, prune_user)
+    broadcast_engine.resume()
+    if metrics.METRICS_PORT:
+        metrics.REGISTRY.add_collector(collect_metrics)
+        metrics_server = metrics.MetricsServer()
+        await metrics_server.start()
+    mark_startup_phase('services')
+
+    # RPC sessions are bound to the running event loop, so networks are connected from here rather than in main()
+    warm_up_task = asyncio.create_task(warm_up(application), name='startup-warm-up')
+    logger.info(f"Accepting updates {startup_phases['services']:.2f}s after start ({startup_report()}); warming up networks in the background.")
+
+async def post_shutdown_callback(application: Application):
+    """Callback function to be run when the application shuts down."""
+    if warm_up_task:
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+    if metrics_server:
+        await metrics_server.stop()
+    if broadcast_engine:
+        await broadcast_engine.stop()
+    if payout_dispatcher:
+        await payout_dispatcher.stop()
+    if receipt_tracker:
+        await receipt_tracker.stop()
+    if transaction_signer:
+        await transaction_signer.stop()
+    if claim_ledger:
+        await claim_ledger.stop()
+    if balance_cache:
+        await balance_cache.stop()
+    if health_monitor:
+        await health_monitor.stop()
+    if fee_oracle:
+        await fee_oracle.stop()
+    if state:
+        await state.stop()
+    if storage:
+        storage.close()
+    await close_rpc_clients()
+
+
+def build_application(base_url: str = None) -> Application:
+    """Builds the Application with every handler registered.
+
+    `base_url` points the bot at another Bot API server (e.g. the load-test fake).
+    """
+    # Build the Application with post_init/post_shutdown callbacks directly
+    builder = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(post_init_callback).post_shutdown(post_shutdown_callback)
+    if base_url:
+        builder = builder.base_url(base_url)
+    if BOT_MODE == 'webhook':
+        # Updates arrive through our own webhook server instead of the polling Updater
+        builder = builder.updater(None)
+    if metrics.METRICS_PORT:
+        # Counts Bot API calls by method and status; 256 matches PTB's default pool size
+        builder = builder.request(metrics.MetricsHTTPXRequest(connection_pool_size=256))
+    if BOT_CONCURRENT_UPDATES > 1:
+        builder = builder.concurrent_updates(BOT_CONCURRENT_UPDATES)
+    application = builder.build()
+    flood_control.check_concurrency(BOT_CONCURRENT_UPDATES)
+    guard = flood_control.guard
 
     # Conversation Handler for /start and channel join check
     start_conv_handler = ConversationHandler(
@@ -1309,7 +2145,7 @@ def main() -> None:
     claim_conv_handler = ConversationHandler(
         entry_points=[CallbackQueryHandler(handle_claim_button, pattern='^claim_token_.*$')],
         states={
-            AWAITING_CLAIM_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_claim_address)],
+            AWAITING_CLAIM_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, guard(handle_claim_address))],
         },
         fallbacks=[CommandHandler("cancel", cancel_conversation)],
         allow_reentry=True
@@ -1322,7 +2158,7 @@ def main() -> None:
         ],
         states={
             SELECTING_PURCHASE_TOKEN: [CallbackQueryHandler(handle_purchase_selection, pattern='^buy_token_.*$')],
-            AWAITING_PURCHASE_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_purchase_amount)]
+            AWAITING_PURCHASE_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, guard(handle_purchase_amount))]
         },
         fallbacks=[CommandHandler("cancel", cancel_conversation)],
         allow_reentry=True
@@ -1335,24 +2171,25 @@ def main() -> None:
         ],
         states={
             SELECTING_REWARD_TOKEN: [CallbackQueryHandler(handle_reward_token_selection, pattern='^select_reward_token_.*$')],
-            AWAITING_REWARD_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_reward_address)],
+            AWAITING_REWARD_ADDRESS: [MessageHandler(filters.TEXT & ~filters.COMMAND, guard(handle_reward_address))],
             SELECTING_GET_MORE_TOKENS_TASK_TYPE: [CallbackQueryHandler(select_get_more_tokens_task_type, pattern='^(select_twitter_tasks|select_labubu_tasks)$')],
             AWAITING_TWITTER_FOLLOW_1_CONFIRM: [CallbackQueryHandler(handle_twitter_follow_1_check, pattern='^followed_petrukstar_check$')],
             AWAITING_TWITTER_USERNAME_1: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_twitter_username_1)],
             AWAITING_TWITTER_FOLLOW_2_CONFIRM: [CallbackQueryHandler(handle_twitter_follow_2_check, pattern='^followed_ikysyptraa_check$')],
-            AWAITING_TWITTER_POST_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_twitter_post_link)],
-            AWAITING_LABUBU_SCREENSHOT: [MessageHandler(filters.PHOTO & ~filters.COMMAND, handle_labubu_screenshot_submission)],
+            AWAITING_TWITTER_POST_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, guard(handle_twitter_post_link))],
+            AWAITING_LABUBU_SCREENSHOT: [MessageHandler(filters.PHOTO & ~filters.COMMAND, guard(handle_labubu_screenshot_submission))],
         },
         fallbacks=[CommandHandler("cancel", cancel_conversation)],
         allow_reentry=True
     )
 
-    # Add all handlers
+    # Add all handlers; flood control runs first and can stop an update from reaching the rest
+    application.add_handler(TypeHandler(Update, flood_control_gate), group=-1)
     application.add_handler(start_conv_handler) 
     application.add_handler(CommandHandler("cancel", cancel_conversation)) 
     application.add_handler(CommandHandler("faucet", handle_faucet_button))
     application.add_handler(MessageHandler(filters.Regex("^Faucet 🤖$"), handle_faucet_button))
-    application.add_handler(MessageHandler(filters.Regex("^Balance 💰$"), balance_command))
+    application.add_handler(MessageHandler(filters.Regex("^Balance 💰$"), guard(balance_command)))
     application.add_handler(CallbackQueryHandler(back_to_start_menu, pattern='^back_to_start$'))
     application.add_handler(CallbackQueryHandler(how_to_use_faucet, pattern='^how_to_use_faucet$'))
     application.add_handler(CallbackQueryHandler(handle_faucet_button, pattern='^faucet_menu_reopen$'))
@@ -1361,14 +2198,38 @@ def main() -> None:
     application.add_handler(get_more_tokens_conv_handler)
 
     application.add_handler(CallbackQueryHandler(handle_admin_verification, pattern='^admin_(approve|reject)_task_.*$'))
+    application.add_handler(CallbackQueryHandler(handle_review_callback, pattern='^review_(page|approve|reject|bulkapprove|bulkreject)_.*$'))
     
     application.add_handler(CommandHandler("send", send_command))
     application.add_handler(CommandHandler("stat", stat_command))
     application.add_handler(CommandHandler("broadcast", broadcast_message))
+    application.add_handler(CommandHandler("broadcast_status", broadcast_status_command))
+    application.add_handler(CommandHandler("broadcast_cancel", broadcast_cancel_command))
     application.add_handler(CommandHandler("maintenance", maintenance_command))
+    application.add_handler(CommandHandler("review", review_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("memsnap", memsnap_command))
+    application.add_handler(CommandHandler("tasks", tasks_command))
+    application.add_handler(CommandHandler("flood", flood_command))
+    application.add_handler(CommandHandler("reload_networks", reload_networks_command))
     
-    logger.info("Bot is running...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if metrics.METRICS_PORT:
+        metrics.instrument_handlers(application)
+    return application
+
+
+def main() -> None: 
+    """Runs the bot."""
+    mark_startup_phase('imports')
+    init_db()
+    mark_startup_phase('database')
+    application = build_application()
+
+    logger.info(f"Bot is running ({BOT_MODE} mode)...")
+    if BOT_MODE == 'webhook':
+        run_webhook(application, ALLOWED_UPDATES, post_init_callback, post_shutdown_callback)
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
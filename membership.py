@@ -0,0 +1,76 @@
+"""TTL caches for channel membership checks and channel info."""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a confirmed membership is trusted (seconds)
+MEMBERSHIP_POSITIVE_TTL = float(os.getenv('MEMBERSHIP_POSITIVE_TTL', '600'))
+# How long a "not a member" answer is trusted (seconds); kept short so joining takes effect quickly
+MEMBERSHIP_NEGATIVE_TTL = float(os.getenv('MEMBERSHIP_NEGATIVE_TTL', '20'))
+# How long the channel's title and invite link are cached (seconds)
+CHANNEL_INFO_TTL = float(os.getenv('CHANNEL_INFO_TTL', '21600'))
+# Expired entries are swept once the cache grows past this many users
+MEMBERSHIP_CACHE_SWEEP_SIZE = 50000
+
+MEMBER_STATUSES = ('member', 'creator', 'administrator')
+
+
+class MembershipCache:
+    """Caches get_chat_member and get_chat results for the mandatory channel.
+
+    Positive answers live for MEMBERSHIP_POSITIVE_TTL and negative ones for
+    the much shorter MEMBERSHIP_NEGATIVE_TTL. The channel's title and invite
+    link rarely change, so they are cached for CHANNEL_INFO_TTL and can be
+    refreshed eagerly at startup.
+    """
+
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        self._members = {}
+        self._channel_info = None
+        self._channel_info_expires = 0.0
+
+    async def is_member(self, bot, user_id: int, recheck_negative: bool = False) -> bool:
+        """Returns whether `user_id` is in the channel, asking Telegram only on a cache miss.
+
+        With `recheck_negative` a cached "not a member" answer is ignored,
+        e.g. when the user says they have just joined.
+        """
+        now = time.monotonic()
+        cached = self._members.get(user_id)
+        if cached is not None and cached[1] > now and (cached[0] or not recheck_negative):
+            return cached[0]
+
+        chat_member = await bot.get_chat_member(chat_id=self.channel_id, user_id=user_id)
+        is_member = chat_member.status in MEMBER_STATUSES
+        ttl = MEMBERSHIP_POSITIVE_TTL if is_member else MEMBERSHIP_NEGATIVE_TTL
+        if len(self._members) >= MEMBERSHIP_CACHE_SWEEP_SIZE:
+            self._sweep(now)
+        self._members[user_id] = (is_member, now + ttl)
+        return is_member
+
+    def invalidate(self, user_id: int) -> None:
+        self._members.pop(user_id, None)
+
+    def _sweep(self, now: float) -> None:
+        expired = [user_id for user_id, (_, expires) in self._members.items() if expires <= now]
+        for user_id in expired:
+            del self._members[user_id]
+
+    async def refresh_channel_info(self, bot) -> tuple:
+        """Fetches the channel's title and invite link and caches them."""
+        chat_info = await bot.get_chat(chat_id=self.channel_id)
+        # Ensure invite_link is generated or default to public username link
+        invite_link = chat_info.invite_link if chat_info.invite_link else f"https://t.me/{chat_info.username}"
+        self._channel_info = (chat_info.title, invite_link)
+        self._channel_info_expires = time.monotonic() + CHANNEL_INFO_TTL
+        logger.info(f"Cached channel info for {self.channel_id}: {chat_info.title}")
+        return self._channel_info
+
+    async def get_channel_info(self, bot) -> tuple:
+        """Returns (title, invite_link) of the channel."""
+        if self._channel_info is None or time.monotonic() >= self._channel_info_expires:
+            return await self.refresh_channel_info(bot)
+        return self._channel_info
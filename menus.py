@@ -0,0 +1,62 @@
+"""Network menus rendered once per network config instead of on every button press."""
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+BACK_TO_MAIN_MENU_BUTTON = InlineKeyboardButton("⬅️ Back to Main Menu", callback_data='back_to_start')
+HOW_TO_USE_BUTTON = InlineKeyboardButton("How to use? 🆘", callback_data='how_to_use_faucet')
+
+
+def display_name(net_name: str, config: dict) -> str:
+    return config.get('display_name', net_name.replace('_', ' ').title())
+
+
+class NetworkMenus:
+    """Inline keyboards for the faucet, purchase and Get More Tokens menus.
+
+    Built from one snapshot of network_configs and never mutated; a config
+    reload builds a new instance and swaps it in. The faucet menu marks
+    networks whose RPC is down, so one markup is kept per set of down
+    networks; that set rarely changes, so presses are still a dict lookup.
+    """
+
+    def __init__(self, network_configs: dict):
+        faucet = [(net_name, display_name(net_name, config))
+                  for net_name, config in network_configs.items() if config.get('faucet_enabled', False)]
+        self.faucet_networks = tuple(net_name for net_name, _ in faucet)
+        self._faucet_buttons = {
+            net_name: (
+                InlineKeyboardButton(f"Claim {name}", callback_data=f'claim_token_{net_name}'),
+                InlineKeyboardButton(f"🔴 {name} (temporarily down)", callback_data=f'claim_token_{net_name}'),
+            )
+            for net_name, name in faucet
+        }
+        self._faucet_markups = {}
+
+        self.purchase_markup = InlineKeyboardMarkup([
+            *([InlineKeyboardButton(f"Buy {display_name(net_name, config)}", callback_data=f'buy_token_{net_name}')]
+              for net_name, config in network_configs.items() if config.get('purchase_enabled', False)),
+            [BACK_TO_MAIN_MENU_BUTTON],
+        ])
+
+        reward_rows = []
+        for net_name, config in network_configs.items():
+            # Only tokens that can be faucet-ed can be rewards
+            if not config.get('faucet_enabled', False):
+                continue
+            name = display_name(net_name, config)
+            currency_symbol = config.get('currency_symbol', name.split(' ')[0].upper())
+            task_reward_amount = config.get('task_reward_amount', config.get('faucet_amount'))
+            if task_reward_amount is None:
+                task_reward_amount = 0
+            reward_rows.append([InlineKeyboardButton(
+                f"Get {name} ({task_reward_amount} {currency_symbol})", callback_data=f'select_reward_token_{net_name}'
+            )])
+        self.reward_markup = InlineKeyboardMarkup([*reward_rows, [BACK_TO_MAIN_MENU_BUTTON]])
+
+    def faucet_markup(self, is_available) -> InlineKeyboardMarkup:
+        """Returns the faucet menu; `is_available(net_name)` decides which networks are shown as down."""
+        down = tuple(net_name for net_name in self.faucet_networks if not is_available(net_name))
+        markup = self._faucet_markups.get(down)
+        if markup is None:
+            rows = [[self._faucet_buttons[net_name][net_name in down]] for net_name in self.faucet_networks]
+            markup = self._faucet_markups[down] = InlineKeyboardMarkup([*rows, [HOW_TO_USE_BUTTON], [BACK_TO_MAIN_MENU_BUTTON]])
+        return markup
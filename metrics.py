@@ -0,0 +1,241 @@
+"""Opt-in Prometheus-style metrics, served in the text exposition format on a local HTTP port."""
+import bisect
+import functools
+import logging
+import math
+import os
+import time
+
+from aiohttp import web
+from telegram.ext import ConversationHandler
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Port of the metrics endpoint; 0 (the default) disables metrics entirely
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+# Address the metrics endpoint binds to; keep it local and scrape through the host
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+# Upper bounds of the latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EXPOSITION_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; an observation is one bisect and two additions."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self.values.get(key)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), then the sum of all observations
+            series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labelvalues, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and the collectors that refresh gauges right before a scrape."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        """Adds an async callable that updates gauges; it runs on every scrape."""
+        self.collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self.collectors:
+            try:
+                await collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_DURATION = REGISTRY.register(Histogram(
+    'faucet_handler_duration_seconds', 'Time spent in each update handler.', ('handler',)))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    'faucet_handler_errors_total', 'Update handlers that raised an exception.', ('handler',)))
+RPC_DURATION = REGISTRY.register(Histogram(
+    'faucet_rpc_duration_seconds', 'JSON-RPC call latency, failovers included.', ('network', 'method')))
+RPC_ERRORS = REGISTRY.register(Counter(
+    'faucet_rpc_errors_total', 'JSON-RPC calls that failed.', ('network', 'method')))
+TELEGRAM_REQUESTS = REGISTRY.register(Counter(
+    'faucet_telegram_requests_total', 'Bot API requests by method and HTTP status (0 = network error).', ('method', 'status')))
+TELEGRAM_DURATION = REGISTRY.register(Histogram(
+    'faucet_telegram_request_duration_seconds', 'Bot API request latency.', ('method',)))
+TELEGRAM_RETRIES = REGISTRY.register(Counter(
+    'faucet_telegram_retries_total', 'Bot API calls retried after flood control or a network error.', ('reason',)))
+FLOOD_REJECTED = REGISTRY.register(Counter(
+    'faucet_flood_rejected_total', 'Updates dropped by flood control, by action class and reason.', ('action', 'reason')))
+USERS = REGISTRY.register(Gauge(
+    'faucet_users', 'Known users.'))
+PENDING_VERIFICATIONS = REGISTRY.register(Gauge(
+    'faucet_pending_verifications', 'Task submissions waiting for admin review.'))
+PAYOUT_QUEUE = REGISTRY.register(Gauge(
+    'faucet_payout_queue', 'Payouts waiting to be sent.', ('network',)))
+TX_IN_FLIGHT = REGISTRY.register(Gauge(
+    'faucet_tx_in_flight', 'Sent transactions not yet confirmed, failed or dropped.', ('network',)))
+SENDER_BALANCE = REGISTRY.register(Gauge(
+    'faucet_sender_balance', 'Sender wallet balance in the native token, as last fetched.', ('network',)))
+
+
+def timed_handler(callback):
+    """Wraps a handler callback so its latency and failures are recorded."""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler=name)
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_handlers(application) -> None:
+    """Wraps the callback of every registered handler, including those inside conversations."""
+    def instrument(handler):
+        if isinstance(handler, ConversationHandler):
+            for child in (*handler.entry_points, *handler.fallbacks, *(h for hs in handler.states.values() for h in hs)):
+                instrument(child)
+        elif not getattr(handler.callback, 'timed', False):
+            handler.callback = timed_handler(handler.callback)
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            instrument(handler)
+
+
+def observe_rpc(client, method: str, latency: float, error) -> None:
+    """RpcClient listener recording call latency and errors."""
+    RPC_DURATION.observe(latency, network=client.net_name, method=method)
+    if error is not None:
+        RPC_ERRORS.inc(network=client.net_name, method=method)
+
+
+class MetricsHTTPXRequest(HTTPXRequest):
+    """Bot API transport that counts requests per method and status."""
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> tuple:
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        except Exception:
+            TELEGRAM_REQUESTS.inc(method=api_method, status='0')
+            raise
+        finally:
+            TELEGRAM_DURATION.observe(time.perf_counter() - started, method=api_method)
+        TELEGRAM_REQUESTS.inc(method=api_method, status=str(code))
+        return code, payload
+
+
+class MetricsServer:
+    """Serves REGISTRY on GET /metrics."""
+
+    def __init__(self, port: int = METRICS_PORT, listen: str = METRICS_LISTEN):
+        self.port = port
+        self.listen = listen
+        self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=(await REGISTRY.render()).encode(), headers={'Content-Type': EXPOSITION_CONTENT_TYPE})
+
+    async def start(self) -> None:
+        web_app = web.Application()
+        web_app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(web_app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info(f"Metrics available at http://{self.listen}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,113 @@
+"""Nonce allocation for the bot's sender wallets, local or shared between instances."""
+import asyncio
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Substrings nodes use in errors caused by a wrong nonce (geth, erigon, nethermind, besu); a replacement
+# rejected as underpriced means another transaction of ours, e.g. from another instance, took the nonce
+NONCE_ERROR_MARKERS = ('nonce too low', 'nonce too high', 'invalid nonce', 'nonce is too low', 'nonce has already been used',
+                       'replacement transaction underpriced')
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """Returns True if the RPC rejected a transaction because of its nonce."""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+class NonceManager:
+    """Hands out nonces for one address on one network without an RPC round trip.
+
+    The counter is seeded from the pending transaction count and then
+    advanced locally under a lock, so concurrent sends never share a nonce.
+    It is resynced from the node whenever a nonce error shows it drifted.
+    Nonces given back below the counter are handed out again first, and
+    the counter never moves back past nonces that are handed out but not
+    broadcast yet, since the node cannot know about those.
+
+    When several instances send from the same wallet, `shared` (a
+    state.SharedNonceCounter) holds the counter instead, so the instances
+    never hand out the same nonce either.
+    """
+
+    def __init__(self, rpc_client, address: str, shared=None):
+        self.rpc_client = rpc_client
+        self.address = address
+        self.shared = shared
+        self._next_nonce = None
+        # Nonces handed out and neither broadcast nor given back yet
+        self._outstanding = set()
+        # Nonces given back below _next_nonce, in ascending order
+        self._released = []
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self, replace: bool = True) -> None:
+        node_nonce = await self.rpc_client.get_transaction_count(self.address, 'pending')
+        if self.shared is not None:
+            self._next_nonce = node_nonce
+            # Other instances may hold nonces the node has not seen yet; only a resync after a nonce error overrides them
+            await (self.shared.reset if replace else self.shared.seed)(node_nonce)
+        elif self._outstanding and self._next_nonce is not None:
+            # Moving back would hand out again nonces that are about to be broadcast
+            self._next_nonce = max(self._next_nonce, node_nonce)
+            self._released = [nonce for nonce in self._released if nonce >= node_nonce]
+        else:
+            self._next_nonce = node_nonce
+            self._released = []
+        logger.info(f"Nonce for {self.address} on {self.rpc_client.net_name} synced to {self._next_nonce}")
+
+    async def sync(self, replace: bool = True) -> None:
+        """Re-reads the pending transaction count from the node.
+
+        With `replace` False a shared counter is only set if no instance has
+        set it yet, as at startup.
+        """
+        async with self._lock:
+            await self._fetch(replace)
+
+    async def allocate(self) -> int:
+        """Returns the next free nonce and reserves it."""
+        return (await self.allocate_many(1))[0]
+
+    async def allocate_many(self, count: int) -> list:
+        """Reserves `count` nonces and returns them in ascending order.
+
+        They are consecutive unless nonces given back earlier fill a gap first.
+        """
+        async with self._lock:
+            if self.shared is not None:
+                while (nonces := await self.shared.allocate(count)) is None:
+                    await self._fetch(replace=False)
+                return nonces
+            if self._next_nonce is None:
+                await self._fetch()
+            nonces = self._released[:count]
+            del self._released[:count]
+            first = self._next_nonce
+            self._next_nonce += count - len(nonces)
+            nonces += range(first, self._next_nonce)
+            self._outstanding.update(nonces)
+            return nonces
+
+    def mark_sent(self, nonce: int) -> None:
+        """Records that the transaction of a reserved nonce was broadcast."""
+        self._outstanding.discard(nonce)
+
+    async def release(self, nonce: int) -> None:
+        """Gives back a nonce whose transaction was never broadcast."""
+        async with self._lock:
+            if self.shared is not None:
+                await self.shared.release(nonce)
+                return
+            self._outstanding.discard(nonce)
+            if self._next_nonce is None or nonce >= self._next_nonce:
+                return
+            bisect.insort(self._released, nonce)
+            while self._released and self._released[-1] == self._next_nonce - 1:
+                self._next_nonce = self._released.pop()
+            if self._released and not self._outstanding:
+                # Nothing is about to be broadcast, so the node's pending count shows where the gap starts
+                self._next_nonce = None
+                self._released = []
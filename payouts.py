@@ -0,0 +1,238 @@
+"""Queued payout dispatching with one worker per network."""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default max payouts started per second on each network
+PAYOUT_RATE_PER_SECOND = float(os.getenv('PAYOUT_RATE_PER_SECOND', '5'))
+# Default max payouts in flight at once on each network
+PAYOUT_CONCURRENCY = int(os.getenv('PAYOUT_CONCURRENCY', '4'))
+# Max queued payouts of one network sent as a single batch (consecutive nonces, signed in one call)
+PAYOUT_BATCH_SIZE = int(os.getenv('PAYOUT_BATCH_SIZE', '10'))
+# How long shutdown waits for in-flight payouts to finish (seconds)
+PAYOUT_SHUTDOWN_GRACE = float(os.getenv('PAYOUT_SHUTDOWN_GRACE', '15'))
+
+
+@dataclass
+class PayoutRequest:
+    """A single queued transfer of native token to a recipient."""
+    net_name: str
+    recipient_address: str
+    amount: float
+    kind: str = 'faucet'
+    user_id: Optional[int] = None
+    context: Any = None
+    # Called with (payout, tx_hash_or_error) once the send finished
+    on_complete: Optional[Callable[['PayoutRequest', str], Awaitable[None]]] = None
+    # Called with (payout, status) if a sent payout later ends failed, dropped or timed out
+    on_not_confirmed: Optional[Callable[['PayoutRequest', str], Awaitable[None]]] = None
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class PayoutQueue(asyncio.Queue):
+    """FIFO queue of one network's payouts that can put a payout back at its head."""
+
+    _put_back = False
+
+    def put_back_nowait(self, payout: PayoutRequest) -> None:
+        """Returns a payout that was taken but never started, keeping its place in line."""
+        self._put_back = True
+        try:
+            self.put_nowait(payout)
+        finally:
+            self._put_back = False
+
+    def _put(self, item) -> None:
+        if self._put_back:
+            self._queue.appendleft(item)
+        else:
+            self._queue.append(item)
+
+
+class PayoutSlots:
+    """Counts a network's payouts in flight against a limit that may change while they run.
+
+    One instance outlives worker restarts, so payouts started by a previous
+    worker keep counting against the limit of the next one.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters = []
+
+    def locked(self) -> bool:
+        return self.in_use >= self.limit
+
+    async def acquire(self) -> None:
+        while self.locked():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self._waiters.remove(waiter)
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        self.limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class PayoutDispatcher:
+    """Drains per-network payout queues at a bounded rate and concurrency.
+
+    `send_func` receives a list of PayoutRequests and returns, in order, the
+    tx hash of each or a string starting with "ERROR:" on failure, matching
+    send_native_tokens. When payouts are backed up, up to `batch_size` of
+    them go out in one call; each counts as one start for the rate limit and
+    holds one of the `concurrency` slots until its batch is sent.
+    """
+
+    def __init__(self, send_func: Callable[[list], Awaitable[list]],
+                 rate: float = PAYOUT_RATE_PER_SECOND, concurrency: int = PAYOUT_CONCURRENCY,
+                 batch_size: int = PAYOUT_BATCH_SIZE):
+        self.send_func = send_func
+        self.rate = rate
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.queues = {}
+        self._workers = {}
+        self._settings = {}
+        # PayoutSlots per network, kept across worker restarts
+        self._slots = {}
+        self._in_flight = set()
+
+    def start(self, network_configs: dict) -> None:
+        """Starts one worker per network. Per-network `payout_rate`, `payout_concurrency`
+        and `payout_batch_size` override the defaults.
+
+        Calling it again (after a config reload) starts workers for new
+        networks and restarts those whose settings changed; queued payouts
+        are kept.
+        """
+        for net_name, config in network_configs.items():
+            settings = (config.get('payout_rate', self.rate), config.get('payout_concurrency', self.concurrency),
+                        config.get('payout_batch_size', self.batch_size))
+            if self._settings.get(net_name) == settings:
+                continue
+            if net_name in self._workers:
+                self._workers.pop(net_name).cancel()
+            rate, concurrency, batch_size = self._settings[net_name] = settings
+            self.queues.setdefault(net_name, PayoutQueue())
+            self._slots.setdefault(net_name, PayoutSlots(concurrency)).resize(concurrency)
+            self._workers[net_name] = asyncio.create_task(
+                self._worker(net_name, rate, batch_size), name=f"payout-worker-{net_name}"
+            )
+            logger.info(f"Payout worker for {net_name} started (rate={rate}/s, concurrency={concurrency}, batch={batch_size}).")
+
+    async def remove(self, net_name: str) -> None:
+        """Stops a network's worker and fails the payouts still queued for it."""
+        worker = self._workers.pop(net_name, None)
+        self._settings.pop(net_name, None)
+        self._slots.pop(net_name, None)
+        if worker:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+        queue = self.queues.pop(net_name, None)
+        while queue is not None and not queue.empty():
+            payout = queue.get_nowait()
+            if payout.on_complete:
+                try:
+                    await payout.on_complete(payout, "ERROR: This network is no longer available.")
+                except Exception as e:
+                    logger.error(f"Payout completion callback failed for {payout.recipient_address} on {net_name}: {e}")
+
+    def submit(self, payout: PayoutRequest) -> int:
+        """Queues a payout and returns its position in the network's queue."""
+        queue = self.queues.get(payout.net_name)
+        if queue is None:
+            raise KeyError(f"No payout worker running for network '{payout.net_name}'")
+        queue.put_nowait(payout)
+        return queue.qsize()
+
+    def pending(self, net_name: str = None) -> int:
+        """Returns the number of queued (not yet started) payouts."""
+        if net_name is not None:
+            queue = self.queues.get(net_name)
+            return queue.qsize() if queue else 0
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    async def _worker(self, net_name: str, rate: float, batch_size: int) -> None:
+        queue = self.queues[net_name]
+        slots = self._slots[net_name]
+        interval = 1 / rate if rate > 0 else 0
+        next_start = 0.0
+        while True:
+            payout = await queue.get()
+            slot_taken = False
+            try:
+                await slots.acquire()
+                slot_taken = True
+                delay = next_start - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Restarted or stopped before this payout began; it stays first in line for the next worker
+                if slot_taken:
+                    slots.release()
+                queue.put_back_nowait(payout)
+                queue.task_done()
+                raise
+            # Payouts that queued up meanwhile go out with this one, as far as free slots allow
+            batch = [payout]
+            while len(batch) < batch_size and not queue.empty() and not slots.locked():
+                await slots.acquire()
+                batch.append(queue.get_nowait())
+            next_start = time.monotonic() + interval * len(batch)
+            task = asyncio.create_task(self._run(batch, slots, queue))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: list, slots: PayoutSlots, queue: asyncio.Queue) -> None:
+        try:
+            try:
+                results = await self.send_func(batch)
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} payouts on {batch[0].net_name} crashed: {e}")
+                results = [f"ERROR: {e}"] * len(batch)
+        finally:
+            for _ in batch:
+                slots.release()
+                queue.task_done()
+
+        for payout, result in zip(batch, results):
+            waited = time.time() - payout.enqueued_at
+            logger.info(f"Payout ({payout.kind}) on {payout.net_name} finished after {waited:.1f}s: {result}")
+            if payout.on_complete:
+                try:
+                    await payout.on_complete(payout, result)
+                except Exception as e:
+                    logger.error(f"Payout completion callback failed for {payout.recipient_address} on {payout.net_name}: {e}")
+
+    async def stop(self) -> None:
+        """Stops the workers and waits briefly for in-flight payouts."""
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._settings.clear()
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=PAYOUT_SHUTDOWN_GRACE)
+        dropped = self.pending()
+        if dropped:
+            logger.warning(f"Payout dispatcher stopped with {dropped} payouts still queued.")
@@ -0,0 +1,143 @@
+"""Low-overhead profiling helpers for a live bot: stack sampling, tracemalloc snapshots and asyncio task dumps."""
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stack samples; 0.01 (100 Hz) keeps the sampler's own CPU use to a few percent
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.01'))
+# Longest run a single /profile may request (seconds)
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+# Frames kept per allocation while tracemalloc is on; more frames cost more memory and time
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '10'))
+# Lines per tracemalloc report
+PROFILE_TOP_ALLOCATIONS = 50
+# Frames printed per asyncio task
+PROFILE_TASK_STACK_LIMIT = 20
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a helper thread.
+
+    Results are in the "folded" format (`frame;frame;frame count` per line)
+    read by flamegraph.pl, speedscope and inferno. Only one run can be
+    active at a time, which bounds the overhead.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _sample(self, thread_id: int, duration: float) -> tuple:
+        counts = {}
+        samples = 0
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+                samples += 1
+            time.sleep(self.interval)
+        return counts, samples
+
+    def start(self, duration: float) -> asyncio.Task:
+        """Starts sampling the event loop thread for `duration` seconds.
+
+        Raises RuntimeError if a run is already in progress. The returned
+        task resolves to (folded text, sample count).
+        """
+        if self.is_running():
+            raise RuntimeError("A profile is already running.")
+        self._task = asyncio.create_task(
+            self._profile(threading.get_ident(), min(duration, PROFILE_MAX_SECONDS)), name='stack-sampler'
+        )
+        return self._task
+
+    async def _profile(self, thread_id: int, duration: float) -> tuple:
+        counts, samples = await asyncio.to_thread(self._sample, thread_id, duration)
+        folded = '\n'.join(f"{stack} {count}" for stack, count in sorted(counts.items(), key=lambda item: -item[1]))
+        return folded + '\n', samples
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots, each diffed against the previous one.
+
+    Tracing is started by the first snapshot and stays on until stop(),
+    since it slows down every allocation while active.
+    """
+
+    def __init__(self, frames: int = PROFILE_TRACEMALLOC_FRAMES):
+        self.frames = frames
+        self.previous = None
+
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+    def snapshot(self) -> str:
+        """Returns a report of the top allocation sites (and starts tracing if needed)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.previous = None
+            return "tracemalloc started; allocations are tracked from now on. Take another snapshot to see them.\n"
+        snapshot = self._take()
+        current, peak = tracemalloc.get_traced_memory()
+        out = io.StringIO()
+        out.write(f"Traced memory: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)\n\n")
+        out.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites:\n")
+        for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+        self.previous = snapshot
+        return out.getvalue()
+
+    def diff(self) -> str:
+        """Returns the allocation sites that grew the most since the previous snapshot."""
+        if not tracemalloc.is_tracing() or self.previous is None:
+            return "No earlier snapshot to compare against; take a snapshot first.\n"
+        snapshot = self._take()
+        out = io.StringIO()
+        out.write(f"Top {PROFILE_TOP_ALLOCATIONS} changes since the previous snapshot:\n")
+        for stat in snapshot.compare_to(self.previous, 'lineno')[:PROFILE_TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+        self.previous = snapshot
+        return out.getvalue()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.previous = None
+
+
+def dump_task_stacks() -> str:
+    """Returns the name, coroutine and current stack of every asyncio task."""
+    tasks = sorted(asyncio.all_tasks(), key=lambda task: task.get_name())
+    out = io.StringIO()
+    out.write(f"{len(tasks)} asyncio tasks\n")
+    for task in tasks:
+        out.write(f"\n=== {task.get_name()}: {task.get_coro()!r}\n")
+        task.print_stack(limit=PROFILE_TASK_STACK_LIMIT, file=out)
+    return out.getvalue()
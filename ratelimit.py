@@ -0,0 +1,36 @@
+"""Rate limiting primitives."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursting up to `capacity`.
+
+    A rate of 0 or less means unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Takes `tokens` if they are available right now."""
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Waits until `tokens` are available and takes them."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
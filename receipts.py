@@ -0,0 +1,268 @@
+"""Background tracking of sent transactions until they are mined, with stuck-tx replacement."""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from nonces import is_nonce_error
+from rpc import is_rpc_error
+
+logger = logging.getLogger(__name__)
+
+# How often the receipts of in-flight transactions are polled (seconds)
+RECEIPT_POLL_INTERVAL = float(os.getenv('RECEIPT_POLL_INTERVAL', '5'))
+# Blocks a receipt must be buried under before the transaction counts as confirmed (1 = mined)
+RECEIPT_CONFIRMATIONS = int(os.getenv('RECEIPT_CONFIRMATIONS', '1'))
+# Max calls per JSON-RPC batch; public endpoints often reject larger batches
+RECEIPT_BATCH_SIZE = int(os.getenv('RECEIPT_BATCH_SIZE', '50'))
+# A transaction still pending this long after its last broadcast is replaced with a higher fee (seconds)
+RECEIPT_REPLACE_AFTER = float(os.getenv('RECEIPT_REPLACE_AFTER', '90'))
+# Fee multiplier per replacement; nodes require at least +10% to accept a replacement
+RECEIPT_FEE_BUMP = float(os.getenv('RECEIPT_FEE_BUMP', '1.125'))
+# Replacement attempts for one nonce, rejected ones included, before the bot stops raising the fee
+RECEIPT_MAX_REPLACEMENTS = int(os.getenv('RECEIPT_MAX_REPLACEMENTS', '5'))
+# Highest maxFeePerGas / gasPrice a replacement may offer, whatever the bumps add up to (wei; default 500 gwei)
+RECEIPT_MAX_FEE_WEI = int(os.getenv('RECEIPT_MAX_FEE_WEI', '500000000000'))
+# A transaction without a receipt this long after it was first sent is given up on (seconds)
+RECEIPT_TIMEOUT = float(os.getenv('RECEIPT_TIMEOUT', '3600'))
+# Polls that must see the nonce used by some other transaction before ours counts as dropped
+RECEIPT_DROPPED_POLLS = 3
+
+STATUS_CONFIRMED, STATUS_FAILED, STATUS_DROPPED, STATUS_TIMEOUT = 'confirmed', 'failed', 'dropped', 'timeout'
+
+
+@dataclass
+class TrackedTransaction:
+    """A broadcast transaction and every replacement sent for its nonce."""
+    net_name: str
+    transaction: dict
+    tx_hashes: list
+    # Called with (tracked, status, receipt) once the transaction is confirmed, failed, dropped or timed out
+    on_final: Optional[Callable[['TrackedTransaction', str, Optional[dict]], Awaitable[None]]] = None
+    sent_at: float = field(default_factory=time.time)
+    # Last broadcast, or last rejected replacement attempt, which backs off the next one just the same
+    last_sent_at: float = field(default_factory=time.time)
+    # Replacement attempts so far, including rejected ones
+    replacements: int = 0
+    nonce_used_polls: int = 0
+    # Hash whose receipt was found; may be an earlier one than tx_hash
+    mined_hash: Optional[str] = None
+
+    @property
+    def key(self) -> tuple:
+        # The first hash tells apart two payouts that were ever sent with the same nonce
+        return (self.transaction['from'], self.transaction['nonce'], self.tx_hashes[0])
+
+    @property
+    def tx_hash(self) -> str:
+        """Hash of the most recent broadcast, the one expected to be mined."""
+        return self.tx_hashes[-1]
+
+
+def bumped_fee_fields(transaction: dict, estimate: Any, bump: float = RECEIPT_FEE_BUMP,
+                      ceiling: int = RECEIPT_MAX_FEE_WEI) -> dict:
+    """Returns fee fields for a replacement: the old fees times `bump`, or the current estimate if higher.
+
+    No fee goes above `ceiling`, so the result may equal the old fees.
+    """
+    if 'maxFeePerGas' in transaction:
+        priority_fee = estimate.priority_fee if estimate.eip1559 else estimate.gas_price
+        max_fee = estimate.max_fee if estimate.eip1559 else estimate.gas_price
+        return {
+            'maxPriorityFeePerGas': min(max(int(transaction['maxPriorityFeePerGas'] * bump) + 1, priority_fee), ceiling),
+            'maxFeePerGas': min(max(int(transaction['maxFeePerGas'] * bump) + 1, max_fee), ceiling),
+        }
+    gas_price = estimate.max_fee if estimate.eip1559 else estimate.gas_price
+    return {'gasPrice': min(max(int(transaction['gasPrice'] * bump) + 1, gas_price), ceiling)}
+
+
+def _to_int(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class ReceiptTracker:
+    """Follows every transaction the bot sends until it is final.
+
+    Each poll asks a network's RPC for the head block, the sender's mined
+    nonce and the receipt of every hash in flight in as few JSON-RPC
+    batches as RECEIPT_BATCH_SIZE allows, instead of one request per hash.
+    A transaction still pending RECEIPT_REPLACE_AFTER seconds after its last
+    broadcast is re-signed at the same nonce with bumped fees, so one
+    underpriced transaction cannot stall every later nonce of the wallet.
+    All hashes sent for a nonce are polled, since any of them may be mined.
+
+    `sign_func(transaction)` is a coroutine returning the signed raw transaction.
+    """
+
+    def __init__(self, rpc_clients: dict, fee_oracle, sign_func: Callable[[dict], Awaitable[bytes]],
+                 poll_interval: float = RECEIPT_POLL_INTERVAL, confirmations: int = RECEIPT_CONFIRMATIONS):
+        self.rpc_clients = rpc_clients
+        self.fee_oracle = fee_oracle
+        self.sign_func = sign_func
+        self.poll_interval = poll_interval
+        self.confirmations = confirmations
+        self.pending = {}
+        # In-flight count per (net_name, sender address)
+        self._per_sender = {}
+        self.counters = {}
+        self._task = None
+
+    def track(self, net_name: str, transaction: dict, tx_hash: str, on_final=None) -> TrackedTransaction:
+        """Starts following a transaction that was just broadcast.
+
+        A transaction already followed is kept as it is. Another payout sent
+        with the nonce of one in flight is followed separately: whichever is
+        mined confirms, the other ends as dropped.
+        """
+        tracked = TrackedTransaction(net_name, dict(transaction), [tx_hash], on_final)
+        transactions = self.pending.setdefault(net_name, {})
+        if tracked.key in transactions:
+            logger.warning(f"Transaction {tx_hash} on {net_name} is already being tracked.")
+            return transactions[tracked.key]
+        sharing = [tx for tx in transactions.values() if tx.key[:2] == tracked.key[:2]]
+        if sharing:
+            logger.error(f"Transaction {tx_hash} on {net_name} reuses nonce {transaction['nonce']} of {transaction['from']}, "
+                         f"already taken by {', '.join(tx.tx_hash for tx in sharing)}; at most one of them can be mined.")
+        sender_key = (net_name, transaction['from'])
+        self._per_sender[sender_key] = self._per_sender.get(sender_key, 0) + 1
+        transactions[tracked.key] = tracked
+        return tracked
+
+    def in_flight(self, net_name: str = None, address: str = None) -> int:
+        """Returns the number of sent transactions that are not final yet, optionally of one sender."""
+        if address is not None:
+            return self._per_sender.get((net_name, address), 0)
+        if net_name is not None:
+            return len(self.pending.get(net_name, {}))
+        return sum(len(transactions) for transactions in self.pending.values())
+
+    def forget(self, net_name: str) -> None:
+        """Stops following a network's transactions, e.g. after it was removed from the config."""
+        dropped = self.pending.pop(net_name, {})
+        for sender_key in [sender_key for sender_key in self._per_sender if sender_key[0] == net_name]:
+            del self._per_sender[sender_key]
+        if dropped:
+            logger.warning(f"Stopped tracking {len(dropped)} in-flight transactions on {net_name}.")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._poll_loop(), name='receipt-tracker')
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.in_flight():
+            logger.warning(f"Receipt tracker stopped with {self.in_flight()} transactions still in flight.")
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await asyncio.gather(*(self._poll_quietly(net_name) for net_name, txs in list(self.pending.items()) if txs))
+
+    async def _poll_quietly(self, net_name: str) -> None:
+        try:
+            await self.poll(net_name)
+        except Exception as e:
+            logger.warning(f"Receipt poll for {net_name} failed: {e}")
+
+    async def _fetch(self, rpc_client, tracked: list) -> tuple:
+        """Returns (head block, mined nonce per sender, receipt or None per hash) for `tracked`."""
+        senders = sorted({tx.transaction['from'] for tx in tracked})
+        hashes = [tx_hash for tx in tracked for tx_hash in tx.tx_hashes]
+        calls = [('eth_blockNumber', []), *(('eth_getTransactionCount', [sender, 'latest']) for sender in senders),
+                 *(('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes)]
+        batches = [calls[i:i + RECEIPT_BATCH_SIZE] for i in range(0, len(calls), RECEIPT_BATCH_SIZE)]
+        results = [result for batch in await asyncio.gather(*(rpc_client.batch_request(batch) for batch in batches))
+                   for result in batch]
+        for result in results[:1 + len(senders)]:
+            if isinstance(result, Exception):
+                raise result
+        head = _to_int(results[0])
+        mined_nonces = {sender: _to_int(result) for sender, result in zip(senders, results[1:1 + len(senders)])}
+        # A receipt call the node rejected is treated like a receipt that is not there yet
+        receipts = {tx_hash: result if isinstance(result, dict) else None
+                    for tx_hash, result in zip(hashes, results[1 + len(senders):])}
+        return head, mined_nonces, receipts
+
+    async def poll(self, net_name: str) -> None:
+        """Checks every in-flight transaction of a network once, finalizing or replacing as needed."""
+        rpc_client = self.rpc_clients.get(net_name)
+        transactions = self.pending.get(net_name)
+        if rpc_client is None or not transactions:
+            return
+        tracked = list(transactions.values())
+        head, mined_nonces, receipts = await self._fetch(rpc_client, tracked)
+
+        now = time.time()
+        for tx in tracked:
+            tx.mined_hash = next((tx_hash for tx_hash in reversed(tx.tx_hashes) if receipts.get(tx_hash)), None)
+            if tx.mined_hash is not None:
+                receipt = receipts[tx.mined_hash]
+                if head - _to_int(receipt['blockNumber']) + 1 >= self.confirmations:
+                    status = STATUS_CONFIRMED if _to_int(receipt.get('status', 1)) == 1 else STATUS_FAILED
+                    await self._finalize(tx, status, receipt)
+                continue
+            if mined_nonces[tx.transaction['from']] > tx.transaction['nonce']:
+                # The nonce was used, but not by any of our hashes (or the receipt is still propagating)
+                tx.nonce_used_polls += 1
+                if tx.nonce_used_polls >= RECEIPT_DROPPED_POLLS:
+                    await self._finalize(tx, STATUS_DROPPED, None)
+                continue
+            if now - tx.sent_at > RECEIPT_TIMEOUT:
+                await self._finalize(tx, STATUS_TIMEOUT, None)
+            elif now - tx.last_sent_at > RECEIPT_REPLACE_AFTER and tx.replacements < RECEIPT_MAX_REPLACEMENTS:
+                await self._replace(rpc_client, tx)
+
+    async def _replace(self, rpc_client, tx: TrackedTransaction) -> None:
+        """Re-sends a stuck transaction at the same nonce with higher fees.
+
+        Fees are bumped from the last broadcast, never from a rejected
+        attempt, and every attempt counts toward RECEIPT_MAX_REPLACEMENTS.
+        """
+        estimate = await self.fee_oracle.get(tx.net_name)
+        fee_fields = bumped_fee_fields(tx.transaction, estimate)
+        if all(tx.transaction[name] >= fee for name, fee in fee_fields.items()):
+            tx.replacements = RECEIPT_MAX_REPLACEMENTS
+            logger.warning(f"Stuck transaction {tx.tx_hash} on {tx.net_name} already pays the fee ceiling; not replacing it.")
+            return
+        transaction = {**tx.transaction, **fee_fields}
+        try:
+            tx_hash = await rpc_client.send_raw_transaction(await self.sign_func(transaction))
+        except Exception as e:
+            if not is_rpc_error(e):
+                # The node never answered; the attempt is retried on the next poll
+                raise
+            # A rejected attempt counts and waits as long as a broadcast one before the next try
+            tx.replacements += 1
+            tx.last_sent_at = time.time()
+            # An underpriced replacement counts as a nonce error for new sends; here it only means the bump was too small
+            if is_nonce_error(e) and 'underpriced' not in str(e).lower():
+                # Already mined; the next poll finds the receipt
+                logger.info(f"Nonce {tx.transaction['nonce']} on {tx.net_name} was mined before its replacement went out.")
+                return
+            logger.warning(f"Replacement {tx.replacements}/{RECEIPT_MAX_REPLACEMENTS} of {tx.tx_hash} on {tx.net_name} "
+                           f"was rejected: {e}")
+            return
+        replaced_hash = tx.tx_hash
+        tx.replacements += 1
+        tx.last_sent_at = time.time()
+        tx.transaction = transaction
+        if tx_hash not in tx.tx_hashes:
+            tx.tx_hashes.append(tx_hash)
+        self.counters['replaced'] = self.counters.get('replaced', 0) + 1
+        logger.info(f"Replaced stuck transaction {replaced_hash} on {tx.net_name} (nonce {tx.transaction['nonce']}) "
+                    f"with {tx_hash} (replacement {tx.replacements}/{RECEIPT_MAX_REPLACEMENTS}).")
+
+    async def _finalize(self, tx: TrackedTransaction, status: str, receipt: Optional[dict]) -> None:
+        if self.pending.get(tx.net_name, {}).pop(tx.key, None) is not None:
+            self._per_sender[(tx.net_name, tx.transaction['from'])] -= 1
+        self.counters[status] = self.counters.get(status, 0) + 1
+        if status != STATUS_CONFIRMED:
+            logger.warning(f"Transaction {tx.tx_hash} on {tx.net_name} (nonce {tx.transaction['nonce']}) ended as {status}.")
+        if tx.on_final:
+            try:
+                await tx.on_final(tx, status, receipt)
+            except Exception as e:
+                logger.error(f"Receipt callback failed for {tx.tx_hash} on {tx.net_name}: {e}")
@@ -0,0 +1,285 @@
+"""Async RPC layer used for all chain I/O done by the bot."""
+import asyncio
+import functools
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Optional
+
+import aiohttp
+from eth_utils import keccak, to_hex
+
+from ratelimit import TokenBucket
+
+if TYPE_CHECKING:
+    from web3 import AsyncWeb3
+
+logger = logging.getLogger(__name__)
+
+# Per-call timeout (seconds) applied to every RPC request
+RPC_CALL_TIMEOUT = float(os.getenv('RPC_CALL_TIMEOUT', '10'))
+# Max pooled connections kept open per endpoint
+RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', '20'))
+# How long an idle keep-alive connection stays in the pool (seconds)
+RPC_KEEPALIVE_TIMEOUT = float(os.getenv('RPC_KEEPALIVE_TIMEOUT', '30'))
+# Default max requests per second sent to a single endpoint (0 = unlimited)
+RPC_ENDPOINT_RATE_LIMIT = float(os.getenv('RPC_ENDPOINT_RATE_LIMIT', '25'))
+# First and max cooldown for an endpoint after a failure (seconds); doubles per consecutive failure
+RPC_ENDPOINT_COOLDOWN = float(os.getenv('RPC_ENDPOINT_COOLDOWN', '2'))
+RPC_ENDPOINT_MAX_COOLDOWN = float(os.getenv('RPC_ENDPOINT_MAX_COOLDOWN', '120'))
+
+# Smoothing factor for the per-endpoint latency moving average
+LATENCY_ALPHA = 0.2
+
+
+class RpcTimeoutError(Exception):
+    """Raised when an RPC call does not complete within its timeout."""
+
+
+def endpoints_from_config(config: dict) -> list:
+    """Returns a network's endpoints as (url, rate_limit) pairs.
+
+    `rpc_urls` may list plain URLs or {'url': ..., 'rate_limit': ...} dicts;
+    a single `rpc_url` is still accepted. `rpc_rate_limit` sets the default
+    rate limit for the network's endpoints.
+    """
+    default_rate_limit = config.get('rpc_rate_limit', RPC_ENDPOINT_RATE_LIMIT)
+    entries = config.get('rpc_urls') or [config['rpc_url']]
+    endpoints = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            endpoints.append((entry['url'], entry.get('rate_limit', default_rate_limit)))
+        else:
+            endpoints.append((entry, default_rate_limit))
+    return endpoints
+
+
+def _retry_after(error: Exception):
+    """Returns the Retry-After delay of an HTTP 429 response (0 if absent), or None for other errors."""
+    if isinstance(error, aiohttp.ClientResponseError) and error.status == 429:
+        try:
+            return float((error.headers or {}).get('Retry-After', 0))
+        except ValueError:
+            return 0
+    return None
+
+
+@functools.cache
+def rpc_error_class() -> type:
+    """Returns web3's Web3RPCError, importing web3 on first use so importing this module stays cheap."""
+    from web3.exceptions import Web3RPCError
+    return Web3RPCError
+
+
+def is_rpc_error(error: Optional[Exception]) -> bool:
+    """True if `error` is a node's JSON-RPC error answer rather than a transport failure."""
+    return error is not None and isinstance(error, rpc_error_class())
+
+
+class RpcEndpoint:
+    """One RPC URL of a network, with its own session, rate limit and latency stats."""
+
+    def __init__(self, url: str, rate_limit: float):
+        # web3 takes over a second to import, so it is loaded with the first client rather than with this module
+        from web3 import AsyncWeb3, AsyncHTTPProvider
+
+        self.url = url
+        # Retries are disabled in web3 itself; RpcClient fails over to the next endpoint instead
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(url, exception_retry_configuration=None))
+        self.limiter = TokenBucket(rate_limit)
+        self.latency = None
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self._session = None
+
+    async def start(self, timeout: float) -> None:
+        connector = aiohttp.TCPConnector(limit=RPC_POOL_SIZE, keepalive_timeout=RPC_KEEPALIVE_TIMEOUT)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            raise_for_status=True
+        )
+        await self.w3.provider.cache_async_session(self._session)
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def is_cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def record_success(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_failure(self, retry_after: float = None) -> None:
+        self.consecutive_failures += 1
+        cooldown = retry_after or min(RPC_ENDPOINT_COOLDOWN * 2 ** (self.consecutive_failures - 1), RPC_ENDPOINT_MAX_COOLDOWN)
+        self.cooldown_until = time.monotonic() + cooldown
+
+
+class RpcClient:
+    """Async Web3 client for a single network, spread over one or more endpoints.
+
+    Each endpoint keeps a pooled keep-alive aiohttp session so handlers never
+    pay for a new TCP/TLS handshake, and every attempt is bounded by a timeout
+    so a slow RPC cannot hold a handler forever. Calls go to the endpoint with
+    the lowest observed latency that still has rate-limit budget. On transport
+    errors, timeouts or HTTP 429 that endpoint is put in a cooldown and the
+    call fails over to the next one. JSON-RPC errors come from the node itself
+    and are never retried elsewhere.
+    """
+
+    def __init__(self, net_name: str, endpoints: list, timeout: float = RPC_CALL_TIMEOUT):
+        self.net_name = net_name
+        self.timeout = timeout
+        self.endpoints = [RpcEndpoint(url, rate_limit) for url, rate_limit in endpoints]
+        # Callables notified after every call as listener(client, method, latency, error)
+        self.listeners = []
+
+    @property
+    def w3(self) -> 'AsyncWeb3':
+        """Web3 instance of the primary endpoint, for offline helpers such as signing."""
+        return self.endpoints[0].w3
+
+    @property
+    def rpc_urls(self) -> list:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    async def start(self) -> None:
+        """Creates the pooled HTTP sessions. Must run inside the bot's event loop."""
+        for endpoint in self.endpoints:
+            await endpoint.start(self.timeout)
+
+    async def close(self) -> None:
+        """Closes the pooled HTTP sessions."""
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+    async def _pick(self, exclude: set):
+        """Returns the fastest endpoint not yet tried that has rate-limit budget, waiting for budget if needed."""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        # Unmeasured endpoints sort first so they get a latency sample
+        ready = sorted((e for e in candidates if not e.is_cooling_down()), key=lambda e: e.latency or 0)
+        # Endpoints in cooldown are only used once every healthy one has failed
+        ranked = ready or sorted(candidates, key=lambda e: e.cooldown_until)
+        if not ranked:
+            return None
+        for endpoint in ranked:
+            if endpoint.limiter.try_acquire():
+                return endpoint
+        await ranked[0].limiter.acquire()
+        return ranked[0]
+
+    async def _call(self, method: str, request, timeout: float = None):
+        """Runs `request(w3)` against the best endpoint, failing over on transport errors.
+
+        Anything else (e.g. a ValueError from a malformed address or amount)
+        is a problem with the call itself, not the endpoint, and is raised
+        unchanged without counting against any endpoint.
+        """
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+        tried = set()
+        error = None
+        while (endpoint := await self._pick(tried)) is not None:
+            tried.add(endpoint)
+            attempt_started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(request(endpoint.w3), timeout)
+            except rpc_error_class() as e:
+                endpoint.record_success(time.monotonic() - attempt_started)
+                self._notify(method, started, e)
+                raise
+            except asyncio.TimeoutError:
+                error = RpcTimeoutError(f"{method} on {self.net_name} timed out after {timeout}s")
+                endpoint.record_failure()
+            except (aiohttp.ClientError, OSError) as e:
+                error = e
+                endpoint.record_failure(_retry_after(e))
+            else:
+                endpoint.record_success(time.monotonic() - attempt_started)
+                self._notify(method, started, None)
+                return result
+            logger.warning(f"{method} on {self.net_name} via {endpoint.url} failed: {error}")
+        self._notify(method, started, error)
+        raise error
+
+    def _notify(self, method: str, started: float, error) -> None:
+        latency = time.monotonic() - started
+        for listener in self.listeners:
+            listener(self, method, latency, error)
+
+    async def probe_endpoints(self, timeout: float = None) -> None:
+        """Measures every endpoint with eth_blockNumber; raises if none of them answered."""
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+
+        async def probe(endpoint: RpcEndpoint):
+            attempt_started = time.monotonic()
+            try:
+                await asyncio.wait_for(endpoint.w3.eth.block_number, timeout)
+            except asyncio.TimeoutError:
+                endpoint.record_failure()
+                return RpcTimeoutError(f"eth_blockNumber on {self.net_name} via {endpoint.url} timed out after {timeout}s")
+            except Exception as e:
+                endpoint.record_failure(_retry_after(e))
+                return e
+            endpoint.record_success(time.monotonic() - attempt_started)
+            return None
+
+        errors = await asyncio.gather(*(probe(endpoint) for endpoint in self.endpoints))
+        if all(errors):
+            self._notify('eth_blockNumber', started, errors[0])
+            raise errors[0]
+        self._notify('eth_blockNumber', started, None)
+
+    async def is_connected(self) -> bool:
+        """Returns True if any endpoint answers within the timeout."""
+        try:
+            await self.probe_endpoints()
+            return True
+        except Exception as e:
+            logger.debug(f"Connection check for {self.net_name} failed: {e}")
+            return False
+
+    async def block_number(self, timeout: float = None) -> int:
+        return await self._call('eth_blockNumber', lambda w3: w3.eth.block_number, timeout)
+
+    async def gas_price(self) -> int:
+        return await self._call('eth_gasPrice', lambda w3: w3.eth.gas_price)
+
+    async def fee_history(self, block_count: int, newest_block: str = 'latest', reward_percentiles: list = None):
+        return await self._call('eth_feeHistory', lambda w3: w3.eth.fee_history(block_count, newest_block, reward_percentiles))
+
+    async def get_transaction_count(self, address: str, block_identifier: str = 'latest') -> int:
+        return await self._call('eth_getTransactionCount', lambda w3: w3.eth.get_transaction_count(address, block_identifier))
+
+    async def get_balance(self, address: str, block_identifier='latest') -> int:
+        return await self._call('eth_getBalance', lambda w3: w3.eth.get_balance(address, block_identifier))
+
+    async def batch_request(self, calls: list) -> list:
+        """Sends (method, params) pairs as one JSON-RPC batch, with the same failover as single calls.
+
+        Returns one entry per call, in order: the raw result, or a
+        Web3RPCError if the node rejected that call.
+        """
+        responses = await self._call('batch', lambda w3: w3.provider.make_batch_request(calls))
+        if not isinstance(responses, list):
+            # Nodes that refuse the whole batch answer with a single error object
+            raise rpc_error_class()(f"Batch of {len(calls)} calls on {self.net_name} rejected: {responses.get('error')}")
+        return [rpc_error_class()(str(response['error'])) if response.get('error') else response.get('result')
+                for response in responses]
+
+    async def send_raw_transaction(self, raw_transaction) -> str:
+        """Broadcasts a signed transaction and returns its hash as hex."""
+        try:
+            tx_hash = await self._call('eth_sendRawTransaction', lambda w3: w3.eth.send_raw_transaction(raw_transaction))
+        except rpc_error_class() as e:
+            # After a failover the first endpoint may already have relayed the tx
+            if 'already known' not in str(e).lower():
+                raise
+            tx_hash = keccak(raw_transaction)
+            logger.info(f"Transaction {to_hex(tx_hash)} on {self.net_name} was already known to the node.")
+        return to_hex(tx_hash)
@@ -0,0 +1,88 @@
+"""Transaction signing off the event loop, in a thread or process pool."""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 'thread' (default), 'process' or 'inline'. Without the coincurve package, signing is pure
+# Python and holds the GIL, so only 'process' takes it off the event loop's core entirely.
+SIGNING_POOL = os.getenv('SIGNING_POOL', 'thread')
+# Worker threads or processes in the signing pool
+SIGNING_WORKERS = int(os.getenv('SIGNING_WORKERS', '2'))
+
+# Private keys by lowercase address, set in each worker by _init_worker
+_worker_keys = {}
+
+
+def _init_worker(keys: dict) -> None:
+    global _worker_keys
+    _worker_keys = keys
+
+
+def _sign_batch(transactions: list) -> list:
+    """Signs each transaction with the key of its 'from' address. Runs inside the pool."""
+    from eth_account import Account
+
+    return [Account.sign_transaction(transaction, private_key=_worker_keys[transaction['from'].lower()]).raw_transaction
+            for transaction in transactions]
+
+
+class TransactionSigner:
+    """Signs transactions for the wallets whose keys it was given, never on the event loop.
+
+    Keys are handed to the pool once, when its workers start, so a batch
+    only carries the transactions. `sign_batch()` signs a run of
+    transactions (typically consecutive nonces) in a single pool call, which
+    amortizes the hand-off for high-volume payouts.
+    """
+
+    def __init__(self, private_keys: dict, mode: str = SIGNING_POOL, workers: int = SIGNING_WORKERS):
+        self.keys = {address.lower(): key for address, key in private_keys.items()}
+        self.mode = mode
+        self.workers = workers
+        self._executor = None
+
+    def _create_executor(self) -> Executor:
+        if self.mode == 'process':
+            # Spawned rather than forked: the bot has threads, and forking a threaded process is unsafe
+            return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(self.keys,))
+        _init_worker(self.keys)
+        return ThreadPoolExecutor(self.workers, thread_name_prefix='signer')
+
+    def start(self) -> None:
+        if self.mode not in ('thread', 'process', 'inline'):
+            raise ValueError(f"Unknown SIGNING_POOL '{self.mode}'; use thread, process or inline.")
+        if self.mode == 'inline':
+            _init_worker(self.keys)
+        else:
+            self._executor = self._create_executor()
+        logger.info(f"Transaction signer started ({self.mode}, {self.workers} workers).")
+
+    def set_keys(self, private_keys: dict) -> None:
+        """Replaces the wallets the signer holds keys for, e.g. after a config reload."""
+        self.keys = {address.lower(): key for address, key in private_keys.items()}
+        if self.mode != 'process' or self._executor is None:
+            _init_worker(self.keys)
+            return
+        # Worker processes only get keys when they start; calls already submitted finish on the old pool
+        previous, self._executor = self._executor, self._create_executor()
+        previous.shutdown(wait=False)
+
+    async def stop(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def sign(self, transaction: dict) -> bytes:
+        """Returns the raw signed transaction."""
+        return (await self.sign_batch([transaction]))[0]
+
+    async def sign_batch(self, transactions: list) -> list:
+        """Returns the raw signed transactions, in order, from one pool call."""
+        if self._executor is None:
+            return _sign_batch(transactions)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, _sign_batch, transactions)
@@ -0,0 +1,737 @@
+"""Shared bot state (users, cooldowns, redeemed and claimed addresses, pending reviews, maintenance) behind a pluggable backend."""
+import asyncio
+import itertools
+import math
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from addresses import AddressIndex, address_key, canonical_address
+
+logger = logging.getLogger(__name__)
+
+# Where shared state lives: 'memory' (this process only) or 'redis' (shared by every bot instance)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory').lower()
+# Connection URL of the Redis-protocol server used by the 'redis' backend
+STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+# Prefix of every key the 'redis' backend writes, so several bots can share one server
+STATE_KEY_PREFIX = os.getenv('STATE_KEY_PREFIX', 'faucetbot')
+# Records written per round trip when seeding Redis from the local database
+STATE_SEED_BATCH_SIZE = 1000
+
+
+class StateBackend(ABC):
+    """State shared by every instance of the bot.
+
+    Every method that decides something (claiming a cooldown, an address or
+    a pending review) is a single atomic check-and-set, so two instances
+    handling the same user at once cannot both win. User records and
+    redeemed and claimed addresses are also written through to `storage`,
+    which stays the durable copy a new backend is seeded from.
+
+    Addresses may be passed in any case; they are keyed by their canonical
+    20-byte form, so one wallet cannot pass as several.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._maintenance = False
+
+    @abstractmethod
+    async def start(self) -> None:
+        ...
+
+    @abstractmethod
+    async def stop(self) -> None:
+        ...
+
+    @abstractmethod
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        """Returns the user's record (profile, last_claim_times, completed_tasks) or None."""
+
+    @abstractmethod
+    async def add_user(self, user_id: str, record: dict) -> bool:
+        """Stores `record` unless the user already exists. Returns whether it was added."""
+
+    @abstractmethod
+    async def delete_user(self, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def count_users(self) -> int:
+        ...
+
+    @abstractmethod
+    async def user_ids_page(self, cursor: str, limit: int) -> tuple:
+        """Returns (user_ids, next_cursor): about `limit` users from `cursor` on ('' starts).
+
+        Cursors are opaque strings that can be checkpointed; next_cursor is
+        None after the last page. A user may be returned twice if the set
+        changes during the walk, but none present throughout is skipped.
+        """
+
+    @abstractmethod
+    async def complete_task(self, user_id: str, task: str) -> bool:
+        """Marks `task` as completed. Returns False if it already was."""
+
+    @abstractmethod
+    async def reset_task(self, user_id: str, task: str) -> None:
+        ...
+
+    @abstractmethod
+    async def reserve_cooldown(self, user_id: str, key: str, now: float, period: float) -> tuple:
+        """Starts a new cooldown for `key` unless one is still running.
+
+        Returns (reserved, last_time), where last_time is the start of the
+        previous cooldown (0 if there was none).
+        """
+
+    @abstractmethod
+    async def release_cooldown(self, user_id: str, key: str, reserved_at: float, previous: float) -> None:
+        """Undoes reserve_cooldown, unless another reservation has replaced it since."""
+
+    @abstractmethod
+    async def address_owner(self, address: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def claim_address(self, address: str, user_id: str) -> str:
+        """Marks `address` as redeemed by `user_id` unless someone owns it already. Returns the owner."""
+
+    @abstractmethod
+    async def release_address(self, address: str, user_id: str) -> None:
+        """Frees `address` again if it is still owned by `user_id`."""
+
+    @abstractmethod
+    async def count_redeemed_addresses(self) -> int:
+        ...
+
+    @abstractmethod
+    async def reserve_address_claim(self, net_name: str, address: str, now: float, period: float) -> tuple:
+        """Records a faucet claim to `address` on `net_name` unless it got one within `period`.
+
+        Returns (reserved, last_time) like reserve_cooldown.
+        """
+
+    @abstractmethod
+    async def release_address_claim(self, net_name: str, address: str, reserved_at: float, previous: float) -> None:
+        """Undoes reserve_address_claim, unless another claim has replaced it since."""
+
+    @abstractmethod
+    async def add_pending_verification(self, data: dict) -> int:
+        """Queues a task submission for review. Returns its unique review id."""
+
+    @abstractmethod
+    async def list_pending_verifications(self, after_id: int, limit: int) -> list:
+        """Returns up to `limit` (review_id, data) pairs with ids above `after_id`, oldest first."""
+
+    @abstractmethod
+    async def count_pending_verifications(self) -> int:
+        ...
+
+    @abstractmethod
+    async def pop_pending_verification(self, review_id: int) -> Optional[dict]:
+        """Removes and returns a pending verification; only one caller ever gets it."""
+
+    def nonce_counter(self, chain_id: int, address: str) -> Optional['SharedNonceCounter']:
+        """Returns the nonce counter of a sender wallet shared by every instance, or None if nonces stay in process."""
+        return None
+
+    def is_maintenance(self) -> bool:
+        """Returns the maintenance flag; answered locally, so it is cheap to call from every handler."""
+        return self._maintenance
+
+    @abstractmethod
+    async def set_maintenance(self, enabled: bool) -> None:
+        ...
+
+
+class LazyRecords(dict):
+    """User records that stay JSON text until first read.
+
+    Decoding every record at start-up costs seconds on a large user base
+    and delays the first update; most records are never read before the
+    next restart. A record is decoded (and kept decoded) by the first
+    `[]`, `get()`, `setdefault()` or `pop()` that reaches it.
+    """
+
+    def _decoded(self, user_id: str, record):
+        if isinstance(record, str):
+            record = json.loads(record)
+            dict.__setitem__(self, user_id, record)
+        return record
+
+    def __getitem__(self, user_id: str):
+        return self._decoded(user_id, dict.__getitem__(self, user_id))
+
+    def get(self, user_id: str, default=None):
+        return self[user_id] if user_id in self else default
+
+    def setdefault(self, user_id: str, default=None):
+        if user_id not in self:
+            dict.__setitem__(self, user_id, default)
+        return self[user_id]
+
+    def pop(self, user_id: str, *default):
+        if user_id not in self:
+            return dict.pop(self, user_id, *default)
+        return self._decoded(user_id, dict.pop(self, user_id))
+
+
+def _canonical_entries(entries, kind: str):
+    """Yields (canonical address, value) pairs, logging and skipping stored addresses that are not valid."""
+    for address, value in entries:
+        try:
+            yield canonical_address(address), value
+        except ValueError:
+            logger.warning(f"Skipping {kind} {address!r}: not a valid address.")
+
+
+class InMemoryStateBackend(StateBackend):
+    """Keeps state in process memory; only correct while a single bot instance runs.
+
+    Pending verifications are written through to storage like everything
+    else, so the review queue survives restarts.
+    """
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self.users = {}
+        self.redeemed_addresses = AddressIndex()
+        self.address_claims = {}
+        self.pending_verifications = {}
+
+    async def start(self) -> None:
+        self.users = LazyRecords(self.storage.load_user_texts())
+        self.redeemed_addresses = AddressIndex(_canonical_entries(
+            ((address, int(user_id)) for address, user_id in self.storage.load_redeemed_addresses().items()), 'redeemed address'
+        ))
+        claims = {}
+        for net_name, address, claimed_at in self.storage.load_address_claims():
+            claims.setdefault(net_name, []).append((address, int(claimed_at)))
+        claims = {net_name: list(_canonical_entries(entries, f'{net_name} faucet claim')) for net_name, entries in claims.items()}
+        self.address_claims = {net_name: AddressIndex(entries) for net_name, entries in claims.items()}
+        self.pending_verifications = self.storage.load_task_reviews()
+        logger.info(
+            f"Loaded {len(self.users)} users, {len(self.redeemed_addresses)} redeemed addresses, "
+            f"{sum(map(len, self.address_claims.values()))} recent faucet claims "
+            f"and {len(self.pending_verifications)} pending reviews into memory."
+        )
+
+    async def stop(self) -> None:
+        pass
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return self.users.get(user_id)
+
+    async def add_user(self, user_id: str, record: dict) -> bool:
+        if user_id in self.users:
+            return False
+        self.users[user_id] = record
+        self.storage.upsert_user(user_id, record)
+        return True
+
+    async def delete_user(self, user_id: str) -> None:
+        self.users.pop(user_id, None)
+        self.storage.delete_user(user_id)
+
+    async def count_users(self) -> int:
+        return len(self.users)
+
+    async def user_ids_page(self, cursor: str, limit: int) -> tuple:
+        # Every user is in storage too, and keyset paging there keeps the walk in user-id order
+        user_ids = self.storage.user_ids_after(cursor, limit)
+        return user_ids, user_ids[-1] if len(user_ids) == limit else None
+
+    async def complete_task(self, user_id: str, task: str) -> bool:
+        completed_tasks = self.users.setdefault(user_id, {}).setdefault('completed_tasks', {})
+        if completed_tasks.get(task):
+            return False
+        completed_tasks[task] = True
+        self.storage.upsert_user(user_id, self.users[user_id])
+        return True
+
+    async def reset_task(self, user_id: str, task: str) -> None:
+        if self.users.get(user_id, {}).get('completed_tasks', {}).pop(task, None) is not None:
+            self.storage.upsert_user(user_id, self.users[user_id])
+
+    async def reserve_cooldown(self, user_id: str, key: str, now: float, period: float) -> tuple:
+        last_claim_times = self.users.setdefault(user_id, {}).setdefault('last_claim_times', {})
+        last_time = last_claim_times.get(key, 0)
+        if now - last_time < period:
+            return False, last_time
+        last_claim_times[key] = now
+        self.storage.upsert_user(user_id, self.users[user_id])
+        return True, last_time
+
+    async def release_cooldown(self, user_id: str, key: str, reserved_at: float, previous: float) -> None:
+        last_claim_times = self.users.get(user_id, {}).get('last_claim_times', {})
+        if last_claim_times.get(key) != reserved_at:
+            return
+        if previous:
+            last_claim_times[key] = previous
+        else:
+            del last_claim_times[key]
+        self.storage.upsert_user(user_id, self.users[user_id])
+
+    async def address_owner(self, address: str) -> Optional[str]:
+        owner = self.redeemed_addresses.get(canonical_address(address))
+        return str(owner) if owner is not None else None
+
+    async def claim_address(self, address: str, user_id: str) -> str:
+        owner = str(self.redeemed_addresses.setdefault(canonical_address(address), int(user_id)))
+        if owner == user_id:
+            self.storage.upsert_redeemed_address(address_key(address), user_id)
+        return owner
+
+    async def release_address(self, address: str, user_id: str) -> None:
+        key = canonical_address(address)
+        if self.redeemed_addresses.get(key) == int(user_id):
+            self.redeemed_addresses.pop(key)
+            self.storage.delete_redeemed_address(address_key(address))
+
+    async def count_redeemed_addresses(self) -> int:
+        return len(self.redeemed_addresses)
+
+    async def reserve_address_claim(self, net_name: str, address: str, now: float, period: float) -> tuple:
+        claims = self.address_claims.setdefault(net_name, AddressIndex())
+        key = canonical_address(address)
+        last_time = claims.get(key) or 0
+        if now - last_time < period:
+            return False, last_time
+        claims.set(key, int(now))
+        self.storage.upsert_address_claim(net_name, address_key(address), int(now))
+        return True, last_time
+
+    async def release_address_claim(self, net_name: str, address: str, reserved_at: float, previous: float) -> None:
+        claims = self.address_claims.get(net_name)
+        key = canonical_address(address)
+        if claims is None or claims.get(key) != int(reserved_at):
+            return
+        if previous:
+            claims.set(key, int(previous))
+            self.storage.upsert_address_claim(net_name, address_key(address), int(previous))
+        else:
+            claims.pop(key)
+            self.storage.delete_address_claim(net_name, address_key(address))
+
+    async def add_pending_verification(self, data: dict) -> int:
+        review_id = await self.storage.create_task_review(data, time.time())
+        self.pending_verifications[review_id] = data
+        return review_id
+
+    async def list_pending_verifications(self, after_id: int, limit: int) -> list:
+        # Review ids only grow, so the dict is already in id order
+        return list(itertools.islice(
+            ((review_id, data) for review_id, data in self.pending_verifications.items() if review_id > after_id), limit
+        ))
+
+    async def count_pending_verifications(self) -> int:
+        return len(self.pending_verifications)
+
+    async def pop_pending_verification(self, review_id: int) -> Optional[dict]:
+        data = self.pending_verifications.pop(review_id, None)
+        if data is not None:
+            self.storage.delete_task_review(review_id)
+        return data
+
+    async def set_maintenance(self, enabled: bool) -> None:
+        self._maintenance = enabled
+
+
+# Atomically starts a cooldown: KEYS[1] = cooldown hash, ARGV = field, now, period
+RESERVE_COOLDOWN_SCRIPT = """
+local last = redis.call('HGET', KEYS[1], ARGV[1]) or '0'
+if tonumber(ARGV[2]) - tonumber(last) < tonumber(ARGV[3]) then
+    return {0, last}
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+return {1, last}
+"""
+
+# Restores the previous cooldown if ours is still the current one: ARGV = field, reserved_at, previous
+RELEASE_COOLDOWN_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+if tonumber(ARGV[3]) == 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+end
+return 1
+"""
+
+# Records a faucet claim that expires after the cooldown: KEYS[1] = claim key, ARGV = now, period
+RESERVE_ADDRESS_CLAIM_SCRIPT = """
+local last = redis.call('GET', KEYS[1]) or '0'
+if tonumber(ARGV[1]) - tonumber(last) < tonumber(ARGV[2]) then
+    return {0, last}
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', math.ceil(tonumber(ARGV[2])))
+return {1, last}
+"""
+
+# Restores the previous claim if ours is still the current one: ARGV = reserved_at, previous
+RELEASE_ADDRESS_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) == 0 then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+end
+return 1
+"""
+
+# Deletes a hash field only if it still holds the given value: ARGV = field, value
+DELETE_IF_EQUAL_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# Reserves ARGV[1] nonces, given-back ones first; returns them, or nil if the counter was never seeded:
+# KEYS[1] = counter, KEYS[2] = given-back nonces
+ALLOCATE_NONCES_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local count = tonumber(ARGV[1])
+local nonces = redis.call('ZRANGE', KEYS[2], 0, count - 1)
+if #nonces > 0 then
+    redis.call('ZREM', KEYS[2], unpack(nonces))
+end
+local rest = count - #nonces
+if rest > 0 then
+    local first = redis.call('INCRBY', KEYS[1], rest) - rest
+    for i = 0, rest - 1 do
+        table.insert(nonces, first + i)
+    end
+end
+return nonces
+"""
+
+# Gives back a nonce that was never broadcast. It is handed out again before any new one, so a gap
+# below nonces other instances still hold is filled instead of resynced over them: ARGV = nonce
+RELEASE_NONCE_SCRIPT = """
+local next_nonce = tonumber(redis.call('GET', KEYS[1]) or '-1')
+local nonce = tonumber(ARGV[1])
+if nonce >= next_nonce then
+    return 0
+end
+redis.call('ZADD', KEYS[2], nonce, nonce)
+while redis.call('ZSCORE', KEYS[2], next_nonce - 1) do
+    next_nonce = next_nonce - 1
+    redis.call('ZREM', KEYS[2], next_nonce)
+end
+redis.call('SET', KEYS[1], next_nonce)
+return 1
+"""
+
+
+class SharedNonceCounter:
+    """The next nonce of one sender wallet, kept on the server for every instance sending from it.
+
+    Allocation is a single script, so two instances can never hand out the
+    same nonce. Nonces given back below the counter are kept in a sorted set
+    next to it and handed out first. NonceManager seeds the counter from the
+    node when it is missing and resets it after a nonce error.
+    """
+
+    def __init__(self, client, key: str, allocate_script, release_script):
+        self.client = client
+        self.key = key
+        self.released_key = f"{key}:released"
+        self._allocate = allocate_script
+        self._release = release_script
+
+    async def allocate(self, count: int) -> Optional[list]:
+        """Reserves `count` nonces and returns them in ascending order, or None if the counter is not seeded."""
+        nonces = await self._allocate(keys=[self.key, self.released_key], args=[count])
+        return sorted(int(nonce) for nonce in nonces) if nonces is not None else None
+
+    async def seed(self, next_nonce: int) -> None:
+        """Sets the counter unless another instance already has."""
+        await self.client.set(self.key, next_nonce, nx=True)
+
+    async def reset(self, next_nonce: int) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(self.key, next_nonce)
+        pipe.delete(self.released_key)
+        await pipe.execute()
+
+    async def release(self, nonce: int) -> None:
+        await self._release(keys=[self.key, self.released_key], args=[nonce])
+
+
+class RedisStateBackend(StateBackend):
+    """Keeps state on a Redis-protocol server so several bot instances can share it.
+
+    Keys (all under STATE_KEY_PREFIX):
+      users              hash  user id -> profile JSON
+      cooldowns:<user>   hash  network -> start of the last claim
+      tasks:<user>       set   completed task names
+      redeemed_addresses hash  canonical address -> user id
+      address_claim:<network>:<address>  string  time of the last faucet claim, expiring with the cooldown
+      pending            hash  review id -> submission JSON
+      pending_ids        zset  review ids waiting for a decision, scored by id
+      pending_seq        counter behind the review ids
+      address_claims_seeded  string  set once the faucet claims of the local database were copied over
+      nonce:<chain id>:<address>  counter  next nonce of a sender wallet, shared by every instance
+      nonce:<chain id>:<address>:released  zset  nonces given back below the counter, handed out first
+      maintenance        string '1'/'0', with changes published on the channel of the same name
+
+    The maintenance flag is mirrored locally and kept current through
+    pub/sub. `client` is a redis.asyncio-compatible client; any server
+    speaking the protocol (or a local stand-in) works. `claim_period` is
+    the faucet cooldown, used to expire claims seeded from the database.
+    """
+
+    def __init__(self, storage, client, claim_period: float, prefix: str = STATE_KEY_PREFIX):
+        super().__init__(storage)
+        self.client = client
+        self.claim_period = claim_period
+        self.prefix = prefix
+        self._reserve_cooldown = client.register_script(RESERVE_COOLDOWN_SCRIPT)
+        self._release_cooldown = client.register_script(RELEASE_COOLDOWN_SCRIPT)
+        self._delete_if_equal = client.register_script(DELETE_IF_EQUAL_SCRIPT)
+        self._reserve_address_claim = client.register_script(RESERVE_ADDRESS_CLAIM_SCRIPT)
+        self._release_address_claim = client.register_script(RELEASE_ADDRESS_CLAIM_SCRIPT)
+        self._allocate_nonces = client.register_script(ALLOCATE_NONCES_SCRIPT)
+        self._release_nonce = client.register_script(RELEASE_NONCE_SCRIPT)
+        self._pubsub = None
+        self._task = None
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix, *parts))
+
+    async def start(self) -> None:
+        await self._seed_from_storage()
+        self._maintenance = await self.client.get(self._key('maintenance')) in (b'1', '1')
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._key('maintenance'))
+        self._task = asyncio.create_task(self._listen(), name='state-maintenance-listener')
+        logger.info(f"Using Redis state backend (prefix '{self.prefix}'), maintenance mode {'ON' if self._maintenance else 'OFF'}.")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._pubsub:
+            await self._pubsub.aclose()
+        await self.client.aclose()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._maintenance = message['data'] in (b'1', '1')
+                        logger.info(f"Maintenance mode turned {'ON' if self._maintenance else 'OFF'} (published).")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Maintenance subscription dropped ({e}); resubscribing.")
+                await asyncio.sleep(1)
+                self._maintenance = await self.client.get(self._key('maintenance')) in (b'1', '1')
+
+    async def _seed_from_storage(self) -> None:
+        """Copies the local database into an empty server, e.g. when switching from the memory backend."""
+        if not await self.client.exists(self._key('users')):
+            users = self.storage.load_users()
+            items = list(users.items())
+            for start in range(0, len(items), STATE_SEED_BATCH_SIZE):
+                pipe = self.client.pipeline(transaction=False)
+                for user_id, record in items[start:start + STATE_SEED_BATCH_SIZE]:
+                    self._write_user(pipe, user_id, record)
+                await pipe.execute()
+            if items:
+                logger.info(f"Seeded {len(items)} users into Redis from the local database.")
+        if not await self.client.exists(self._key('redeemed_addresses')):
+            redeemed_addresses = self.storage.load_redeemed_addresses()
+            if redeemed_addresses:
+                await self.client.hset(self._key('redeemed_addresses'), mapping=redeemed_addresses)
+                logger.info(f"Seeded {len(redeemed_addresses)} redeemed addresses into Redis from the local database.")
+        if not await self.client.exists(self._key('pending_seq')):
+            reviews = self.storage.load_task_reviews()
+            if reviews:
+                pipe = self.client.pipeline(transaction=True)
+                pipe.hset(self._key('pending'), mapping={str(review_id): json.dumps(data) for review_id, data in reviews.items()})
+                pipe.zadd(self._key('pending_ids'), {str(review_id): review_id for review_id in reviews})
+                # New review ids continue after the seeded ones
+                pipe.set(self._key('pending_seq'), max(reviews))
+                await pipe.execute()
+                logger.info(f"Seeded {len(reviews)} pending reviews into Redis from the local database.")
+        if await self.client.set(self._key('address_claims_seeded'), '1', nx=True):
+            now = time.time()
+            claims = [(net_name, address, int(claimed_at)) for net_name, address, claimed_at in self.storage.load_address_claims()
+                      if claimed_at + self.claim_period > now]
+            for start in range(0, len(claims), STATE_SEED_BATCH_SIZE):
+                pipe = self.client.pipeline(transaction=False)
+                for net_name, address, claimed_at in claims[start:start + STATE_SEED_BATCH_SIZE]:
+                    # Same value format as RESERVE_ADDRESS_CLAIM_SCRIPT writes, expiring when the cooldown ends
+                    pipe.set(self._key('address_claim', net_name, address), repr(float(claimed_at)),
+                             ex=math.ceil(claimed_at + self.claim_period - now), nx=True)
+                await pipe.execute()
+            if claims:
+                logger.info(f"Seeded {len(claims)} recent faucet claims into Redis from the local database.")
+
+    def _write_user(self, pipe, user_id: str, record: dict) -> None:
+        profile = {k: v for k, v in record.items() if k not in ('last_claim_times', 'completed_tasks')}
+        pipe.hset(self._key('users'), user_id, json.dumps(profile))
+        if record.get('last_claim_times'):
+            pipe.hset(self._key('cooldowns', user_id), mapping={k: repr(v) for k, v in record['last_claim_times'].items()})
+        completed = [task for task, done in (record.get('completed_tasks') or {}).items() if done]
+        if completed:
+            pipe.sadd(self._key('tasks', user_id), *completed)
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(self._key('users'), user_id)
+        pipe.hgetall(self._key('cooldowns', user_id))
+        pipe.smembers(self._key('tasks', user_id))
+        profile, cooldowns, tasks = await pipe.execute()
+        if profile is None:
+            return None
+        record = json.loads(profile)
+        record['last_claim_times'] = {_text(k): float(v) for k, v in cooldowns.items()}
+        record['completed_tasks'] = {_text(task): True for task in tasks}
+        return record
+
+    async def _write_through(self, user_id: str) -> None:
+        record = await self.get_user(user_id)
+        if record is not None:
+            self.storage.upsert_user(user_id, record)
+
+    async def add_user(self, user_id: str, record: dict) -> bool:
+        profile = {k: v for k, v in record.items() if k not in ('last_claim_times', 'completed_tasks')}
+        if not await self.client.hsetnx(self._key('users'), user_id, json.dumps(profile)):
+            return False
+        self.storage.upsert_user(user_id, record)
+        return True
+
+    async def delete_user(self, user_id: str) -> None:
+        await self.client.hdel(self._key('users'), user_id)
+        await self.client.delete(self._key('cooldowns', user_id), self._key('tasks', user_id))
+        self.storage.delete_user(user_id)
+
+    async def count_users(self) -> int:
+        return await self.client.hlen(self._key('users'))
+
+    async def user_ids_page(self, cursor: str, limit: int) -> tuple:
+        # HSCAN walks the hash every instance writes, so users first seen by another instance are included
+        next_cursor, users = await self.client.hscan(self._key('users'), cursor=int(cursor or 0), count=limit)
+        return [_text(user_id) for user_id in users], str(next_cursor) if int(next_cursor) else None
+
+    async def complete_task(self, user_id: str, task: str) -> bool:
+        if not await self.client.sadd(self._key('tasks', user_id), task):
+            return False
+        await self._write_through(user_id)
+        return True
+
+    async def reset_task(self, user_id: str, task: str) -> None:
+        if await self.client.srem(self._key('tasks', user_id), task):
+            await self._write_through(user_id)
+
+    async def reserve_cooldown(self, user_id: str, key: str, now: float, period: float) -> tuple:
+        reserved, last = await self._reserve_cooldown(keys=[self._key('cooldowns', user_id)], args=[key, repr(now), repr(period)])
+        if reserved:
+            await self._write_through(user_id)
+        return bool(reserved), float(last)
+
+    async def release_cooldown(self, user_id: str, key: str, reserved_at: float, previous: float) -> None:
+        if await self._release_cooldown(keys=[self._key('cooldowns', user_id)], args=[key, repr(reserved_at), repr(previous)]):
+            await self._write_through(user_id)
+
+    async def address_owner(self, address: str) -> Optional[str]:
+        owner = await self.client.hget(self._key('redeemed_addresses'), address_key(address))
+        return _text(owner) if owner is not None else None
+
+    async def claim_address(self, address: str, user_id: str) -> str:
+        if await self.client.hsetnx(self._key('redeemed_addresses'), address_key(address), user_id):
+            self.storage.upsert_redeemed_address(address_key(address), user_id)
+            return user_id
+        return await self.address_owner(address)
+
+    async def release_address(self, address: str, user_id: str) -> None:
+        if await self._delete_if_equal(keys=[self._key('redeemed_addresses')], args=[address_key(address), user_id]):
+            self.storage.delete_redeemed_address(address_key(address))
+
+    async def count_redeemed_addresses(self) -> int:
+        return await self.client.hlen(self._key('redeemed_addresses'))
+
+    async def reserve_address_claim(self, net_name: str, address: str, now: float, period: float) -> tuple:
+        key = address_key(address)
+        reserved, last = await self._reserve_address_claim(
+            keys=[self._key('address_claim', net_name, key)], args=[repr(float(int(now))), repr(period)])
+        if reserved:
+            self.storage.upsert_address_claim(net_name, key, int(now))
+        return bool(reserved), float(last)
+
+    async def release_address_claim(self, net_name: str, address: str, reserved_at: float, previous: float) -> None:
+        key = address_key(address)
+        if await self._release_address_claim(
+                keys=[self._key('address_claim', net_name, key)], args=[repr(float(int(reserved_at))), repr(float(previous))]):
+            if previous:
+                self.storage.upsert_address_claim(net_name, key, previous)
+            else:
+                self.storage.delete_address_claim(net_name, key)
+
+    async def add_pending_verification(self, data: dict) -> int:
+        review_id = await self.client.incr(self._key('pending_seq'))
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self._key('pending'), str(review_id), json.dumps(data))
+        pipe.zadd(self._key('pending_ids'), {str(review_id): review_id})
+        await pipe.execute()
+        return review_id
+
+    async def list_pending_verifications(self, after_id: int, limit: int) -> list:
+        review_ids = await self.client.zrangebyscore(self._key('pending_ids'), f"({after_id}", '+inf', start=0, num=limit)
+        if not review_ids:
+            return []
+        records = await self.client.hmget(self._key('pending'), review_ids)
+        return [(int(review_id), json.loads(data)) for review_id, data in zip(review_ids, records) if data is not None]
+
+    async def count_pending_verifications(self) -> int:
+        return await self.client.zcard(self._key('pending_ids'))
+
+    async def pop_pending_verification(self, review_id: int) -> Optional[dict]:
+        data = await self.client.hget(self._key('pending'), str(review_id))
+        # Only the caller whose HDEL removes the field owns the submission
+        if data is None or not await self.client.hdel(self._key('pending'), str(review_id)):
+            return None
+        await self.client.zrem(self._key('pending_ids'), str(review_id))
+        return json.loads(data)
+
+    def nonce_counter(self, chain_id: int, address: str) -> SharedNonceCounter:
+        return SharedNonceCounter(self.client, self._key('nonce', str(chain_id), address_key(address)),
+                                  self._allocate_nonces, self._release_nonce)
+
+    async def set_maintenance(self, enabled: bool) -> None:
+        value = '1' if enabled else '0'
+        await self.client.set(self._key('maintenance'), value)
+        await self.client.publish(self._key('maintenance'), value)
+        self._maintenance = enabled
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_state_backend(storage, claim_period: float) -> StateBackend:
+    """Builds the backend selected by STATE_BACKEND. `claim_period` is the faucet cooldown in seconds."""
+    if STATE_BACKEND == 'memory':
+        return InMemoryStateBackend(storage)
+    if STATE_BACKEND == 'redis':
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("STATE_BACKEND=redis needs the 'redis' package (pip install redis).")
+        return RedisStateBackend(storage, redis.Redis.from_url(STATE_REDIS_URL), claim_period)
+    raise RuntimeError(f"Unknown STATE_BACKEND '{STATE_BACKEND}'; use 'memory' or 'redis'.")
@@ -0,0 +1,274 @@
+"""SQLite storage for user records, redeemed and claimed addresses, task reviews and broadcast jobs."""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from addresses import address_key
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS redeemed_addresses (
+    address TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_redeemed_addresses_user_id ON redeemed_addresses (user_id);
+CREATE TABLE IF NOT EXISTS address_claims (
+    network TEXT NOT NULL,
+    address TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (network, address)
+);
+CREATE TABLE IF NOT EXISTS task_reviews (
+    review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    owner_chat_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    cursor TEXT NOT NULL DEFAULT '',
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    pruned INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+BROADCAST_JOB_FIELDS = ('job_id', 'text', 'owner_chat_id', 'status', 'cursor', 'total', 'sent', 'failed', 'pruned', 'created_at', 'updated_at')
+
+
+def _log_failed_write(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"SQLite write failed: {future.exception()}")
+
+
+class Storage:
+    """Per-record persistence backed by SQLite in WAL mode.
+
+    Every write touches a single row, so its cost does not grow with the
+    number of users. WAL with synchronous=NORMAL keeps commits off the fsync
+    path; at worst the last few commits are lost on power failure, never
+    the database itself.
+
+    Writes run on a single writer thread with its own connection, in the
+    order they were made, so neither a commit nor a WAL checkpoint stalls
+    the event loop. Reads use `conn` and see a write once it is committed;
+    `flush()` waits for the writes queued so far. The one-off maintenance
+    run at startup (migration, normalization) still uses `conn` directly.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = self._connect()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Every connection to ':memory:' opens a database of its own, so the writer shares the reader's there
+        self._write_conn = self.conn if db_path == ':memory:' else self._connect()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write(self, sql: str, params: tuple = ()) -> Future:
+        """Queues one statement for the writer thread. The future resolves to its cursor."""
+        future = self._writer.submit(self._write_conn.execute, sql, params)
+        future.add_done_callback(_log_failed_write)
+        return future
+
+    async def flush(self) -> None:
+        """Waits until every write queued so far is committed."""
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+    def close(self) -> None:
+        """Finishes the queued writes, then closes the connections."""
+        self._writer.shutdown(wait=True)
+        if self._write_conn is not self.conn:
+            self._write_conn.close()
+        self.conn.close()
+
+    def load_users(self) -> dict:
+        """Returns every user record keyed by user id string."""
+        return {user_id: json.loads(data) for user_id, data in self.conn.execute("SELECT user_id, data FROM users")}
+
+    def load_user_texts(self) -> dict:
+        """Returns every user record as its stored JSON text, keyed by user id string."""
+        return dict(self.conn.execute("SELECT user_id, data FROM users"))
+
+    def upsert_user(self, user_id: str, record: dict) -> None:
+        self._write(
+            "INSERT INTO users (user_id, data) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data",
+            (user_id, json.dumps(record))
+        )
+
+    def count_users(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def delete_user(self, user_id: str) -> None:
+        self._write("DELETE FROM users WHERE user_id = ?", (user_id,))
+
+    def user_ids_after(self, cursor: str, limit: int) -> list:
+        """Returns up to `limit` user ids greater than `cursor`, in order (keyset paging)."""
+        return [row[0] for row in self.conn.execute(
+            "SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?", (cursor, limit)
+        )]
+
+    def load_redeemed_addresses(self) -> dict:
+        """Returns every redeemed address mapped to the user id string that redeemed it."""
+        return dict(self.conn.execute("SELECT address, user_id FROM redeemed_addresses"))
+
+    def upsert_redeemed_address(self, address: str, user_id: str) -> None:
+        self._write(
+            "INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?) "
+            "ON CONFLICT (address) DO UPDATE SET user_id = excluded.user_id",
+            (address, user_id)
+        )
+
+    def delete_redeemed_address(self, address: str) -> None:
+        self._write("DELETE FROM redeemed_addresses WHERE address = ?", (address,))
+
+    def count_redeemed_addresses(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM redeemed_addresses").fetchone()[0]
+
+    def normalize_redeemed_addresses(self) -> None:
+        """Rewrites redeemed addresses not stored in address_key() form (mixed case, missing 0x).
+
+        The first redemption of an address wins. Rows that are not valid
+        addresses at all are logged and left alone.
+        """
+        rows = self.conn.execute(
+            "SELECT rowid, address, user_id FROM redeemed_addresses "
+            "WHERE length(address) != 42 OR address NOT GLOB '0x*' OR substr(address, 3) GLOB '*[^0-9a-f]*'"
+        ).fetchall()
+        keyed = []
+        for rowid, address, user_id in rows:
+            try:
+                keyed.append((rowid, address_key(address), user_id))
+            except ValueError:
+                logger.warning(f"Skipping redeemed address {address!r} of user {user_id}: not a valid address.")
+        if not keyed:
+            return
+        # Rows already in canonical form that a rewritten spelling collides with
+        keys = sorted({key for _, key, _ in keyed})
+        existing = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            existing += self.conn.execute(
+                f"SELECT rowid, address, user_id FROM redeemed_addresses WHERE address IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        owners = {}
+        for _, key, user_id in sorted(keyed + existing):
+            owners.setdefault(key, user_id)
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("DELETE FROM redeemed_addresses WHERE rowid = ?", [(rowid,) for rowid, _, _ in keyed + existing])
+            self.conn.executemany("INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?)", owners.items())
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Normalized {len(keyed)} redeemed addresses ({len(keyed) + len(existing) - len(owners)} duplicate spellings merged).")
+
+    def load_address_claims(self) -> list:
+        """Returns every (network, address, claimed_at) faucet claim on record."""
+        return self.conn.execute("SELECT network, address, claimed_at FROM address_claims").fetchall()
+
+    def upsert_address_claim(self, network: str, address: str, claimed_at: float) -> None:
+        self._write(
+            "INSERT INTO address_claims (network, address, claimed_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (network, address) DO UPDATE SET claimed_at = excluded.claimed_at",
+            (network, address, claimed_at)
+        )
+
+    def delete_address_claim(self, network: str, address: str) -> None:
+        self._write("DELETE FROM address_claims WHERE network = ? AND address = ?", (network, address))
+
+    def prune_address_claims(self, before: float) -> None:
+        """Drops claims older than `before`; they no longer block anything."""
+        self._write("DELETE FROM address_claims WHERE claimed_at < ?", (before,))
+
+    async def create_task_review(self, data: dict, created_at: float) -> int:
+        cursor = await asyncio.wrap_future(self._write(
+            "INSERT INTO task_reviews (data, created_at) VALUES (?, ?)", (json.dumps(data), created_at)
+        ))
+        return cursor.lastrowid
+
+    def delete_task_review(self, review_id: int) -> None:
+        self._write("DELETE FROM task_reviews WHERE review_id = ?", (review_id,))
+
+    def load_task_reviews(self) -> dict:
+        """Returns every pending task review keyed by review id, oldest first."""
+        return {review_id: json.loads(data) for review_id, data in self.conn.execute(
+            "SELECT review_id, data FROM task_reviews ORDER BY review_id"
+        )}
+
+    async def create_broadcast_job(self, text: str, owner_chat_id: int, total: int, created_at: float) -> int:
+        cursor = await asyncio.wrap_future(self._write(
+            "INSERT INTO broadcast_jobs (text, owner_chat_id, status, total, created_at, updated_at) VALUES (?, ?, 'running', ?, ?, ?)",
+            (text, owner_chat_id, total, created_at, created_at)
+        ))
+        return cursor.lastrowid
+
+    def update_broadcast_job(self, job_id: int, **fields) -> None:
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        self._write(f"UPDATE broadcast_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def load_broadcast_jobs(self, status: str) -> list:
+        """Returns the broadcast jobs with the given status as dicts, oldest first."""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(BROADCAST_JOB_FIELDS)} FROM broadcast_jobs WHERE status = ? ORDER BY job_id", (status,)
+        )
+        return [dict(zip(BROADCAST_JOB_FIELDS, row)) for row in rows]
+
+    def migrate_from_json(self, user_data_file: str, redeemed_addresses_file: str) -> None:
+        """One-time import of the legacy JSON files. Imported files are renamed to *.migrated."""
+        for path, table, insert in (
+            (user_data_file, 'users', self._import_users),
+            (redeemed_addresses_file, 'redeemed_addresses', self._import_redeemed_addresses),
+        ):
+            if not os.path.exists(path):
+                continue
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                logger.warning(f"{path} still exists but {table} is already populated. Skipping migration of {path}.")
+                continue
+            try:
+                with open(path, 'r') as f:
+                    records = json.load(f)
+            except json.JSONDecodeError:
+                logger.warning(f"Error decoding JSON from {path}. Skipping migration of {path}.")
+                continue
+            self.conn.execute("BEGIN")
+            try:
+                insert(records)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            os.replace(path, f"{path}.migrated")
+            logger.info(f"Migrated {len(records)} records from {path} into {table}.")
+
+    def _import_users(self, records: dict) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)",
+            ((user_id, json.dumps(record)) for user_id, record in records.items())
+        )
+
+    def _import_redeemed_addresses(self, records: dict) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO redeemed_addresses (address, user_id) VALUES (?, ?)",
+            records.items()
+        )
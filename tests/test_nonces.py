@@ -0,0 +1,105 @@
+import asyncio
+
+from nonces import NonceManager, is_nonce_error
+
+
+class FakeRpc:
+    net_name = 'testnet'
+
+    def __init__(self, pending_nonce: int):
+        self.pending_nonce = pending_nonce
+        self.fetches = 0
+
+    async def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == 'pending'
+        self.fetches += 1
+        return self.pending_nonce
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_allocate_many_is_consecutive_and_seeded_once():
+    async def scenario():
+        rpc = FakeRpc(5)
+        manager = NonceManager(rpc, '0xsender')
+        assert await manager.allocate_many(3) == [5, 6, 7]
+        assert await manager.allocate() == 8
+        assert rpc.fetches == 1
+    run(scenario())
+
+
+def test_releasing_the_last_nonce_hands_it_out_again():
+    async def scenario():
+        manager = NonceManager(FakeRpc(0), '0xsender')
+        nonces = await manager.allocate_many(3)
+        for nonce in reversed(nonces[1:]):
+            await manager.release(nonce)
+        assert await manager.allocate_many(2) == [1, 2]
+    run(scenario())
+
+
+def test_released_gap_is_refilled_while_a_sibling_batch_holds_later_nonces():
+    async def scenario():
+        rpc = FakeRpc(10)
+        manager = NonceManager(rpc, '0xsender')
+        first = await manager.allocate_many(2)
+        second = await manager.allocate_many(2)
+        manager.mark_sent(first[0])
+        # The first batch fails at its second nonce while the second batch is still being signed
+        await manager.release(first[1])
+        # The node would now report 11, but 12 and 13 are still outstanding
+        rpc.pending_nonce = 11
+        assert await manager.allocate_many(2) == [11, 14]
+        assert second == [12, 13]
+        assert rpc.fetches == 1
+    run(scenario())
+
+
+def test_gap_is_resynced_from_the_node_once_nothing_is_outstanding():
+    async def scenario():
+        rpc = FakeRpc(0)
+        manager = NonceManager(rpc, '0xsender')
+        nonces = await manager.allocate_many(3)
+        manager.mark_sent(nonces[0])
+        manager.mark_sent(nonces[2])
+        await manager.release(nonces[1])
+        rpc.pending_nonce = 1
+        assert await manager.allocate() == 1
+        assert rpc.fetches == 2
+    run(scenario())
+
+
+def test_resync_with_outstanding_nonces_never_moves_back():
+    async def scenario():
+        rpc = FakeRpc(0)
+        manager = NonceManager(rpc, '0xsender')
+        await manager.allocate_many(4)
+        rpc.pending_nonce = 2
+        await manager.sync()
+        assert await manager.allocate() == 4
+        # With nothing outstanding, a nonce error resync may move either way
+        for nonce in range(5):
+            manager.mark_sent(nonce)
+        rpc.pending_nonce = 3
+        await manager.sync()
+        assert await manager.allocate() == 3
+    run(scenario())
+
+
+def test_resync_moves_forward_past_nonces_used_elsewhere():
+    async def scenario():
+        rpc = FakeRpc(0)
+        manager = NonceManager(rpc, '0xsender')
+        await manager.allocate_many(2)
+        rpc.pending_nonce = 7
+        await manager.sync()
+        assert await manager.allocate() == 7
+    run(scenario())
+
+
+def test_is_nonce_error_recognizes_node_messages():
+    assert is_nonce_error(ValueError("nonce too low: next nonce 5, tx nonce 3"))
+    assert is_nonce_error(ValueError("Replacement transaction underpriced"))
+    assert not is_nonce_error(ValueError("insufficient funds for gas * price + value"))
@@ -0,0 +1,213 @@
+import asyncio
+
+import pytest
+from web3.exceptions import Web3RPCError
+
+import receipts
+from fees import FeeEstimate
+from receipts import ReceiptTracker, bumped_fee_fields, STATUS_CONFIRMED, STATUS_DROPPED
+
+SENDER = '0xsender'
+
+
+class FakeClient:
+    """Answers the tracker's batches from `receipts` and `mined_nonce`; replacements succeed unless `reject_with` is set."""
+
+    net_name = 'testnet'
+
+    def __init__(self):
+        self.head = 100
+        self.mined_nonce = 0
+        self.receipts = {}
+        self.reject_with = None
+        self.sent = []
+
+    async def batch_request(self, calls):
+        results = []
+        for method, params in calls:
+            if method == 'eth_blockNumber':
+                results.append(hex(self.head))
+            elif method == 'eth_getTransactionCount':
+                results.append(hex(self.mined_nonce))
+            else:
+                results.append(self.receipts.get(params[0]))
+        return results
+
+    async def send_raw_transaction(self, raw_transaction):
+        if self.reject_with is not None:
+            raise self.reject_with
+        self.sent.append(raw_transaction)
+        return f'0xreplacement{len(self.sent)}'
+
+
+class FixedOracle:
+    def __init__(self, max_fee=10, priority_fee=1):
+        self.estimate = FeeEstimate(eip1559=True, base_fee=max_fee, priority_fee=priority_fee, max_fee=max_fee)
+
+    async def get(self, net_name):
+        return self.estimate
+
+
+async def sign(transaction):
+    return transaction
+
+
+def transaction(nonce=0, max_fee=100, priority_fee=2):
+    return {'from': SENDER, 'to': '0xrecipient', 'value': 1, 'nonce': nonce,
+            'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': priority_fee}
+
+
+def tracker_for(client, **kwargs):
+    return ReceiptTracker({'testnet': client}, FixedOracle(**kwargs), sign)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def replace_at_once(monkeypatch):
+    monkeypatch.setattr(receipts, 'RECEIPT_REPLACE_AFTER', -1)
+
+
+def test_mined_transaction_is_confirmed():
+    async def scenario():
+        client = FakeClient()
+        tracker = tracker_for(client)
+        finals = []
+
+        async def on_final(tracked, status, receipt):
+            finals.append((status, tracked.mined_hash))
+        tracker.track('testnet', transaction(), '0xhash', on_final)
+        await tracker.poll('testnet')
+        assert finals == []
+        client.receipts['0xhash'] = {'blockNumber': hex(100), 'status': '0x1'}
+        client.mined_nonce = 1
+        await tracker.poll('testnet')
+        assert finals == [(STATUS_CONFIRMED, '0xhash')]
+        assert tracker.in_flight() == 0
+    run(scenario())
+
+
+def test_nonce_used_by_another_transaction_ends_as_dropped():
+    async def scenario():
+        client = FakeClient()
+        client.mined_nonce = 1
+        tracker = tracker_for(client)
+        finals = []
+
+        async def on_final(tracked, status, receipt):
+            finals.append(status)
+        tracker.track('testnet', transaction(), '0xhash', on_final)
+        for _ in range(receipts.RECEIPT_DROPPED_POLLS - 1):
+            await tracker.poll('testnet')
+        assert finals == []
+        await tracker.poll('testnet')
+        assert finals == [STATUS_DROPPED]
+        assert tracker.in_flight('testnet', SENDER) == 0
+    run(scenario())
+
+
+def test_stuck_transaction_is_replaced_with_bumped_fees(replace_at_once):
+    async def scenario():
+        client = FakeClient()
+        tracker = tracker_for(client)
+        tracked = tracker.track('testnet', transaction(), '0xhash')
+        await tracker.poll('testnet')
+        assert tracked.tx_hashes == ['0xhash', '0xreplacement1']
+        assert tracked.replacements == 1
+        assert tracked.transaction['maxFeePerGas'] == int(100 * receipts.RECEIPT_FEE_BUMP) + 1
+        # Either hash may still be mined
+        client.receipts['0xhash'] = {'blockNumber': hex(100), 'status': '0x1'}
+        await tracker.poll('testnet')
+        assert tracked.mined_hash == '0xhash'
+    run(scenario())
+
+
+def test_rejected_replacement_counts_backs_off_and_keeps_broadcast_fees(replace_at_once, monkeypatch):
+    async def scenario():
+        client = FakeClient()
+        client.reject_with = Web3RPCError('insufficient funds for gas * price + value')
+        tracker = tracker_for(client)
+        tracked = tracker.track('testnet', transaction(), '0xhash')
+        await tracker.poll('testnet')
+        assert tracked.replacements == 1
+        assert tracked.transaction['maxFeePerGas'] == 100
+        assert tracked.tx_hashes == ['0xhash']
+
+        # The rejected attempt restarts the wait like a broadcast would
+        monkeypatch.setattr(receipts, 'RECEIPT_REPLACE_AFTER', 60)
+        await tracker.poll('testnet')
+        assert tracked.replacements == 1
+
+        monkeypatch.setattr(receipts, 'RECEIPT_REPLACE_AFTER', -1)
+        for _ in range(receipts.RECEIPT_MAX_REPLACEMENTS + 2):
+            await tracker.poll('testnet')
+        assert tracked.replacements == receipts.RECEIPT_MAX_REPLACEMENTS
+        assert tracked.transaction['maxFeePerGas'] == 100
+    run(scenario())
+
+
+def test_transport_error_during_replacement_is_not_counted(replace_at_once):
+    async def scenario():
+        client = FakeClient()
+        client.reject_with = OSError('connection reset')
+        tracker = tracker_for(client)
+        tracked = tracker.track('testnet', transaction(), '0xhash')
+        with pytest.raises(OSError):
+            await tracker.poll('testnet')
+        assert tracked.replacements == 0
+    run(scenario())
+
+
+def test_transaction_at_the_fee_ceiling_is_not_replaced(replace_at_once):
+    async def scenario():
+        client = FakeClient()
+        tracker = tracker_for(client)
+        ceiling = receipts.RECEIPT_MAX_FEE_WEI
+        tracked = tracker.track('testnet', transaction(max_fee=ceiling, priority_fee=ceiling), '0xhash')
+        await tracker.poll('testnet')
+        assert client.sent == []
+        assert tracked.replacements == receipts.RECEIPT_MAX_REPLACEMENTS
+    run(scenario())
+
+
+def test_bumped_fees_respect_the_ceiling_and_the_current_estimate():
+    estimate = FeeEstimate(eip1559=True, base_fee=500, priority_fee=50, max_fee=1000)
+    assert bumped_fee_fields(transaction(max_fee=100, priority_fee=2), estimate) == {
+        'maxPriorityFeePerGas': 50, 'maxFeePerGas': 1000}
+    assert bumped_fee_fields(transaction(max_fee=900, priority_fee=80), estimate, ceiling=950) == {
+        'maxPriorityFeePerGas': 91, 'maxFeePerGas': 950}
+    assert bumped_fee_fields({'gasPrice': 100}, FeeEstimate(eip1559=False, gas_price=10)) == {
+        'gasPrice': int(100 * receipts.RECEIPT_FEE_BUMP) + 1}
+
+
+def test_second_payout_with_the_same_nonce_does_not_replace_the_first():
+    async def scenario():
+        client = FakeClient()
+        tracker = tracker_for(client)
+        finals = {}
+
+        def on_final_for(name):
+            async def on_final(tracked, status, receipt):
+                finals[name] = status
+            return on_final
+        tracker.track('testnet', transaction(), '0xfirst', on_final_for('first'))
+        tracker.track('testnet', transaction(), '0xsecond', on_final_for('second'))
+        assert tracker.in_flight('testnet', SENDER) == 2
+
+        client.receipts['0xsecond'] = {'blockNumber': hex(100), 'status': '0x1'}
+        client.mined_nonce = 1
+        for _ in range(receipts.RECEIPT_DROPPED_POLLS):
+            await tracker.poll('testnet')
+        assert finals == {'second': STATUS_CONFIRMED, 'first': STATUS_DROPPED}
+        assert tracker.in_flight() == 0
+    run(scenario())
+
+
+def test_tracking_the_same_transaction_twice_keeps_the_first_entry():
+    client = FakeClient()
+    tracker = tracker_for(client)
+    first = tracker.track('testnet', transaction(), '0xhash')
+    assert tracker.track('testnet', transaction(), '0xhash') is first
+    assert tracker.in_flight('testnet', SENDER) == 1
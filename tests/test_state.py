@@ -0,0 +1,161 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from nonces import NonceManager
+from state import InMemoryStateBackend, RedisStateBackend
+from storage import Storage
+
+PERIOD = 86400
+NOW = 1_700_000_000.0
+ADDRESS = '0x' + 'ab' * 20
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def open_backend(kind: str, storage: Storage, server=None):
+    if kind == 'memory':
+        backend = InMemoryStateBackend(storage)
+    else:
+        backend = RedisStateBackend(storage, fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer()), PERIOD)
+    await backend.start()
+    return backend
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend_kind(request):
+    return request.param
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(str(tmp_path / 'state.db'))
+    yield storage
+    storage.close()
+
+
+def test_cooldown_is_reserved_once_and_released_only_by_its_owner(backend_kind, storage):
+    async def scenario():
+        backend = await open_backend(backend_kind, storage)
+        await backend.add_user('1', {'username': 'u'})
+        assert await backend.reserve_cooldown('1', 'testnet', NOW, PERIOD) == (True, 0)
+        reserved, last = await backend.reserve_cooldown('1', 'testnet', NOW + 1, PERIOD)
+        assert not reserved and float(last) == NOW
+        # A release naming an older reservation leaves the current one alone
+        await backend.release_cooldown('1', 'testnet', NOW - 1, 0)
+        assert not (await backend.reserve_cooldown('1', 'testnet', NOW + 2, PERIOD))[0]
+        await backend.release_cooldown('1', 'testnet', NOW, 0)
+        assert (await backend.reserve_cooldown('1', 'testnet', NOW + 3, PERIOD))[0]
+        await backend.stop()
+    run(scenario())
+
+
+def test_address_claim_matches_any_spelling_of_the_address(backend_kind, storage):
+    async def scenario():
+        backend = await open_backend(backend_kind, storage)
+        assert (await backend.reserve_address_claim('testnet', ADDRESS, NOW, PERIOD))[0]
+        assert not (await backend.reserve_address_claim('testnet', ADDRESS.upper().replace('0X', '0x'), NOW + 1, PERIOD))[0]
+        await backend.release_address_claim('testnet', ADDRESS, NOW, 0)
+        assert (await backend.reserve_address_claim('testnet', ADDRESS, NOW + 2, PERIOD))[0]
+        await backend.stop()
+    run(scenario())
+
+
+def test_redeemed_address_keeps_its_first_owner(backend_kind, storage):
+    async def scenario():
+        backend = await open_backend(backend_kind, storage)
+        assert await backend.claim_address(ADDRESS, '1') == '1'
+        assert await backend.claim_address(ADDRESS.lower(), '2') == '1'
+        await backend.release_address(ADDRESS, '2')
+        assert await backend.address_owner(ADDRESS) == '1'
+        await backend.release_address(ADDRESS, '1')
+        assert await backend.address_owner(ADDRESS) is None
+        await backend.stop()
+    run(scenario())
+
+
+def test_pending_reviews_survive_a_restart(backend_kind, storage):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        backend = await open_backend(backend_kind, storage, server)
+        first = await backend.add_pending_verification({'user_id': 1})
+        second = await backend.add_pending_verification({'user_id': 2})
+        assert second > first
+        assert await backend.pop_pending_verification(first) == {'user_id': 1}
+        assert await backend.pop_pending_verification(first) is None
+        await backend.stop()
+        await storage.flush()
+
+        restarted = await open_backend(backend_kind, storage, server)
+        assert [review_id for review_id, _ in await restarted.list_pending_verifications(0, 10)] == [second]
+        await restarted.stop()
+    run(scenario())
+
+
+def test_user_pages_cover_every_user_once(backend_kind, storage):
+    async def scenario():
+        backend = await open_backend(backend_kind, storage)
+        for user_id in range(25):
+            await backend.add_user(str(user_id), {'username': f'u{user_id}'})
+        await storage.flush()
+        seen, cursor = [], ''
+        while True:
+            user_ids, cursor = await backend.user_ids_page(cursor, 10)
+            seen.extend(user_ids)
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(str(user_id) for user_id in range(25))
+        await backend.stop()
+    run(scenario())
+
+
+def test_malformed_legacy_rows_do_not_stop_the_memory_backend(storage):
+    async def scenario():
+        storage.conn.execute("INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?)", ('ab' * 20, '1'))
+        storage.conn.execute("INSERT INTO redeemed_addresses (address, user_id) VALUES (?, ?)", ('not an address', '2'))
+        storage.normalize_redeemed_addresses()
+        backend = await open_backend('memory', storage)
+        assert await backend.address_owner(ADDRESS) == '1'
+        assert await backend.count_redeemed_addresses() == 1
+    run(scenario())
+
+
+class FakeRpc:
+    net_name = 'testnet'
+
+    def __init__(self, pending_nonce: int):
+        self.pending_nonce = pending_nonce
+
+    async def get_transaction_count(self, address, block_identifier):
+        return self.pending_nonce
+
+
+def test_shared_nonce_counter_never_hands_out_a_nonce_twice(storage):
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first = await open_backend('redis', storage, server)
+        second = await open_backend('redis', storage, server)
+        rpc = FakeRpc(7)
+        managers = [NonceManager(rpc, ADDRESS, backend.nonce_counter(1, ADDRESS)) for backend in (first, second)]
+        batches = await asyncio.gather(*(manager.allocate_many(3) for manager in managers * 2))
+        nonces = sorted(nonce for batch in batches for nonce in batch)
+        assert nonces == list(range(7, 19))
+
+        # A gap released by one instance is filled by the other before any new nonce
+        await managers[0].release(batches[0][1])
+        assert await managers[1].allocate_many(2) == [batches[0][1], 19]
+        # Giving back the last nonce just lowers the counter
+        await managers[1].release(19)
+        assert await managers[0].allocate() == 19
+
+        # A resync after a nonce error replaces the counter and forgets given-back nonces
+        await managers[0].release(batches[1][0])
+        rpc.pending_nonce = 30
+        await managers[1].sync()
+        assert await managers[0].allocate() == 30
+        await first.stop()
+        await second.stop()
+    run(scenario())
@@ -0,0 +1,80 @@
+import time
+
+from balances import BalanceEntry
+from wallets import WalletPool
+
+WALLETS = [('0xA', 'key-a'), ('0xB', 'key-b'), ('0xC', 'key-c')]
+
+
+def balances(**wei):
+    now = time.time()
+    return {f'0x{name}': BalanceEntry(balance_wei=value, fetched_at=now) for name, value in wei.items()}
+
+
+def no_in_flight(address):
+    return 0
+
+
+def test_equally_loaded_wallets_take_turns():
+    pool = WalletPool('testnet', object(), WALLETS)
+    entries = balances(A=100, B=100, C=100)
+    assigned = pool.assign([1, 1, 1], entries.get, no_in_flight)
+    assert [wallet.address for wallet in assigned] == ['0xA', '0xB', '0xC']
+
+
+def test_wallet_with_fewest_pending_transactions_is_preferred():
+    pool = WalletPool('testnet', object(), WALLETS)
+    entries = balances(A=100, B=100, C=100)
+    in_flight = {'0xA': 3, '0xB': 0, '0xC': 1}
+    assert pool.assign([1], entries.get, in_flight.get)[0].address == '0xB'
+
+
+def test_wallets_that_cannot_cover_the_amount_are_skipped():
+    pool = WalletPool('testnet', object(), WALLETS)
+    entries = balances(A=5, B=50, C=5)
+    assigned = pool.assign([10, 10], entries.get, no_in_flight)
+    assert [wallet.address for wallet in assigned] == ['0xB', '0xB']
+    assert assigned[0].reserved_wei == 20
+
+
+def test_largest_balance_is_used_when_no_wallet_covers_the_amount():
+    pool = WalletPool('testnet', object(), WALLETS)
+    entries = balances(A=5, B=8, C=1)
+    assert pool.assign([10], entries.get, no_in_flight)[0].address == '0xB'
+
+
+def test_unknown_balance_counts_as_sufficient():
+    pool = WalletPool('testnet', object(), WALLETS[:1])
+    assert pool.assign([10 ** 30], lambda address: None, no_in_flight)[0].address == '0xA'
+
+
+def test_failed_send_gives_back_its_reservation():
+    pool = WalletPool('testnet', object(), WALLETS[:1])
+    wallet = pool.assign([40], balances(A=100).get, no_in_flight)[0]
+    pool.release(wallet, 40, sent=False)
+    assert wallet.reserved_wei == 0
+    assert wallet.sending == 0 and wallet.sent == 0
+
+
+def test_broadcast_stays_reserved_until_a_later_balance_read():
+    pool = WalletPool('testnet', object(), WALLETS[:2])
+    entries = balances(A=100, B=100)
+    wallet = pool.assign([60], entries.get, no_in_flight)[0]
+    pool.release(wallet, 60, sent=True)
+    # The cached balance was read before the broadcast, so the 60 are still held
+    assert pool.assign([60], entries.get, no_in_flight)[0].address == '0xB'
+    assert wallet.reserved_wei == 60
+
+    # A pending balance read started after the broadcast already reflects it
+    time.sleep(0.01)
+    entries['0xA'] = BalanceEntry(balance_wei=40, fetched_at=time.time())
+    assert pool.assign([30], entries.get, lambda address: {'0xB': 1}.get(address, 0))[0].address == '0xA'
+    assert wallet.reserved_wei == 30
+
+
+def test_reload_keeps_nonce_state_of_wallets_on_the_same_client():
+    client = object()
+    pool = WalletPool('testnet', client, WALLETS[:2])
+    reloaded = WalletPool('testnet', client, WALLETS[1:], previous=pool)
+    assert reloaded.wallets[0] is pool.wallets[1]
+    assert WalletPool('testnet', object(), WALLETS[1:], previous=pool).wallets[0] is not pool.wallets[1]
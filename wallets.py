@@ -0,0 +1,136 @@
+"""Pools of sender wallets per network, so payouts are not serialized through one nonce sequence."""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from balances import BalanceEntry
+from nonces import NonceManager
+
+logger = logging.getLogger(__name__)
+
+
+def wallets_from_config(config: dict, default_address: str, default_private_key: str) -> list:
+    """Returns a network's sender wallets as (checksum address, private key) pairs.
+
+    `sender_wallets` may list private keys or {'private_key': ..., 'address': ...}
+    dicts; without it the network uses SENDER_ADDRESS / SENDER_PRIVATE_KEY.
+    Raises ValueError if a listed address does not match its key.
+    """
+    entries = config.get('sender_wallets')
+    if not entries:
+        return [(default_address, default_private_key)]
+    from eth_account import Account
+
+    wallets = []
+    for entry in entries:
+        private_key = entry['private_key'] if isinstance(entry, dict) else entry
+        address = Account.from_key(private_key).address
+        if isinstance(entry, dict) and entry.get('address') and entry['address'].lower() != address.lower():
+            raise ValueError(f"Sender wallet {entry['address']} does not match its private key.")
+        wallets.append((address, private_key))
+    return wallets
+
+
+def short_address(address: str) -> str:
+    return f"{address[:6]}…{address[-4:]}"
+
+
+@dataclass
+class SenderWallet:
+    """One hot wallet of a network, with its own nonce sequence."""
+    address: str
+    nonce_manager: NonceManager
+    # Amount of transfers assigned to this wallet that its cached balance does not reflect yet
+    reserved_wei: int = 0
+    # (broadcast time, amount) of sent transfers still counted in reserved_wei, oldest first
+    broadcasts: deque = field(default_factory=deque)
+    # Transfers assigned to this wallet that are not broadcast yet
+    sending: int = 0
+    # Transactions broadcast from this wallet since start
+    sent: int = 0
+
+
+class WalletPool:
+    """The sender wallets of one network and the policy spreading payouts over them.
+
+    `assign()` picks, for each transfer, the wallet with the fewest pending
+    transactions (being sent plus awaiting a receipt) among those whose
+    cached pending balance, net of transfers it does not reflect yet, covers
+    the amount. Ties go round-robin, so equally loaded wallets take turns.
+    """
+
+    def __init__(self, net_name: str, rpc_client, wallets: list, previous: Optional['WalletPool'] = None,
+                 nonce_counter: Callable[[str], object] = None):
+        self.net_name = net_name
+        self.rpc_client = rpc_client
+        # Nonce sequences survive a config reload when the wallet and the RPC client stay the same
+        reusable = {wallet.address: wallet for wallet in previous.wallets} if previous and previous.rpc_client is rpc_client else {}
+        # nonce_counter(address) returns the wallet's counter shared with other instances, or None
+        self.wallets = [reusable.get(address) or SenderWallet(address, NonceManager(rpc_client, address, nonce_counter and nonce_counter(address)))
+                        for address, _ in wallets]
+        self._cursor = 0
+
+    @property
+    def addresses(self) -> list:
+        return [wallet.address for wallet in self.wallets]
+
+    async def sync(self, addresses: list = None) -> None:
+        """Reads the nonce of every wallet, or of those in `addresses`, from the node."""
+        await asyncio.gather(*(wallet.nonce_manager.sync(replace=False) for wallet in self.wallets
+                               if addresses is None or wallet.address in addresses))
+
+    def assign(self, amounts_wei: list, balance_of: Callable[[str], Optional[BalanceEntry]],
+               in_flight_of: Callable[[str], int]) -> list:
+        """Returns a wallet for each amount and reserves the amounts on them.
+
+        `balance_of(address)` returns the wallet's cached pending-balance
+        entry, or None if unknown (treated as sufficient); `in_flight_of(address)`
+        the transactions still awaiting a receipt. If no wallet can cover an
+        amount, the one with the largest balance is used and the send reports
+        the error.
+        """
+        balances = {}
+        for wallet in self.wallets:
+            entry = balance_of(wallet.address)
+            if entry is None or entry.fetched_at is None:
+                balances[wallet.address] = None
+                continue
+            # Transfers broadcast before the read started are in the pending balance already
+            while wallet.broadcasts and wallet.broadcasts[0][0] < entry.fetched_at:
+                wallet.reserved_wei -= wallet.broadcasts.popleft()[1]
+            balances[wallet.address] = entry.balance_wei
+        balance_of = balances.get
+        assigned = []
+        count = len(self.wallets)
+        for amount_wei in amounts_wei:
+            candidates = []
+            for offset in range(count):
+                wallet = self.wallets[(self._cursor + offset) % count]
+                balance = balance_of(wallet.address)
+                if balance is None or balance - wallet.reserved_wei >= amount_wei:
+                    candidates.append((wallet.sending + in_flight_of(wallet.address), offset, wallet))
+            if candidates:
+                _, offset, wallet = min(candidates, key=lambda candidate: candidate[:2])
+                self._cursor = (self._cursor + offset + 1) % count
+            else:
+                wallet = max(self.wallets, key=lambda w: (balance_of(w.address) or 0) - w.reserved_wei)
+            wallet.reserved_wei += amount_wei
+            wallet.sending += 1
+            assigned.append(wallet)
+        return assigned
+
+    def release(self, wallet: SenderWallet, amount_wei: int, sent: bool) -> None:
+        """Records that an assigned transfer was broadcast, or gives back its amount if it was not.
+
+        A broadcast amount stays reserved until a balance read started after
+        the broadcast reaches assign().
+        """
+        wallet.sending -= 1
+        if sent:
+            wallet.sent += 1
+            wallet.broadcasts.append((time.time(), amount_wei))
+        else:
+            wallet.reserved_wei -= amount_wei
@@ -0,0 +1,98 @@
+"""Webhook ingestion: a small aiohttp server feeding updates into the Application."""
+import asyncio
+import hmac
+import logging
+import os
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+# Public HTTPS URL Telegram posts updates to (the reverse proxy in front of this server)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+# Local address and port the server binds to
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+# Local path updates are posted to; should match the path of WEBHOOK_URL as seen behind the proxy
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+# Shared secret Telegram sends in the X-Telegram-Bot-Api-Secret-Token header
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+# Max simultaneous HTTPS connections Telegram opens to us (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+# Path of the health endpoint for the reverse proxy / orchestrator
+WEBHOOK_HEALTH_PATH = os.getenv('WEBHOOK_HEALTH_PATH', '/healthz')
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def build_web_app(application) -> web.Application:
+    """Returns the aiohttp app serving the webhook and health endpoints."""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        received_token = request.headers.get(SECRET_TOKEN_HEADER, '')
+        if not hmac.compare_digest(received_token, WEBHOOK_SECRET_TOKEN):
+            logger.warning(f"Rejected webhook request from {request.remote} with a bad secret token.")
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"Rejected malformed webhook payload: {e}")
+            return web.Response(status=400)
+        # Acknowledge immediately; handlers run from the update queue
+        await application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok' if application.running else 'starting',
+            'pending_updates': application.update_queue.qsize(),
+        }, status=200 if application.running else 503)
+
+    web_app = web.Application()
+    web_app.router.add_post(WEBHOOK_PATH, handle_update)
+    web_app.router.add_get(WEBHOOK_HEALTH_PATH, handle_health)
+    return web_app
+
+
+async def _serve(application, allowed_updates: list, post_init, post_shutdown) -> None:
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    runner = web.AppRunner(build_web_app(application), access_log=None)
+    await application.initialize()
+    try:
+        await post_init(application)
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL,
+            allowed_updates=allowed_updates,
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            max_connections=WEBHOOK_MAX_CONNECTIONS
+        )
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT).start()
+        logger.info(f"Webhook server listening on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH} for {WEBHOOK_URL}")
+        await stop_event.wait()
+    finally:
+        logger.info("Stopping webhook server...")
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+        await post_shutdown(application)
+        await application.shutdown()
+
+
+def run_webhook(application, allowed_updates: list, post_init, post_shutdown) -> None:
+    """Runs the bot in webhook mode until SIGINT/SIGTERM.
+
+    The Application must be built with `.updater(None)`. PTB only calls
+    post_init/post_shutdown from its own run_* helpers, so they are passed
+    in and called here.
+    """
+    if not WEBHOOK_URL or not WEBHOOK_SECRET_TOKEN:
+        raise RuntimeError("Webhook mode needs WEBHOOK_URL and WEBHOOK_SECRET_TOKEN to be set.")
+    asyncio.run(_serve(application, allowed_updates, post_init, post_shutdown))